@@ -1,41 +1,107 @@
-
 import requests
 import json
 import os
+import re
+import hashlib
+import argparse
+import zlib
+import numpy as np
 from datetime import datetime, timezone
 
+CALENDAR_URL = "https://calendar.duke.edu/events/index.json?future_days={future_days}"
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sync_checkpoint.json')
+
+# Pipeline: stream_raw_events -> parse_dates -> dedupe -> normalize -> near-duplicate
+# filter -> checkpoint.diff -> sink.
+# Every stage is a generator over single records, so a run never holds the
+# whole calendar in memory.
+
+def iter_json_array(chunks, key='events'):
+    """
+    Yield the elements of the top-level array under key from a stream of
+    text chunks, decoding one element at a time as the bytes arrive.
+    Raises ValueError if the stream ends before the array is closed (or
+    never contains it), so a truncated feed can't pass for a complete one.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    chunks = iter(chunks)
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+
+    # skip ahead to the opening bracket of the array
+    while True:
+        match = start.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError(f"No \"{key}\" array in the feed")
+        buffer = buffer[-len(key) - 16:] + chunk
+
+    pos = 0
+    while True:
+        # skip separators; stop at the closing bracket
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = next(chunks, None)
+            if chunk is None:
+                if buffer[pos:].strip():
+                    raise
+                raise ValueError(f"Feed ended before the \"{key}\" array was closed")
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+        if pos > 65536:     # drop consumed text
+            buffer, pos = buffer[pos:], 0
+
+def stream_raw_events(future_days=30, urls=None, chunk_size=65536):
+    """
+    Raw { event: {...} } records from one or more calendar feeds, streamed.
+    Fetch and parse errors are raised, never swallowed: an incomplete feed
+    must not reach SyncCheckpoint.diff(), which would report every unseen id
+    as removed.
+    """
+    for url in urls or [CALENDAR_URL.format(future_days=future_days)]:
+        print(f"Streaming events from {url}...")
+        try:
+            with requests.get(url, stream=True) as resp:
+                resp.raise_for_status()
+                resp.encoding = resp.encoding or 'utf-8'
+                yield from iter_json_array(resp.iter_content(chunk_size, decode_unicode=True))
+        except Exception as e:
+            print(f"Error fetching {url}: {e}")
+            raise
+
 def fetch_raw_events(future_days=30):
     print(f"Fetching Duke events for next {future_days} days...")
-    url = f"https://calendar.duke.edu/events/index.json?future_days={future_days}"
-    try:
-        resp = requests.get(url)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get('events', [])
-    except Exception as e:
-        print(f"Error fetching: {e}")
-        return []
+    return list(stream_raw_events(future_days))
 
-def clean_event_data(raw_events):
-    stats = {
-        "total_raw": len(raw_events),
+def new_stats():
+    return {
+        "total_raw": 0,
         "removed_duplicates": 0,
+        "removed_near_duplicates": 0,
         "removed_invalid_dates": 0,
         "filled_missing_desc": 0,
-        "normalized_text": 0
+        "normalized_text": 0,
+        "final_count": 0
     }
-    
-    cleaned_events = []
-    seen_ids = set()
-    seen_signatures = set() # Title + StartTime
-
-    print(f"Starting preprocessing on {len(raw_events)} raw events...")
 
+def parse_dates(raw_events, stats):
+    """Unpack each record and drop those without a valid start date; yields (event, start_ts)."""
     for item in raw_events:
-        # 1. Unpack (Duke API structure is { event: {...} })
+        stats["total_raw"] += 1
+        # Duke API structure is { event: {...} }
         ev = item.get('event', {})
-        
-        # 2. Date Validation
+
         start_ts = None
         if 'start' in ev and 'utcdate' in ev['start']:
             ds = ev['start']['utcdate']
@@ -45,70 +111,275 @@ def clean_event_data(raw_events):
                 start_ts = dt.timestamp()
             except ValueError:
                 pass
-        
+
         if start_ts is None:
             stats["removed_invalid_dates"] += 1
             continue
+        yield ev, start_ts
 
-        # 3. Deduplication
+def dedupe(records, stats):
+    """Drop repeated ids and repeated title + start time pairs (kept as 8-byte digests)."""
+    seen_ids = set()
+    seen_signatures = set()
+    for ev, start_ts in records:
         eid = ev.get('id', '')
         title = ev.get('summary', '').strip()
-        
-        # Signature for content-based dedup
-        signature = f"{title}_{start_ts}"
-        
+        signature = hashlib.blake2b(f"{title}_{start_ts}".encode('utf-8'), digest_size=8).digest()
+
         if eid in seen_ids or signature in seen_signatures:
             stats["removed_duplicates"] += 1
             continue
-            
         seen_ids.add(eid)
         seen_signatures.add(signature)
+        yield ev, start_ts
 
-        # 4. Text Cleaning / Normalization
+def normalize(records, stats):
+    """Fill missing descriptions, collapse whitespace and build the clean event objects."""
+    for ev, start_ts in records:
         description = ev.get('description', '')
         if not description or description.isspace():
             description = "No description provided."
             stats["filled_missing_desc"] += 1
-        
-        # Normalize whitespace in title/desc
+
         original_title = ev.get('summary', '')
         clean_title = " ".join(original_title.split())
         clean_desc = " ".join(description.split())
-        
+
         if clean_title != original_title or clean_desc != ev.get('description', ''):
             stats["normalized_text"] += 1
 
-        # Construct Clean Object
-        cleaned_obj = {
-            "id": eid,
+        yield {
+            "id": ev.get('id', ''),
             "title": clean_title,
             "description": clean_desc,
             "start_timestamp": start_ts,
-            "tags": [] 
+            "tags": []
             # (Simplified tag logic for this script)
         }
-        
-        cleaned_events.append(cleaned_obj)
 
-    stats["final_count"] = len(cleaned_events)
+# MinHash permutations are h(x) = (a * x + b) mod p over uint64, with a, b < p
+# and shingle hashes reduced mod p first, so a * x + b < 2^62 + 2^31: well clear
+# of 2^64 (and of 2^63, had it been int64)
+MERSENNE_PRIME = (1 << 31) - 1
+
+class NearDuplicateFilter:
+    """
+    Drops cross-posted copies whose title + description are nearly the same
+    as an earlier event's starting on the same day.
+
+    Each event gets a MinHash signature over word shingles. LSH over bands of
+    that signature (keyed by start day, so a weekly series isn't collapsed)
+    finds candidates in O(1) per event, and a candidate counts as a duplicate
+    when the estimated Jaccard similarity reaches threshold. With embed (a
+    callable text -> normalized vector), the pair must also reach min_cosine;
+    only events that collide are embedded.
+    """
+    def __init__(self, threshold=0.7, num_perm=64, bands=16, shingle_size=3, embed=None, min_cosine=0.9, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.embed = embed
+        self.min_cosine = min_cosine
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.buckets = {}       # (day, band, band hash) -> kept event keys
+        self.signatures = {}    # kept event key -> MinHash signature
+        self.texts = {}
+        self.vectors = {}
+
+    @staticmethod
+    def text(event):
+        return re.sub(r'[^\w\s]', ' ', f"{event['title']} {event['description']}".lower())
+
+    def shingles(self, text):
+        words = text.split()
+        n = min(self.shingle_size, len(words))
+        return {' '.join(words[i:i + n]) for i in range(len(words) - n + 1)} if n else set()
+
+    def signature(self, text):
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        x = np.fromiter((zlib.crc32(s.encode('utf-8')) % MERSENNE_PRIME for s in shingles),
+                        dtype=np.uint64, count=len(shingles))
+        return ((self.a[:, None] * x[None, :] + self.b[:, None]) % MERSENNE_PRIME).min(axis=1).astype(np.int32)
+
+    def _vector(self, key, text):
+        if key not in self.vectors:
+            self.vectors[key] = np.asarray(self.embed(text), dtype=np.float32)
+        return self.vectors[key]
+
+    def filter(self, events, stats):
+        for position, event in enumerate(events):
+            text = self.text(event)
+            sig = self.signature(text)
+            if sig is None:
+                yield event
+                continue
+            day = int(event['start_timestamp'] // 86400)
+            keys = [(day, band, hash(sig[band * self.rows:(band + 1) * self.rows].tobytes())) for band in range(self.bands)]
+
+            candidates = {c for key in keys for c in self.buckets.get(key, ())}
+            duplicate = False
+            for c in candidates:
+                if np.mean(self.signatures[c] == sig) < self.threshold:
+                    continue
+                if self.embed is not None and float(self._vector(c, self.texts[c]) @ self._vector(position, text)) < self.min_cosine:
+                    continue
+                duplicate = True
+                break
+            if duplicate:
+                stats["removed_near_duplicates"] += 1
+                self.vectors.pop(position, None)
+                continue
+
+            self.signatures[position] = sig
+            if self.embed is not None:
+                self.texts[position] = text
+            for key in keys:
+                self.buckets.setdefault(key, []).append(position)
+            yield event
+
+def clean_events(raw_events, stats, near_duplicates=None):
+    """
+    Clean events one at a time; near_duplicates is a NearDuplicateFilter
+    (a default one when None, or False to skip that stage).
+    """
+    events = normalize(dedupe(parse_dates(raw_events, stats), stats), stats)
+    if near_duplicates is not False:
+        events = (near_duplicates or NearDuplicateFilter()).filter(events, stats)
+    for event in events:
+        stats["final_count"] += 1
+        yield event
+
+def clean_event_data(raw_events):
+    stats = new_stats()
+    print(f"Starting preprocessing on {len(raw_events)} raw events...")
+    cleaned_events = list(clean_events(raw_events, stats))
     return cleaned_events, stats
 
-def run_pipeline():
-    raw_events = fetch_raw_events()
-    cleaned_events, stats = clean_event_data(raw_events)
-    
+def content_hash(event):
+    return hashlib.sha1(json.dumps(event, sort_keys=True).encode('utf-8')).hexdigest()
+
+class SyncCheckpoint:
+    """
+    Content hash per event id from the last completed run. diff() turns a
+    stream of clean events into a delta feed against it (resume=False starts
+    from an empty checkpoint, so everything is "added").
+    """
+    def __init__(self, path=DEFAULT_CHECKPOINT, resume=True):
+        self.path = path
+        self.hashes = {}
+        if resume and path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.hashes = json.load(f)
+
+    def diff(self, events):
+        """
+        Yield ("added" | "changed", event) as events stream past, then
+        ("removed", {"id": ...}) for ids that did not appear. Removals and the
+        checkpoint save only happen once the stream has been fully consumed; if
+        it raises, the error propagates and the checkpoint is left as it was.
+        """
+        current = {}
+        for event in events:
+            eid = str(event['id'])
+            digest = content_hash(event)
+            current[eid] = digest
+            previous = self.hashes.get(eid)
+            if previous is None:
+                yield "added", event
+            elif previous != digest:
+                yield "changed", event
+        for eid in sorted(self.hashes.keys() - current.keys()):
+            yield "removed", {"id": eid}
+        self.hashes = current
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.hashes, f)
+        os.replace(tmp_path, self.path)
+
+def write_delta(changes, path=None):
+    """
+    Sink: count the delta and, if path is set, write it as NDJSON
+    { "op", "event" } lines. The file only appears once the whole delta is
+    written; a failed run leaves any previous one in place.
+    """
+    counts = {"added": 0, "changed": 0, "removed": 0}
+    tmp_path = path + '.tmp' if path else None
+    f = open(tmp_path, 'w') if path else None
+    try:
+        for op, event in changes:
+            counts[op] += 1
+            if f:
+                f.write(json.dumps({"op": op, "event": event}) + "\n")
+    except BaseException:
+        if f:
+            f.close()
+            os.remove(tmp_path)
+        raise
+    if f:
+        f.close()
+        os.replace(tmp_path, path)
+    return counts
+
+def sentence_embedder(model_name):
+    """text -> normalized vector with a sentence-transformers model, for NearDuplicateFilter(embed=...)."""
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    return lambda text: model.encode(text, normalize_embeddings=True)
+
+def run_pipeline(future_days=30, checkpoint_path=DEFAULT_CHECKPOINT, output=None, full=False,
+                 near_duplicates=None):
+    stats = new_stats()
+    checkpoint = SyncCheckpoint(checkpoint_path, resume=not full)
+    events = clean_events(stream_raw_events(future_days), stats, near_duplicates)
+    try:
+        delta = write_delta(checkpoint.diff(events), output)
+    except Exception:
+        print("Sync aborted: checkpoint and delta left unchanged")
+        raise
+
     print("\n" + "="*50)
     print("PREPROCESSING PIPELINE REPORT")
     print("="*50)
     print(f"Input Events:          {stats['total_raw']}")
     print(f"Removed (Duplicates):  {stats['removed_duplicates']}")
+    print(f"Removed (Near Dups):   {stats['removed_near_duplicates']}")
     print(f"Removed (Bad Dates):   {stats['removed_invalid_dates']}")
     print("-" * 30)
     print(f"Modified (No Desc):    {stats['filled_missing_desc']}")
     print(f"Modified (Whitespace): {stats['normalized_text']}")
     print("-" * 30)
     print(f"Final Valid Events:    {stats['final_count']}")
+    print("-" * 30)
+    print(f"Delta Added:           {delta['added']}")
+    print(f"Delta Changed:         {delta['changed']}")
+    print(f"Delta Removed:         {delta['removed']}")
     print("="*50)
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Stream, clean and diff the Duke calendar feed")
+    parser.add_argument('--future-days', type=int, default=30)
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help="sync checkpoint (content hash per event id)")
+    parser.add_argument('--output', help="write the added/changed/removed delta here as NDJSON")
+    parser.add_argument('--full', action='store_true', help="ignore the checkpoint and emit every event as added")
+    parser.add_argument('--no-near-dedupe', action='store_true', help="skip MinHash near-duplicate removal")
+    parser.add_argument('--near-threshold', type=float, default=0.7, help="estimated Jaccard for a near duplicate")
+    parser.add_argument('--confirm-model', help="sentence-transformers model to confirm near duplicates by cosine")
+    args = parser.parse_args()
+
+    near_duplicates = False
+    if not args.no_near_dedupe:
+        embed = sentence_embedder(args.confirm_model) if args.confirm_model else None
+        near_duplicates = NearDuplicateFilter(args.near_threshold, embed=embed)
+    run_pipeline(args.future_days, args.checkpoint, args.output, args.full, near_duplicates)
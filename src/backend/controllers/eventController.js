@@ -1,6 +1,68 @@
 const fetch = require('node-fetch');
 const fs = require('fs');
 const path = require('path');
+const crypto = require('crypto');
+
+const RANKING_URL = 'http://localhost:5001';
+
+// the event list last pushed to the ranking service's corpus, and the corpus
+// version it answered with; /rank reports the version it ranked, so a service
+// that restarted without its corpus (or was resynced by someone else) is noticed
+let syncedCorpus = { signature: null, version: null };
+
+const sha1 = (text) => crypto.createHash('sha1').update(text).digest('hex');
+
+// node-fetch asks for and decompresses gzip responses on its own
+const postRanking = (route, payload) => fetch(`${RANKING_URL}${route}`, {
+  method: 'POST',
+  headers: { 'Content-Type': 'application/json' },
+  body: JSON.stringify(payload)
+});
+
+// events are sent as { id, hash } refs first; if the ranking service answers
+// 409 { unknown: [...] } the retry carries every full body, since with several
+// ranking workers it may land on a process that has seen none of the refs
+const postWithEventRefs = async (route, payload, events) => {
+  const hashed = events.map(ev => ({ ...ev, hash: sha1(JSON.stringify(ev)) }));
+  const event_refs = hashed.map(ev => ({ id: String(ev.id), hash: ev.hash }));
+
+  let response = await postRanking(route, { ...payload, event_refs });
+  if (response.status === 409) {
+    await response.json();
+    response = await postRanking(route, { ...payload, events: hashed });
+  }
+  return response;
+};
+
+const syncRankingCorpus = async (events, force = false) => {
+  const signature = sha1(JSON.stringify(events));
+  if (!force && signature === syncedCorpus.signature) {
+    return;
+  }
+
+  const response = await postWithEventRefs('/corpus', {}, events);
+
+  if (!response.ok) {
+    throw new Error(`Ranking corpus sync error: ${response.status}`);
+  }
+  const { corpus_version } = await response.json();
+  syncedCorpus = { signature, version: String(corpus_version) };
+};
+
+// /rank against the synced corpus; resyncs and asks once more if the service
+// ranked a different corpus version than the one we pushed
+const rankAgainstCorpus = async (events, payload) => {
+  await syncRankingCorpus(events);
+  let response = await postRanking('/rank', payload);
+  const version = response.headers.get('X-Corpus-Version');
+  if (response.ok && version !== null && version !== syncedCorpus.version) {
+    console.warn(`Ranking corpus version ${version} differs from synced ${syncedCorpus.version}, resyncing`);
+    await response.text();
+    await syncRankingCorpus(events, true);
+    response = await postRanking('/rank', payload);
+  }
+  return response;
+};
 
 const fetchDukeEvents = async (futureDays = 30) => {
   console.log(`Fetching Duke events for next ${futureDays} days...`);
@@ -90,27 +152,48 @@ exports.rankEvents = async (req, res) => {
   try {
     const { user_profile, weights } = req.body;
     const futureDays = req.query.future_days || 30;
+    // optional page of the ranking, e.g. ?limit=20&offset=40
+    const limit = req.query.limit !== undefined ? parseInt(req.query.limit, 10) : undefined;
+    const offset = parseInt(req.query.offset || 0, 10);
 
     const events = await fetchDukeEvents(futureDays);
 
     try {
-      const rankingResponse = await fetch('http://localhost:5001/rank', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          user_profile,
-          events,
-          weights
-        })
+      // the ranking service keeps its own corpus, so /rank only needs the profile;
+      // columnar response: parallel ids/scores/sim/label/recency arrays
+      const rankingResponse = await rankAgainstCorpus(events, {
+        user_profile,
+        weights,
+        format: 'columnar',
+        details: true,
+        limit,
+        offset
       });
 
       if (!rankingResponse.ok) {
         throw new Error(`Ranking service error: ${rankingResponse.status}`);
       }
 
-      const rankedEvents = await rankingResponse.json();
+      const ranked = await rankingResponse.json();
 
-      const rankedMap = new Map(rankedEvents.map(r => [String(r.id), r]));
+      const rankedMap = new Map(ranked.ids.map((id, i) => [String(id), {
+        score: ranked.scores[i],
+        details: { sim: ranked.sim[i], label: ranked.label[i], recency: ranked.recency[i] }
+      }]));
+
+      if (limit !== undefined) {
+        // just the requested page, already in ranked order
+        const eventsById = new Map(events.map(ev => [String(ev.id), ev]));
+        res.set('X-Total-Count', rankingResponse.headers.get('X-Total-Count') || String(events.length));
+        return res.json(ranked.ids.filter(id => eventsById.has(String(id))).map(id => {
+          const rankInfo = rankedMap.get(String(id));
+          return {
+            ...eventsById.get(String(id)),
+            relevanceScore: rankInfo.score,
+            scoreDetails: rankInfo.details
+          };
+        }));
+      }
 
       const mergedEvents = events.map(ev => {
         const rankInfo = rankedMap.get(String(ev.id));
@@ -5,42 +5,366 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.append(root_dir)
 
-from flask import Flask, request, jsonify
-from models.embeddings import Embedder
-from scorer import score_events
+from flask import Flask, Response, g, has_request_context, request, jsonify
+from models.embeddings import Embedder, event_text, WARMUP_TEXTS
+from models.store import EmbeddingStore
+from models.composer import QueryComposer, build_query_text, load_majors
+from models.batcher import MicroBatcher
+from corpus import EventCorpus, in_window
+from shared_corpus import SharedCorpus
+from indexer import EventIndexer
+from scorer import parse_timestamp, score_events, score_events_batch
+from wire import EventRegistry, decode_body, dumps, encode_body
+from metrics import MetricsRegistry, RequestTimer, SIZE_BUCKETS
 import numpy as np
-import json
+import time
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__)
 
-embedder = Embedder()
+# per-stage request timings: returned in a Server-Timing header and aggregated
+# into the histograms served by /metrics (gauges are registered further down)
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram('ranking_request_seconds', 'Request latency by route.', label='route')
+stage_seconds = metrics.histogram('ranking_stage_seconds', 'Time spent per request stage.', label='stage')
+query_batch_sizes = metrics.histogram('ranking_query_batch_size', 'Queries per micro-batched encode.', SIZE_BUCKETS)
+rank_batch_profiles = metrics.histogram('ranking_rank_batch_profiles', 'Profiles per /rank_batch request.', SIZE_BUCKETS)
+TIMED_ENDPOINTS = {'rank_events', 'rank_batch', 'load_corpus'}
+
+def stage(name):
+    """Time a block as a stage of the current request (no-op outside a timed request)."""
+    if has_request_context() and 'timer' in g:
+        return g.timer.stage(name)
+    return nullcontext()
+
+@app.before_request
+def start_timer():
+    if request.endpoint in TIMED_ENDPOINTS:
+        g.timer = RequestTimer()
+
+def observe_timer(timer, route):
+    request_seconds.observe(timer.total(), route)
+    for name, seconds in timer.stages.items():
+        stage_seconds.observe(seconds, name)
+
+@app.after_request
+def record_timings(response):
+    timer = g.pop('timer', None)
+    if timer is not None:
+        response.headers['Server-Timing'] = timer.server_timing()
+        observe_timer(timer, request.endpoint)
+    return response
+
+# embedding cache budget (MB) and optional expiry (seconds)
+EMBEDDING_CACHE_MB = float(os.environ.get('EMBEDDING_CACHE_MB', 256))
+EMBEDDING_CACHE_TTL = os.environ.get('EMBEDDING_CACHE_TTL')
+
+# inference backend: 'torch', or 'onnx' to run the exported int8 graph in EMBEDDING_MODEL_DIR
+EMBEDDING_BACKEND = os.environ.get('EMBEDDING_BACKEND', 'torch')
+EMBEDDING_MODEL_DIR = os.environ.get('EMBEDDING_MODEL_DIR')
+
+embedder = Embedder(
+    cache_bytes=int(EMBEDDING_CACHE_MB * 1024 * 1024),
+    cache_ttl=float(EMBEDDING_CACHE_TTL) if EMBEDDING_CACHE_TTL else None,
+    backend=EMBEDDING_BACKEND,
+    model_dir=EMBEDDING_MODEL_DIR
+)
+
+# persistent event embeddings, memory-mapped so warm restarts skip re-encoding
+EMBEDDING_STORE_DIR = os.environ.get('EMBEDDING_STORE_DIR', os.path.join(current_dir, 'embedding_store'))
+event_store = EmbeddingStore(EMBEDDING_STORE_DIR, embedder.model_id, embedder.dimension)
 
 # load RAG data
 MAJORS_DATA = {}
 try:
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     data_path = os.path.join(base_dir, 'data', 'majors.json')
-    
-    with open(data_path, 'r') as f:
-        raw_majors = json.load(f)
-        
-    # flatten structure
-    for category in raw_majors.values():
-        prog_list = category.get('programs', [])
-        for item in prog_list:
-            name = item.get('major', '').lower()
-            desc = item.get('description', '')
-            MAJORS_DATA[name] = desc
-            
+    MAJORS_DATA = load_majors(data_path)
 except Exception as e:
     print(f"Warning: Could not load majors.json: {e}")
 
-# in memory cache for event embeddings
-event_embedding_cache = {}
+# query mode: 'text' encodes the full profile text, 'composed' sums precomputed
+# major/interest/year vectors (majors are embedded once during warm-up)
+QUERY_MODE = os.environ.get('QUERY_MODE', 'text')
+composer = QueryComposer(embedder, MAJORS_DATA)
+
+# single query encodes from concurrent requests are merged into one batched
+# encode; a batch closes after MICROBATCH_WINDOW_MS or MICROBATCH_MAX requests
+MICROBATCH_WINDOW_MS = float(os.environ.get('MICROBATCH_WINDOW_MS', 2))
+MICROBATCH_MAX = int(os.environ.get('MICROBATCH_MAX', 32))
+query_batcher = MicroBatcher(embedder, MICROBATCH_WINDOW_MS, MICROBATCH_MAX, query_batch_sizes) if MICROBATCH_WINDOW_MS > 0 else None
+
+# bounded cache shared by query and event embeddings, keyed by hash(model, text)
+# so an edited event is re-embedded instead of serving its stale vector
+event_embedding_cache = embedder.cache
+
+# last full body seen per event id, so clients can send {"id", "hash"} refs
+# and only resend bodies the ranker reports as unknown
+event_registry = EventRegistry(int(os.environ.get('EVENT_REGISTRY_MAX', 100000)))
+
+def read_payload():
+    with stage('parse'):
+        return decode_body(request.get_data(), request.headers.get('Content-Encoding'))
+
+def respond(payload, status=200, headers=None):
+    with stage('serialize'):
+        body, encoding_headers = encode_body(payload, request.headers.get('Accept-Encoding', ''))
+    return Response(body, status=status, headers={**encoding_headers, **(headers or {})}, mimetype='application/json')
+
+def resolve_events(data):
+    """
+    Events for a payload: full bodies in "events" are registered, then
+    "event_refs" (if given) are resolved against the registry. Returns
+    (events or None, unknown ids).
+    """
+    bodies = data.get('events')
+    if bodies:
+        event_registry.register(bodies)
+    refs = data.get('event_refs')
+    if refs is None:
+        return bodies, []
+    return event_registry.resolve(refs)
+
+def unknown_events(unknown):
+    """409 telling the client which refs need their full body resent."""
+    return respond({"error": "unknown_events", "unknown": unknown}, 409)
+
+class InvalidParameter(ValueError):
+    pass
+
+@app.errorhandler(InvalidParameter)
+def invalid_parameter(e):
+    return respond({"error": "invalid_parameter", "message": str(e)}, 400)
+
+def int_param(data, name, default=None, minimum=0):
+    """Integer payload field (default when missing or null); InvalidParameter (400) otherwise."""
+    value = data.get(name)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise InvalidParameter(f"'{name}' must be an integer")
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidParameter(f"'{name}' must be an integer")
+    if value < minimum:
+        raise InvalidParameter(f"'{name}' must be at least {minimum}")
+    return value
+
+def timestamp_param(data, name):
+    """Unix seconds from a number or ISO 8601 string payload field (None when missing)."""
+    value = data.get(name)
+    if value is None:
+        return None
+    try:
+        ts = parse_timestamp(value) if not isinstance(value, bool) else None
+    except ValueError:
+        ts = None
+    if ts is None:
+        raise InvalidParameter(f"'{name}' must be a unix timestamp or an ISO 8601 date")
+    return ts
+
+# flipped by warm_up(); /health answers 503 until all are true so a load
+# balancer never routes to a cold worker (the model itself loads lazily)
+readiness = {"model_loaded": False, "warmed_up": False, "corpus_loaded": False}
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok", "model": "loaded", "rag_majors": len(MAJORS_DATA)})
+    ready = all(readiness.values())
+    return jsonify({
+        "status": "ok" if ready else "warming_up",
+        "ready": ready,
+        "readiness": readiness,
+        "model": "loaded" if embedder.loaded else "not_loaded",
+        "rag_majors": len(MAJORS_DATA),
+        "cache": event_embedding_cache.stats(),
+        "registered_events": len(event_registry),
+        "stored_events": len(event_store),
+        "corpus_events": len(corpus),
+        "corpus_bytes": int(corpus.nbytes),
+        "corpus_mode": CORPUS_MODE,
+        "corpus_version": corpus.version,
+        "worker_pid": os.getpid(),
+        "pending_embeddings": len(pending_embeddings),
+        "query_batches": query_batcher.stats() if query_batcher else None
+    }), 200 if ready else 503
+
+def event_keys(events):
+    texts = [event_text(event) for event in events]
+    ids = [str(event.get('id')) for event in events]
+    return texts, ids, [embedder.cache_key(text) for text in texts]
+
+def embed_events(events):
+    """(N, D) embeddings for events: store hits first, then cache/model for the rest."""
+    with stage('cache_lookup'):
+        texts, ids, hashes = event_keys(events)
+        event_embs, missing = event_store.lookup(ids, hashes)
+    if missing:
+        with stage('embed_misses'):
+            fresh = embedder.embed_texts([texts[i] for i in missing])
+            event_embs[missing] = fresh
+            event_store.append([ids[i] for i in missing], [hashes[i] for i in missing], fresh)
+    return event_embs
+
+# unseen events in /rank are embedded by a background pool instead of inside
+# the request; until then they are ranked on label + recency only
+BACKGROUND_EMBEDDING = os.environ.get('BACKGROUND_EMBEDDING', '1') == '1'
+embedding_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('EMBED_WORKERS', 1)), thread_name_prefix='embed')
+pending_embeddings = set()  # content hashes queued or being embedded
+pending_lock = threading.Lock()
+
+def _embed_in_background(events, hashes):
+    try:
+        embed_events(events)
+    except Exception as e:
+        print(f"Background embedding failed: {e}")
+    finally:
+        with pending_lock:
+            pending_embeddings.difference_update(hashes)
+
+def embed_events_nonblocking(events):
+    """
+    Stored embeddings for events without waiting on the model. Returns the
+    (N, D) matrix (zero rows for misses) and a boolean mask of the misses,
+    which are handed to the background pool.
+    """
+    with stage('cache_lookup'):
+        _, ids, hashes = event_keys(events)
+        event_embs, missing = event_store.lookup(ids, hashes)
+    provisional = np.zeros(len(events), dtype=bool)
+    provisional[missing] = True
+
+    with pending_lock:
+        queued = {}
+        for i in missing:
+            if hashes[i] not in pending_embeddings:
+                queued.setdefault(hashes[i], events[i])
+        pending_embeddings.update(queued)
+    if queued:
+        embedding_pool.submit(_embed_in_background, list(queued.values()), list(queued))
+    return event_embs, provisional
+
+# server-side event corpus + FAISS index, restored from disk during warm-up (vectors come from the store)
+RANK_CANDIDATES = int(os.environ.get('RANK_CANDIDATES', 200))
+# in-memory embedding storage for the corpus: float32, float16 or int8
+EMBEDDING_STORAGE = os.environ.get('EMBEDDING_STORAGE', 'float32')
+# 'local': this process holds the corpus; 'shared': the corpus is published to
+# memory-mapped files under CORPUS_DIR that every worker maps (see gunicorn.conf.py)
+CORPUS_MODE = os.environ.get('CORPUS_MODE', 'local')
+CORPUS_DIR = os.environ.get('CORPUS_DIR', os.path.join(EMBEDDING_STORE_DIR, 'corpus'))
+if CORPUS_MODE == 'shared':
+    corpus = SharedCorpus(CORPUS_DIR, embedder.dimension, storage=EMBEDDING_STORAGE)
+else:
+    corpus = EventCorpus(embedder.dimension, path=os.path.join(EMBEDDING_STORE_DIR, 'corpus.json'), storage=EMBEDDING_STORAGE)
+
+def cache_stats(key):
+    """Gauge callback reading one field of the embedding cache stats."""
+    def read():
+        return event_embedding_cache.stats()[key]
+    return read
+
+metrics.gauge('ranking_embedding_cache_hits_total', 'Embedding cache hits.', cache_stats('hits'), kind='counter')
+metrics.gauge('ranking_embedding_cache_misses_total', 'Embedding cache misses.', cache_stats('misses'), kind='counter')
+metrics.gauge('ranking_embedding_cache_hit_ratio', 'Embedding cache hit ratio.', cache_stats('hit_ratio'))
+metrics.gauge('ranking_embedding_cache_bytes', 'Bytes held by the embedding cache.', cache_stats('resident_bytes'))
+metrics.gauge('ranking_corpus_events', 'Events in the ranking corpus.', lambda: len(corpus))
+metrics.gauge('ranking_corpus_bytes', 'Bytes held by the corpus embedding matrix.', lambda: corpus.nbytes)
+if CORPUS_MODE == 'shared':
+    metrics.gauge('ranking_corpus_version', 'Shared corpus version this worker serves.', lambda: corpus.version)
+metrics.gauge('ranking_stored_events', 'Event embeddings in the persistent store.', lambda: len(event_store))
+metrics.gauge('ranking_pending_embeddings', 'Events queued for background embedding.', lambda: len(pending_embeddings))
+metrics.gauge('ranking_ready', '1 once warm-up has finished.', lambda: all(readiness.values()))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def warm_up():
+    """Load the model, run representative encodes and FAISS searches, and restore the corpus."""
+    start = time.perf_counter()
+    embedder.warm_up()
+    readiness["model_loaded"] = True
+
+    if QUERY_MODE == 'composed':
+        composer.warm()
+
+    # a POST /corpus that lands while the saved corpus is being restored wins
+    generation = corpus.generation
+    saved_events = corpus.load_saved()
+    event_registry.register(saved_events)
+    if saved_events and not corpus.replace(saved_events, embed_events(saved_events), if_generation=generation):
+        print("Saved corpus not restored: a newer one was posted during warm-up")
+    readiness["corpus_loaded"] = True
+
+    query_emb = embedder.embed_text(WARMUP_TEXTS[0])
+    view = corpus.view()
+    if len(view):
+        view.embedding_rows(view.candidate_rows(query_emb, k=RANK_CANDIDATES))
+    else:
+        probe = EventIndexer(embedder.dimension)
+        probe.build_index(embedder.embed_texts(WARMUP_TEXTS), list(range(len(WARMUP_TEXTS))))
+        probe.search(query_emb, k=len(WARMUP_TEXTS))
+    readiness["warmed_up"] = True
+    print(f"Warm-up finished in {time.perf_counter() - start:.2f}s ({len(corpus)} corpus events)")
+
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+
+def _warm_up_once():
+    global _warm_up_thread
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"Warm-up failed, retrying on the next request: {e}")
+        with _warm_up_lock:
+            _warm_up_thread = None
+
+def start_warm_up():
+    """
+    Run warm_up() once per process in a background thread and return the
+    thread. Called on the first request however the app is served (flask run,
+    any WSGI server, tests), so /health turns 200 without a __main__ hook.
+    """
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_warm_up_once, name='warm-up', daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+@app.before_request
+def ensure_warm_up():
+    if not readiness["warmed_up"]:
+        start_warm_up()
+
+@app.route('/corpus', methods=['POST'])
+def load_corpus():
+    """
+    Replace the ranking corpus.
+    Payload: { "events": [ { "id": "1", "hash": "...", "title": "...", "description": "...", "tags": [...], "start_timestamp": ... }, ... ] }
+    or { "event_refs": [ { "id": "1", "hash": "..." }, ... ], "events": [ bodies for previously unknown refs ] };
+    unknown refs are answered with 409 { "unknown": [ids] }.
+    """
+    events, unknown = resolve_events(read_payload())
+    if unknown:
+        return unknown_events(unknown)
+    events = events or []
+    corpus.replace(events, embed_events(events))
+    return respond({"status": "ok", "corpus_events": len(corpus), "corpus_version": corpus.version})
+
+def embed_queries(user_profiles, mode=None):
+    """(M, D) query vectors for profiles, full-text or composed depending on mode."""
+    if (mode or QUERY_MODE) == 'composed':
+        with stage('query_embed'):
+            return composer.compose_many(user_profiles)
+    with stage('query_text'):
+        texts = [build_query_text(profile, MAJORS_DATA) for profile in user_profiles]
+    with stage('query_embed'):
+        if query_batcher is not None and len(texts) == 1:
+            return query_batcher.encode(texts[0])[None, :]
+        return embedder.embed_texts(texts)
 
 @app.route('/rank', methods=['POST'])
 def rank_events():
@@ -52,64 +376,137 @@ def rank_events():
             "year": "Junior",
             "interests": ["tech", "ai"]
         },
-        "events": [
-            { "id": "1", "description": "...", "tags": [...], "start_timestamp": ... },
-            ...
-        ],
+        "k": 200 (optional, number of semantic candidates taken from the corpus),
+        "query_mode": "text" | "composed" (optional, defaults to QUERY_MODE),
+        "start": ..., "end": ... (optional unix timestamps or ISO dates, corpus window; start defaults to now),
+        "events": [ ... ] (optional, rank these instead of the server-side corpus),
+        "event_refs": [ { "id": "1", "hash": "..." }, ... ] (optional, events sent earlier;
+            unknown refs are answered with 409 { "unknown": [ids] }),
+        "format": "rows" | "columnar" (optional, columnar returns parallel "ids"/"scores" arrays),
+        "details": true (optional, columnar only: add "sim"/"label"/"recency" columns),
+        "limit": 20, "offset": 0 (optional, return one page of the ranking; the number
+            of rankable events, in the corpus window or sent, is in the X-Total-Count header),
+        "wait_for_embeddings": false (optional, embed unseen events inside the request
+            instead of ranking them provisionally on label + recency),
         "weights": { "sim": 0.7, "recency": 0.2, "label": 0.1 } (optional)
     }
+    When ranking the corpus, the X-Corpus-Version header is the corpus version
+    used (as returned by POST /corpus; 0 when empty), so a client can tell that
+    the service lost or replaced the corpus it synced and resync.
     """
-    data = request.json
+    data = read_payload()
     user_profile = data.get('user_profile', {})
-    events = data.get('events', [])
     weights = data.get('weights')
-    
-    if not events:
-        return jsonify([])
-
-    # query embedding
-    interests_str = " ".join(user_profile.get('interests', []))
-    major_name = user_profile.get('major', '').strip()
-    year = user_profile.get('year', '')
-    
-    major_context = ""
-    if major_name.lower() in MAJORS_DATA:
-        major_context = MAJORS_DATA[major_name.lower()]
-    
-    query_text = f"{major_name} {major_context} {year} {interests_str}".strip()
-        
-    if not query_text:
-        query_text = "general"
-
-    query_emb = embedder.embed_text(query_text)
-
-    # event embeddings
-    batch_texts = []
-    batch_ids = []
-    
-    event_embs_list = []
-    
-    indices_to_compute = []
-    
-    for i, event in enumerate(events):
-        eid = str(event.get('id'))
-        if eid in event_embedding_cache:
-            event_embs_list.append(event_embedding_cache[eid])
-        else:
-            text = f"{event.get('title', '')} {event.get('description', '')} {' '.join(event.get('tags', []))}"
-            batch_texts.append(text)
-            batch_ids.append(eid)
-            event_embs_list.append(None) 
-            indices_to_compute.append(i)
-
-    if batch_texts:
-        new_embs = embedder.embed_texts(batch_texts)
-        for idx, fresh_emb, eid in zip(indices_to_compute, new_embs, batch_ids):
-            event_embedding_cache[eid] = fresh_emb
-            event_embs_list[idx] = fresh_emb
-
-    ranked_results = score_events(query_emb, event_embs_list, events, user_profile, weights)
-    return jsonify(ranked_results)
+    columnar = data.get('format') == 'columnar'
+    events, unknown = resolve_events(data)
+    if unknown:
+        return unknown_events(unknown)
+
+    k = int_param(data, 'k', RANK_CANDIDATES, minimum=1)
+    start, end = timestamp_param(data, 'start'), timestamp_param(data, 'end')
+    limit, offset = int_param(data, 'limit'), int_param(data, 'offset', 0)
+
+    view = corpus.view()    # one corpus version for the whole request
+    headers = {'X-Corpus-Version': str(view.version)} if events is None else {}
+    if not (len(view) if events is None else events):
+        return respond({"ids": [], "scores": []} if columnar else [], headers={**headers, 'X-Total-Count': '0'})
+
+    query_emb = embed_queries([user_profile], data.get('query_mode'))[0]
+
+    timestamps = event_tags = None
+    if events is None:
+        # only the top-k semantic candidates get label/recency re-scoring,
+        # reusing the timestamps and tag ids computed when the corpus was loaded
+        with stage('retrieve'):
+            # enough candidates to fill the requested page
+            k = max(k, offset + limit) if limit is not None else k
+            rows = view.candidate_rows(query_emb, k=k, start=start, end=end)
+            events, event_embs = view.events_at(rows), view.embedding_rows(rows)
+            timestamps, event_tags = view.timestamps[rows], view.tags.take(rows)
+            total = view.window_count(start, end)
+        provisional = None
+    elif BACKGROUND_EMBEDDING and not data.get('wait_for_embeddings'):
+        event_embs, provisional = embed_events_nonblocking(events)
+        total = len(events)
+    else:
+        event_embs, provisional = embed_events(events), None
+        total = len(events)
+
+    ranked_results = score_events(
+        query_emb, event_embs, events, user_profile, weights, provisional,
+        columnar=columnar, details=bool(data.get('details')), limit=limit, offset=offset,
+        timestamps=timestamps, event_tags=event_tags, timer=g.get('timer')
+    )
+    return respond(ranked_results, headers={**headers, 'X-Total-Count': str(total)})
+
+@app.route('/rank_batch', methods=['POST'])
+def rank_batch():
+    """
+    Rank one event set for many profiles (e.g. the nightly digest).
+    Payload:
+    {
+        "user_profiles": [ { "id": "u1", "major": "...", "year": "...", "interests": [...] }, ... ],
+        "events": [ ... ] (optional, defaults to the server-side corpus),
+        "event_refs": [ { "id": "1", "hash": "..." }, ... ] (optional, see /rank),
+        "k": 20 (optional, results per profile),
+        "start": ..., "end": ... (optional, corpus window as in /rank; start defaults to now),
+        "query_mode": "text" | "composed" (optional),
+        "weights": { ... } (optional)
+    }
+    Streams one JSON line per profile: { "profile": <id or position>, "results": [...] }
+    """
+    data = read_payload()
+    profiles = data.get('user_profiles', [])
+    weights = data.get('weights')
+    top_k = int_param(data, 'k', 20, minimum=1)
+    start, end = timestamp_param(data, 'start'), timestamp_param(data, 'end')
+    events, unknown = resolve_events(data)
+    if unknown:
+        return unknown_events(unknown)
+
+    timestamps = event_tags = None
+    if events is None:
+        # the corpus events starting within the window, like /rank
+        view = corpus.view()
+        rows = np.flatnonzero(in_window(view.timestamps, start, end))
+        events, event_embs = view.events_at(rows), view.embedding_rows(rows)
+        timestamps, event_tags = view.timestamps[rows], view.tags.take(rows)
+    else:
+        event_embs = embed_events(events)
+
+    if not profiles or not len(events):
+        return Response("", mimetype='application/x-ndjson')
+    rank_batch_profiles.observe(len(profiles))
+
+    # all M queries go through one batched encode (or composition)
+    query_embs = embed_queries(profiles, data.get('query_mode'))
+
+    # the body is scored while it streams, after the response headers are sent, so
+    # this route has no Server-Timing header; the generator records the full
+    # request (scoring included) in the /metrics histograms once it finishes
+    timer = g.pop('timer', None)
+
+    def generate():
+        stage = timer.stage if timer is not None else (lambda name: nullcontext())
+        ranked_lists = score_events_batch(
+            query_embs, event_embs, events, profiles, weights, top_k,
+            timestamps=timestamps, event_tags=event_tags
+        )
+        try:
+            for i, profile in enumerate(profiles):
+                with stage('score'):
+                    ranked = next(ranked_lists)
+                with stage('serialize'):
+                    line = dumps({"profile": profile.get('id', i), "results": ranked}) + b"\n"
+                yield line
+        finally:
+            if timer is not None:
+                observe_timer(timer, 'rank_batch')
+
+    return Response(generate(), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
+    # with the debug reloader only the serving child (WERKZEUG_RUN_MAIN) warms up
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_up()
     app.run(port=5001, debug=True)
@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from indexer import TimePartitionedIndexer
+from scorer import event_timestamps, event_tag_index
+from tags import TagVocabulary
+from models.quantize import QuantizedMatrix
+
+# compressed storage mode -> matching compressed faiss index
+STORAGE_INDEX_TYPES = {'float32': 'flat', 'float16': 'sq_fp16', 'int8': 'sq8'}
+
+def in_window(timestamps, start=None, end=None):
+    """Mask of events starting within [start, end] (start defaults to now); undated events always match."""
+    timestamps = np.asarray(timestamps)
+    mask = timestamps >= (time.time() if start is None else start)
+    if end is not None:
+        mask &= timestamps <= end
+    return mask | np.isnan(timestamps)
+
+class CorpusSnapshot:
+    """
+    One immutable state of an EventCorpus. Requests read through a snapshot
+    (EventCorpus.view()) so rows found by candidate_rows always index the
+    same events, embeddings, timestamps and tags, even if the corpus is
+    replaced or expired meanwhile. version is the EventCorpus generation the
+    snapshot was built from.
+    """
+    def __init__(self, events, embeddings, indexer, timestamps, tags, version=0):
+        self.version = version
+        self.events = events
+        self.embeddings = embeddings
+        self.indexer = indexer
+        self.timestamps = timestamps
+        self.tags = tags
+        self.positions = {str(event.get('id')): row for row, event in enumerate(events)}
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def nbytes(self):
+        return self.embeddings.nbytes
+
+    def candidate_rows(self, query_emb, k=200, start=None, end=None):
+        """
+        Rows of the top-k events by embedding similarity starting within
+        [start, end] (start defaults to now).
+        """
+        start = time.time() if start is None else start
+        hits = self.indexer.search(query_emb, k=k, start=start, end=end)
+        return np.array([self.positions[eid] for eid, _ in hits], dtype=np.int64)
+
+    def window_count(self, start=None, end=None):
+        """Number of events candidate_rows() could return for this window."""
+        return int(np.count_nonzero(in_window(self.timestamps, start, end)))
+
+    def events_at(self, rows):
+        return [self.events[row] for row in rows]
+
+    def embedding_rows(self, rows):
+        if isinstance(self.embeddings, QuantizedMatrix):
+            return self.embeddings.rows(rows)
+        return self.embeddings[rows]
+
+    def select(self, rows, indexer):
+        """Snapshot of only the given rows (kept in order), searched through indexer."""
+        if isinstance(self.embeddings, QuantizedMatrix):
+            e = self.embeddings
+            embeddings = QuantizedMatrix(e.data[rows], e.scales[rows] if e.scales is not None else None, e.mode)
+        else:
+            embeddings = self.embeddings[rows]
+        return CorpusSnapshot([self.events[row] for row in rows], embeddings, indexer,
+                              self.timestamps[rows], self.tags.take(rows), self.version)
+
+class EventCorpus:
+    """
+    Events held by the ranking service, with their embeddings and a built
+    EventIndexer so /rank can retrieve semantic candidates instead of
+    scoring the whole calendar on every request. The index is partitioned by
+    week of start_timestamp so past weeks can be dropped as time passes;
+    expire() drops the same events from the corpus itself.
+
+    storage: 'float32', or 'float16'/'int8' to keep both the embedding matrix
+    and the index compressed (see models.quantize).
+
+    Timestamps and tag ids (over a vocabulary kept across replaces) are
+    computed once here rather than on every /rank.
+    """
+    def __init__(self, dimension=384, path=None, storage='float32'):
+        self.dimension = dimension
+        self.path = path    # where the event metadata is persisted (optional)
+        self.storage = storage
+        self.index_type = STORAGE_INDEX_TYPES[storage]
+        self.vocabulary = TagVocabulary()
+        self._lock = threading.Lock()   # serializes replace() and expire()
+        self.generation = 0     # bumped by every replace()
+        self.current = CorpusSnapshot(
+            [], np.zeros((0, dimension), dtype=np.float32),
+            TimePartitionedIndexer(dimension, index_type=self.index_type),
+            np.zeros(0, dtype=np.float64), event_tag_index([], self.vocabulary)
+        )
+
+    @property
+    def events(self):
+        return self.current.events
+
+    @property
+    def embeddings(self):
+        return self.current.embeddings
+
+    @property
+    def positions(self):
+        return self.current.positions
+
+    @property
+    def indexer(self):
+        return self.current.indexer
+
+    @property
+    def timestamps(self):
+        return self.current.timestamps
+
+    @property
+    def tags(self):
+        return self.current.tags
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def __len__(self):
+        return len(self.current)
+
+    @property
+    def nbytes(self):
+        return self.current.nbytes
+
+    def replace(self, events, embeddings, if_generation=None):
+        """
+        Swap in a new event set. With if_generation, only if no replace()
+        happened since generation was read (e.g. restoring the saved corpus
+        must not overwrite one posted meanwhile); returns whether it swapped.
+        """
+        ids = [str(event.get('id')) for event in events]
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        # build the new index aside and swap, so in-flight searches never see a half-built one
+        indexer = TimePartitionedIndexer(self.dimension, index_type=self.index_type)
+        timestamps = event_timestamps(events)
+        indexer.build_index(embeddings, ids, timestamps)
+        tags = event_tag_index(events, self.vocabulary)
+        if self.storage != 'float32':
+            embeddings = QuantizedMatrix.from_float(embeddings, self.storage)
+        with self._lock:
+            if if_generation is not None and if_generation != self.generation:
+                return False
+            self.generation += 1
+            self.current = CorpusSnapshot(events, embeddings, indexer, timestamps, tags, self.generation)
+        self.save()
+        return True
+
+    def expire(self, now=None):
+        """Drop the events of past weeks from the index and the corpus; returns how many were dropped."""
+        with self._lock:
+            current = self.current
+            # expire a copy: requests holding the current snapshot may be searching its indexer
+            indexer, dropped = current.indexer.expired(time.time() if now is None else now)
+            if dropped:
+                rows = np.array([row for row, event in enumerate(current.events)
+                                 if indexer.contains(str(event.get('id')))], dtype=np.int64)
+                self.current = current.select(rows, indexer)
+        if dropped:
+            self.save()
+        return dropped
+
+    def view(self):
+        """The current snapshot, after expiring past weeks; hold it for a whole request."""
+        self.expire()
+        return self.current
+
+    def candidate_rows(self, query_emb, k=200, start=None, end=None):
+        """Rows of the current snapshot, see CorpusSnapshot.candidate_rows."""
+        return self.view().candidate_rows(query_emb, k, start, end)
+
+    def candidates(self, query_emb, k=200, start=None, end=None):
+        """Top-k candidate events (see candidate_rows) with their embedding rows."""
+        view = self.view()
+        rows = view.candidate_rows(query_emb, k, start, end)
+        return view.events_at(rows), view.embedding_rows(rows)
+
+    def events_at(self, rows):
+        return self.current.events_at(rows)
+
+    def embedding_rows(self, rows):
+        return self.current.embedding_rows(rows)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.current.events, f)
+        os.replace(tmp_path, self.path)
+
+    def load_saved(self):
+        """Events persisted by a previous run (empty list if none)."""
+        if not self.path or not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r') as f:
+            return json.load(f)
@@ -0,0 +1,196 @@
+"""
+Offline evaluation harness for comparing embedding models and query prompt
+templates.
+
+Event and query embeddings are persisted per model in an EmbeddingStore keyed
+by a hash of (model, text), so a rerun only encodes texts it has not seen:
+adding a model or a prompt costs just that candidate's encodes. Models are
+encoded in parallel worker processes (all of a model's prompts share its one
+loaded copy), and every metric is computed for all profiles at once.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from models.embeddings import Embedder, event_text
+from models.cache import EmbeddingCache
+from models.store import EmbeddingStore
+from scorer import DEFAULT_WEIGHTS, event_tag_index, event_timestamps, label_scores, recency_scores
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eval_cache')
+
+def load_events(fetch, snapshot_path, refresh=False):
+    """Events from snapshot_path, calling fetch() (and saving the result) only when missing or refresh."""
+    if not refresh and os.path.exists(snapshot_path):
+        with open(snapshot_path, 'r') as f:
+            return json.load(f)
+    events = fetch()
+    if events:
+        os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+        with open(snapshot_path, 'w') as f:
+            json.dump(events, f)
+    return events
+
+def render_prompt(template, profile):
+    """
+    Fill a prompt template from a profile. Fields: {major}, {year},
+    {interests} (comma separated) and {interest_words} (space separated).
+    """
+    interests = profile.get('interests', [])
+    return template.format(
+        major=profile.get('major', ''),
+        year=profile.get('year', ''),
+        interests=', '.join(interests),
+        interest_words=' '.join(interests)
+    ).strip()
+
+def _store_dimension(cache_dir, model_name, embedder):
+    """Dimension recorded by an existing store, so a fully cached model never has to load."""
+    meta_path = os.path.join(cache_dir, model_name.replace('/', '__'), 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            return json.load(f)['dimension']
+    return embedder.dimension
+
+def encode_cached(model_name, texts, cache_dir=DEFAULT_CACHE_DIR, embedder=None, threads=None):
+    """
+    (len(texts), D) embeddings for texts with model_name, read from the disk
+    store where present; only the misses are encoded (and then stored).
+    Returns (embeddings, number of texts encoded).
+    """
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    embedder = embedder or Embedder(model_name)
+    store = EmbeddingStore(cache_dir, model_name, _store_dimension(cache_dir, model_name, embedder))
+
+    unique = list(dict.fromkeys(texts))
+    keys = [EmbeddingCache.make_key(model_name, text) for text in unique]
+    vectors, missing = store.lookup(keys, keys)
+    if missing:
+        fresh = embedder.embed_texts([unique[i] for i in missing])
+        vectors[missing] = fresh
+        store.append([keys[i] for i in missing], [keys[i] for i in missing], fresh)
+    row = {text: i for i, text in enumerate(unique)}
+    return vectors[[row[text] for text in texts]], len(missing)
+
+def keyword_relevance(events, profiles):
+    """(P, N) bool: an event is relevant to a profile when its text mentions one of the profile's interests."""
+    texts = np.array([event_text(event).lower() for event in events])
+    relevance = np.zeros((len(profiles), len(events)), dtype=bool)
+    for p, profile in enumerate(profiles):
+        for term in profile.get('interests', []):
+            relevance[p] |= np.char.find(texts, term.lower()) >= 0
+    return relevance
+
+def ranking_metrics(scores, relevance, k=5):
+    """
+    Precision@k, nDCG@k and MRR for every profile at once.
+
+    scores, relevance: (P, N). Returns per-profile arrays plus 'top_k' (P, k).
+    """
+    k = min(k, scores.shape[1])
+    top = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    hits = np.take_along_axis(relevance, top, axis=1)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits * discounts).sum(axis=1)
+    n_relevant = np.minimum(relevance.sum(axis=1), k)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[n_relevant]
+    first = np.argmax(hits, axis=1)
+    return {
+        'top_k': top,
+        'precision': hits.mean(axis=1) if k else np.zeros(len(scores)),
+        'ndcg': np.divide(dcg, ideal, out=np.zeros(len(scores)), where=ideal > 0),
+        'mrr': np.where(hits.any(axis=1), 1.0 / (first + 1), 0.0)
+    }
+
+class EvaluationHarness:
+    """
+    Ranks every event for every profile under each (model, prompt) pair and
+    scores the rankings against keyword relevance (or a given (P, N) matrix).
+
+    embedders: optional {model name: Embedder} used in-process instead of
+    loading the model in a worker (e.g. an already loaded or test model).
+    """
+    def __init__(self, events, profiles, cache_dir=DEFAULT_CACHE_DIR, weights=None, k=5,
+                 relevance=None, workers=None, embedders=None):
+        self.events = events
+        self.profiles = profiles
+        self.cache_dir = cache_dir
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.k = k
+        self.workers = workers or os.cpu_count() or 1
+        self.embedders = embedders or {}
+        self.relevance = keyword_relevance(events, profiles) if relevance is None else relevance
+
+        # components that don't depend on the model or prompt, computed once
+        self.event_texts = [event_text(event) for event in events]
+        self.recency = recency_scores(event_timestamps(events))
+        tags = event_tag_index(events)
+        self.labels = np.vstack([label_scores(tags, p.get('interests', [])) for p in profiles]) if profiles \
+            else np.zeros((0, len(events)))
+        self.encoded = {}   # model name -> number of texts encoded (cache misses) in the last run
+
+    def _jobs(self, models, prompts):
+        jobs = {}
+        for model in models:
+            queries = [render_prompt(template, profile) for template in prompts.values() for profile in self.profiles]
+            jobs[model] = self.event_texts + queries
+        return jobs
+
+    def _encode_all(self, jobs):
+        results = {}
+        remote = [model for model in jobs if model not in self.embedders]
+        for model in jobs:
+            if model in self.embedders:
+                results[model] = encode_cached(model, jobs[model], self.cache_dir, self.embedders[model])
+        if len(remote) > 1 and self.workers > 1:
+            workers = min(self.workers, len(remote))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {model: pool.submit(encode_cached, model, jobs[model], self.cache_dir, None, threads)
+                           for model in remote}
+                results.update({model: future.result() for model, future in futures.items()})
+        else:
+            for model in remote:
+                results[model] = encode_cached(model, jobs[model], self.cache_dir)
+        return results
+
+    def run(self, models, prompts):
+        """
+        models: model names; prompts: {name: template} (see render_prompt).
+        Returns {(model, prompt name): metrics} where metrics holds per-profile
+        arrays from ranking_metrics() plus the mean of each.
+        """
+        jobs = self._jobs(models, prompts)
+        encoded = self._encode_all(jobs)
+        n_events, n_profiles = len(self.events), len(self.profiles)
+        w = self.weights
+
+        results = {}
+        for model in models:
+            vectors, self.encoded[model] = encoded[model]
+            event_embs = vectors[:n_events]
+            for p, name in enumerate(prompts):
+                queries = vectors[n_events + p * n_profiles:n_events + (p + 1) * n_profiles]
+                sims = np.clip(queries @ event_embs.T, 0.0, 1.0)
+                scores = w['sim'] * sims + w['label'] * self.labels + w['recency'] * self.recency[None, :]
+                metrics = ranking_metrics(scores, self.relevance, self.k)
+                metrics['summary'] = {m: float(metrics[m].mean()) if n_profiles else 0.0 for m in ('precision', 'ndcg', 'mrr')}
+                results[(model, name)] = metrics
+        return results
+
+def top_k_agreement(a, b):
+    """Mean per-profile overlap of two (P, k) top-k index arrays."""
+    return float(np.mean([len(set(x) & set(y)) / len(x) for x, y in zip(a, b)])) if len(a) else 0.0
+
+def print_results(results, k):
+    reference = next(iter(results.values()))['top_k'] if results else None
+    print(f"{'Model':<28} | {'Prompt':<24} | {'P@' + str(k):>6} | {'nDCG@' + str(k):>7} | {'MRR':>5} | {'Overlap':>7}")
+    print("-" * 92)
+    for (model, prompt), metrics in results.items():
+        s = metrics['summary']
+        print(f"{model[:28]:<28} | {prompt[:24]:<24} | {s['precision']:>6.3f} | {s['ndcg']:>7.3f} | {s['mrr']:>5.3f} | "
+              f"{top_k_agreement(metrics['top_k'], reference):>7.2f}")
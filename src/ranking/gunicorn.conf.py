@@ -0,0 +1,29 @@
+# Production serving: several worker processes sharing one memory-mapped corpus.
+#   cd src/ranking && gunicorn -c gunicorn.conf.py app:app
+#
+# Each worker loads its own model and embedding cache; the corpus embedding
+# matrix, ids, timestamps and tag ids are published once to CORPUS_DIR (see
+# shared_corpus.py) and mapped read-only by every worker, so adding workers
+# costs one model's memory each, independent of corpus size. A POST /corpus to
+# any worker publishes a new version that the others switch to on their next
+# request. Workers also share the on-disk EmbeddingStore, which serializes
+# appends across processes with a file lock. The app is imported after fork
+# (no preload_app): torch and the batching threads are not fork-safe, and the
+# shared pages come from the mapped files rather than copy-on-write.
+import multiprocessing
+import os
+
+os.environ.setdefault('CORPUS_MODE', 'shared')
+
+bind = os.environ.get('RANKING_BIND', '127.0.0.1:5001')
+workers = int(os.environ.get('RANKING_WORKERS', max(2, multiprocessing.cpu_count() // 2)))
+# threads let concurrent requests in one worker share a micro-batched encode
+worker_class = 'gthread'
+threads = int(os.environ.get('RANKING_THREADS', 4))
+preload_app = False
+timeout = int(os.environ.get('RANKING_TIMEOUT', 120))
+
+def post_worker_init(worker):
+    # warm up before the worker accepts connections
+    from app import start_warm_up
+    start_warm_up().join()
@@ -1,25 +1,326 @@
-import faiss
+import hashlib
+import heapq
+import time
 import numpy as np
 
+INDEX_TYPES = ('flat', 'sq_fp16', 'sq8', 'ivf_flat', 'ivf_pq', 'hnsw')
+
+def stable_id(event_id):
+    """Stable non-negative 64-bit id for an event id (same across processes and restarts)."""
+    digest = hashlib.blake2b(str(event_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & 0x7FFFFFFFFFFFFFFF
+
 class EventIndexer:
-    def __init__(self, dimension=384):
+    """
+    FAISS index over event embeddings, addressed by event id.
+
+    index_type:
+      'flat'      exact inner-product scan (default, fine for a few thousand events)
+      'sq_fp16'   flat scan over float16 codes (half the memory)
+      'sq8'       flat scan over 8-bit scalar-quantized codes (a quarter of the memory)
+      'ivf_flat'  inverted lists, searched with nprobe
+      'ivf_pq'    inverted lists + product quantized vectors (pq_m sub-quantizers)
+      'hnsw'      graph index, searched with ef_search
+
+    IVF and sq8 indexes are trained on a sample of at most train_size vectors the first
+    time they are built. HNSW cannot delete vectors, so removed/replaced events
+    are tombstoned and filtered out of results until the next build_index.
+    """
+    def __init__(self, dimension=384, index_type='flat', nlist=None, pq_m=None,
+                 hnsw_m=32, nprobe=8, ef_search=64, train_size=50000):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type '{index_type}', expected one of {INDEX_TYPES}")
+        self.dimension = dimension
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.train_size = train_size
+
+        self.id_map = {} # map faiss int64 ids to event ids
+        self.keys = {}   # event id -> faiss int64 id
+        self.tombstones = 0
+        self._next_key = 0
+        self._hnsw = None
+        self.pending_upserts = {}
+        self.pending_removals = set()
+        self.index = self._create_index(None) if index_type in ('flat', 'sq_fp16', 'hnsw') else None
+
+    def _create_index(self, train_vectors):
+        import faiss    # deferred so importing the service doesn't load faiss until an index is built
+        d = self.dimension
         # get index through inner product (cosine similarity bc vectors are normalized)
-        self.index = faiss.IndexFlatIP(dimension)
-        self.event_ids = [] # map faiss index to event ids
+        if self.index_type == 'flat':
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(d))
+        if self.index_type == 'hnsw':
+            self._hnsw = faiss.IndexHNSWFlat(d, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            return faiss.IndexIDMap(self._hnsw)
+        if self.index_type == 'sq_fp16':
+            return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT))
+        if self.index_type == 'sq8':
+            index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+            index.train(self._training_sample(train_vectors))
+            return faiss.IndexIDMap2(index)
+
+        n = len(train_vectors)
+        nlist = self.nlist or max(1, min(int(4 * np.sqrt(n)), n // 39 or 1))
+        quantizer = faiss.IndexFlatIP(d)
+        if self.index_type == 'ivf_flat':
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            m = self.pq_m or next(m for m in (48, 32, 24, 16, 8, 4, 2, 1) if d % m == 0)
+            # faiss wants ~39 training points per centroid, use fewer code bits on small corpora
+            nbits = int(min(8, max(1, np.log2(max(n / 39, 2)))))
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, m, nbits, faiss.METRIC_INNER_PRODUCT)
+
+        index.train(self._training_sample(train_vectors))
+        return index
+
+    def _training_sample(self, vectors):
+        if len(vectors) > self.train_size:
+            sample = np.random.default_rng(0).choice(len(vectors), self.train_size, replace=False)
+            vectors = vectors[np.sort(sample)]
+        return np.ascontiguousarray(vectors, dtype='float32')
+
+    @property
+    def event_ids(self):
+        return list(self.id_map.values())
+
+    @property
+    def supports_remove(self):
+        return self.index_type != 'hnsw'
 
     def build_index(self, embeddings, event_ids):
-        self.event_ids = event_ids
-        vectors = np.array(embeddings).astype('float32')
-        self.index.reset()
-        self.index.add(vectors)
+        # no copy when given a contiguous float32 matrix
+        vectors = np.ascontiguousarray(embeddings, dtype='float32').reshape(-1, self.dimension)
+        self.id_map, self.keys, self.tombstones = {}, {}, 0
+        self.index = self._create_index(vectors)
+        self.upsert(event_ids, vectors)
+
+    def contains(self, event_id):
+        return event_id in self.keys
+
+    def __len__(self):
+        return len(self.id_map)
+
+    def _key_for(self, event_id):
+        if self.supports_remove:
+            return stable_id(event_id)
+        # HNSW keeps dead vectors around, so every insert gets a fresh key
+        self._next_key += 1
+        return self._next_key
+
+    def upsert(self, event_ids, embeddings):
+        """Insert or replace vectors for the given event ids."""
+        if self.index is None:
+            raise RuntimeError(f"{self.index_type} index must be trained with build_index() before upsert()")
+        vectors = np.ascontiguousarray(embeddings, dtype='float32').reshape(-1, self.dimension)
+        if len(vectors) == 0:
+            return
+
+        # last occurrence wins when an id is repeated within one call
+        latest = {eid: i for i, eid in enumerate(event_ids)}
+        self.remove([eid for eid in latest if eid in self.keys])
+
+        rows = np.fromiter(latest.values(), dtype='int64', count=len(latest))
+        keys = np.array([self._key_for(eid) for eid in latest], dtype='int64')
+        self.index.add_with_ids(vectors[rows], keys)
+        for eid, key in zip(latest, keys):
+            self.id_map[int(key)] = eid
+            self.keys[eid] = int(key)
+
+    def remove(self, event_ids):
+        keys = [self.keys.pop(eid) for eid in event_ids if eid in self.keys]
+        for key in keys:
+            del self.id_map[key]
+        if not keys:
+            return
+        if self.supports_remove:
+            self.index.remove_ids(np.array(keys, dtype='int64'))
+        else:
+            self.tombstones += len(keys)
+
+    def stage_upsert(self, event_ids, embeddings):
+        """Queue changes; apply_pending() writes them to the index in one batch."""
+        for eid, vector in zip(event_ids, embeddings):
+            self.pending_removals.discard(eid)
+            self.pending_upserts[eid] = vector
+
+    def stage_remove(self, event_ids):
+        for eid in event_ids:
+            self.pending_upserts.pop(eid, None)
+            self.pending_removals.add(eid)
+
+    def apply_pending(self):
+        removals, upserts = list(self.pending_removals), self.pending_upserts
+        self.pending_removals, self.pending_upserts = set(), {}
+        if removals:
+            self.remove(removals)
+        if upserts:
+            self.upsert(list(upserts), np.array(list(upserts.values())))
+        return len(removals), len(upserts)
+
+    def search(self, query_emb, k=20, nprobe=None, ef_search=None, rescore=None, oversample=4):
+        """
+        Top-k (event id, similarity). rescore, if given, maps a list of event
+        ids to their exact float32 vectors: the (compressed) index then picks
+        k * oversample candidates and only those are rescored exactly.
+        """
+        if self.index is None or not self.id_map:
+            return []
+        if rescore is not None:
+            hits = self.search(query_emb, k=k * oversample, nprobe=nprobe, ef_search=ef_search)
+            ids = [eid for eid, _ in hits]
+            exact = np.asarray(rescore(ids), dtype='float32') @ np.asarray(query_emb, dtype='float32')
+            order = np.argsort(-exact, kind='stable')[:k]
+            return [(ids[i], float(exact[i])) for i in order]
+        if self.index_type in ('ivf_flat', 'ivf_pq'):
+            self.index.nprobe = nprobe or self.nprobe
+        elif self.index_type == 'hnsw':
+            self._hnsw.hnsw.efSearch = max(ef_search or self.ef_search, k)
 
-    def search(self, query_emb, k=20):
         query_vector = np.array([query_emb]).astype('float32')
-        distances, indices = self.index.search(query_vector, k)
-        
+        # over-fetch past tombstoned HNSW vectors so k live results can still come back
+        distances, indices = self.index.search(query_vector, min(k + self.tombstones, self.index.ntotal))
+
         results = []
         for dist, idx in zip(distances[0], indices[0]):
-            if idx != -1 and idx < len(self.event_ids):
-                results.append((self.event_ids[idx], float(dist)))
-                
-        return results
+            if idx != -1 and int(idx) in self.id_map:
+                results.append((self.id_map[int(idx)], float(dist)))
+
+        return results[:k]
+
+class TimePartitionedIndexer:
+    """
+    Events sharded into one EventIndexer per time bucket (a week of
+    start_timestamp by default).
+
+    Queries only touch the buckets overlapping the requested window, and
+    expire() drops whole buckets once they are in the past, so index size and
+    scan cost track upcoming events rather than the full history. Events
+    without a timestamp go to an undated bucket that never expires.
+    """
+    def __init__(self, dimension=384, bucket_seconds=7 * 86400, **index_kwargs):
+        self.dimension = dimension
+        self.bucket_seconds = bucket_seconds
+        self.index_kwargs = index_kwargs
+        self.buckets = {}       # bucket key -> EventIndexer
+        self.timestamps = {}    # event id -> start timestamp (None if undated)
+        self.bucket_of = {}     # event id -> bucket key
+        self._bucket_times = {} # bucket key -> float64 array of its events' timestamps, rebuilt after changes
+
+    def bucket_key(self, timestamp):
+        if timestamp is None or np.isnan(timestamp):
+            return None
+        return int(timestamp // self.bucket_seconds)
+
+    def __len__(self):
+        return len(self.bucket_of)
+
+    @property
+    def event_ids(self):
+        return list(self.bucket_of)
+
+    def contains(self, event_id):
+        return event_id in self.bucket_of
+
+    def build_index(self, embeddings, event_ids, timestamps):
+        self.buckets, self.timestamps, self.bucket_of, self._bucket_times = {}, {}, {}, {}
+        self.upsert(event_ids, embeddings, timestamps)
+
+    def upsert(self, event_ids, embeddings, timestamps):
+        vectors = np.ascontiguousarray(embeddings, dtype='float32').reshape(-1, self.dimension)
+        by_bucket = {}
+        for row, (eid, ts) in enumerate(zip(event_ids, timestamps)):
+            key = self.bucket_key(ts)
+            if eid in self.bucket_of and self.bucket_of[eid] != key:
+                self.remove([eid])      # rescheduled into another bucket
+            self.timestamps[eid] = None if key is None else float(ts)
+            self.bucket_of[eid] = key
+            by_bucket.setdefault(key, {})[eid] = row
+
+        for key, rows in by_bucket.items():
+            self._bucket_times.pop(key, None)
+            if key not in self.buckets:
+                self.buckets[key] = EventIndexer(self.dimension, **self.index_kwargs)
+                self.buckets[key].build_index(vectors[list(rows.values())], list(rows))
+            else:
+                self.buckets[key].upsert(list(rows), vectors[list(rows.values())])
+
+    def remove(self, event_ids):
+        by_bucket = {}
+        for eid in event_ids:
+            if eid in self.bucket_of:
+                self.timestamps.pop(eid)
+                by_bucket.setdefault(self.bucket_of.pop(eid), []).append(eid)
+        for key, eids in by_bucket.items():
+            self._bucket_times.pop(key, None)
+            self.buckets[key].remove(eids)
+            if not len(self.buckets[key]):
+                del self.buckets[key]
+
+    def bucket_times(self, key):
+        """Timestamps of the events in one (dated) bucket."""
+        times = self._bucket_times.get(key)
+        if times is None:
+            times = np.array([self.timestamps[eid] for eid in self.buckets[key].event_ids], dtype=np.float64)
+            self._bucket_times[key] = times
+        return times
+
+    def expire(self, now=None):
+        """Drop every bucket that ends before now; returns the number of events dropped."""
+        current = self.bucket_key(time.time() if now is None else now)
+        expired = [key for key in self.buckets if key is not None and key < current]
+        dropped = 0
+        for key in expired:
+            self._bucket_times.pop(key, None)
+            for eid in self.buckets.pop(key).event_ids:
+                del self.bucket_of[eid]
+                del self.timestamps[eid]
+                dropped += 1
+        return dropped
+
+    def expired(self, now=None):
+        """
+        Copy of this indexer without the buckets that end before now, as
+        (indexer, dropped). This one is left untouched so searches already
+        running on it are unaffected; the bucket indexes themselves are shared.
+        """
+        current = self.bucket_key(time.time() if now is None else now)
+        past = {key for key in self.buckets if key is not None and key < current}
+        if not past:
+            return self, 0
+        indexer = TimePartitionedIndexer(self.dimension, self.bucket_seconds, **self.index_kwargs)
+        indexer.buckets = {key: bucket for key, bucket in self.buckets.items() if key not in past}
+        indexer.bucket_of = {eid: key for eid, key in self.bucket_of.items() if key not in past}
+        indexer.timestamps = {eid: self.timestamps[eid] for eid in indexer.bucket_of}
+        indexer._bucket_times = {key: times for key, times in self._bucket_times.items() if key not in past}
+        return indexer, len(self.bucket_of) - len(indexer.bucket_of)
+
+    def search(self, query_emb, k=20, start=None, end=None, **search_kwargs):
+        """Top-k (event id, similarity) among events starting within [start, end]."""
+        first = self.bucket_key(start) if start is not None else None
+        last = self.bucket_key(end) if end is not None else None
+
+        def in_window(eid):
+            ts = self.timestamps[eid]
+            return ts is None or ((start is None or ts >= start) and (end is None or ts <= end))
+
+        hits = []
+        for key, bucket in self.buckets.items():
+            if key is not None and ((first is not None and key < first) or (last is not None and key > last)):
+                continue
+            edge = key is not None and key in (first, last)
+            # edge buckets also hold events outside the window, fetch enough to still return k
+            outside = 0
+            if edge:
+                times = self.bucket_times(key)
+                early = times < start if start is not None else np.zeros(len(times), dtype=bool)
+                outside = int(np.count_nonzero(early | (times > end) if end is not None else early))
+            for eid, score in bucket.search(query_emb, k=k + outside, **search_kwargs):
+                if not edge or in_window(eid):
+                    hits.append((eid, score))
+
+        return heapq.nlargest(k, hits, key=lambda hit: hit[1])
@@ -0,0 +1,114 @@
+"""
+Lightweight request instrumentation: per-request stage timers (rendered as a
+Server-Timing header) and process-wide histograms/gauges rendered in the
+Prometheus text format for /metrics. Recording a stage costs two
+perf_counter() calls and one locked bucket increment.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds, 0.5 ms .. 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+class RequestTimer:
+    """Stage durations for one request, in the order they were first recorded."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value, durations in ms."""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.total() * 1000:.2f}")
+        return ", ".join(parts)
+
+def _labels(label, value, extra=None):
+    pairs = [] if label is None else [f'{label}="{value}"']
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by one label."""
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}   # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_value, series in sorted(snapshot.items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = 'le="%s"' % ('+Inf' if bound == float('inf') else repr(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.label, label_value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label_value)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label, label_value)} {series[-1]}")
+        return lines
+
+class Gauge:
+    """Value read from fn() at scrape time; fn may return {label value: value}."""
+    def __init__(self, name, help, fn, label=None, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+        self.kind = kind
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.fn()
+        items = value.items() if isinstance(value, dict) else [(None, value)]
+        for label_value, v in items:
+            lines.append(f"{self.name}{_labels(self.label, label_value)} {float(v)}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        metric = Histogram(name, help, buckets, label)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, fn, label=None, kind='gauge'):
+        metric = Gauge(name, help, fn, label, kind)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,91 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """
+    Collects encode requests from concurrent handlers and runs them through
+    one batched Embedder.embed_texts call.
+
+    A batch is closed window_ms after its first request arrives, or as soon as
+    max_batch requests are waiting. Cache hits are answered immediately without
+    joining a batch.
+    """
+    def __init__(self, embedder, window_ms=2.0, max_batch=32, size_histogram=None):
+        self.embedder = embedder
+        self.size_histogram = size_histogram    # optional metrics.Histogram of batch sizes
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.max_seen = 0
+        self._worker = threading.Thread(target=self._run, name='encode-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        future = Future()
+        cached = self.embedder.cached(text)
+        if cached is not None:
+            future.set_result(cached)
+        else:
+            self._queue.put((text, future))
+        return future
+
+    def encode(self, text, timeout=None):
+        return self.submit(text).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return None
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)   # let the loop exit after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.embedder.embed_texts(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+            self.batches += 1
+            self.items += len(batch)
+            self.max_seen = max(self.max_seen, len(batch))
+            if self.size_histogram is not None:
+                self.size_histogram.observe(len(batch))
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_seen
+        }
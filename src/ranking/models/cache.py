@@ -0,0 +1,81 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache for embeddings, keyed by a hash of (model name, text).
+
+    Content addressing means an edited event gets a new key instead of its
+    stale vector, and old entries age out once max_bytes is exceeded (or after
+    ttl seconds, when set).
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=None, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()   # key -> (embedding, stored_at, size)
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def get(self, key, record_miss=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[1] > self.ttl:
+                self._drop(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                if record_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, embedding):
+        size = embedding.nbytes + sys.getsizeof(key)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (embedding, self.clock(), size)
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self.resident_bytes -= size
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,86 @@
+import json
+import numpy as np
+from models.embeddings import normalize_rows
+
+DEFAULT_PART_WEIGHTS = {'major': 0.5, 'interests': 0.4, 'year': 0.1}
+
+def load_majors(path):
+    """Flatten data/majors.json into {lowercased major name: description}."""
+    with open(path, 'r') as f:
+        raw_majors = json.load(f)
+
+    majors = {}
+    for category in raw_majors.values():
+        for item in category.get('programs', []):
+            majors[item.get('major', '').lower()] = item.get('description', '')
+    return majors
+
+def build_query_text(user_profile, majors_data):
+    """Full-text query: major name, its majors.json description, year and interests."""
+    interests_str = " ".join(user_profile.get('interests', []))
+    major_name = user_profile.get('major', '').strip()
+    year = user_profile.get('year', '')
+
+    major_context = ""
+    if major_name.lower() in majors_data:
+        major_context = majors_data[major_name.lower()]
+
+    query_text = f"{major_name} {major_context} {year} {interests_str}".strip()
+
+    if not query_text:
+        query_text = "general"
+    return query_text
+
+class QueryComposer:
+    """
+    Builds query vectors as a weighted, normalized sum of precomputed parts
+    (major description, year, each interest) instead of encoding the full
+    profile text, so most profiles need no model call at all.
+
+    Part vectors live in the embedder's cache; warm() encodes every major
+    description in one batch up front.
+    """
+    def __init__(self, embedder, majors_data, part_weights=None):
+        self.embedder = embedder
+        self.majors_data = majors_data
+        self.part_weights = part_weights or DEFAULT_PART_WEIGHTS
+        self.major_vectors = {}
+
+    def major_text(self, major_name):
+        return f"{major_name} {self.majors_data.get(major_name.lower(), '')}".strip()
+
+    def warm(self):
+        names = list(self.majors_data)
+        if names:
+            vectors = self.embedder.embed_texts([self.major_text(name) for name in names])
+            self.major_vectors = dict(zip(names, vectors))
+        return len(self.major_vectors)
+
+    def _major_vector(self, major_name):
+        vector = self.major_vectors.get(major_name.lower())
+        if vector is None:
+            vector = self.embedder.embed_text(self.major_text(major_name))
+        return vector
+
+    def compose(self, user_profile):
+        return self.compose_many([user_profile])[0]
+
+    def compose_many(self, user_profiles):
+        """(M, D) normalized query vectors; all uncached parts are encoded in one batch."""
+        interests = [[i.strip().lower() for i in p.get('interests', []) if i.strip()] for p in user_profiles]
+        years = [str(p.get('year', '')).strip() for p in user_profiles]
+        parts = sorted({i for group in interests for i in group} | {y for y in years if y})
+        part_vectors = dict(zip(parts, self.embedder.embed_texts(parts))) if parts else {}
+
+        queries = np.zeros((len(user_profiles), self.embedder.dimension), dtype=np.float32)
+        for row, (profile, profile_interests, year) in enumerate(zip(user_profiles, interests, years)):
+            major_name = profile.get('major', '').strip()
+            if major_name:
+                queries[row] += self.part_weights['major'] * self._major_vector(major_name)
+            if profile_interests:
+                queries[row] += self.part_weights['interests'] * np.mean([part_vectors[i] for i in profile_interests], axis=0)
+            if year:
+                queries[row] += self.part_weights['year'] * part_vectors[year]
+            if not queries[row].any():
+                queries[row] = self.embedder.embed_text("general")
+        return normalize_rows(queries)
@@ -1,23 +1,157 @@
-from sentence_transformers import SentenceTransformer
+import threading
+import time
 import numpy as np
+from models.cache import EmbeddingCache
+
+# output sizes of known models, so callers can size stores/indexes without loading the model
+KNOWN_DIMENSIONS = {'all-MiniLM-L6-v2': 384}
+
+WARMUP_TEXTS = [
+    "Computer Science Junior coding hackathon",
+    "Robotics Workshop Learn about robots and tech. technology engineering",
+    "Duke Chapel Choir concert featuring works by Bach and Handel, free and open to the public. music performance",
+]
+
+def load_model(model_name, backend='torch', model_dir=None):
+    if backend == 'onnx':
+        from models.onnx_backend import OnnxEncoder
+        return OnnxEncoder(model_dir)
+    if backend != 'torch':
+        raise ValueError(f"Unknown embedding backend '{backend}', expected 'torch' or 'onnx'")
+    # sentence_transformers pulls in torch, only import it when a model is actually needed
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def event_text(event):
+    """Text that gets embedded for an event (title, description and tags)."""
+    return f"{event.get('title', '')} {event.get('description', '')} {' '.join(event.get('tags', []))}"
+
+def normalize_rows(matrix):
+    """L2-normalize each row (rows with zero norm are left untouched)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
 
 class Embedder:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
-        self.cache = {}
+    """
+    Sentence embedding model with a shared embedding cache.
+
+    The model is loaded on first use (or by warm_up()), so constructing an
+    Embedder is cheap for tools and tests that never encode anything.
+
+    backend: 'torch' (SentenceTransformer, eager PyTorch) or 'onnx' (the
+    exported int8 graph in model_dir, see models/onnx_backend.py). Their
+    vectors differ slightly, so they get separate cache/store namespaces.
+    """
+    def __init__(self, model_name='all-MiniLM-L6-v2', batch_size=32, cache_bytes=256 * 1024 * 1024, cache_ttl=None,
+                 model=None, backend='torch', model_dir=None):
+        if backend not in ('torch', 'onnx'):
+            raise ValueError(f"Unknown embedding backend '{backend}', expected 'torch' or 'onnx'")
+        self.model_name = model_name
+        self.backend = backend
+        self.model_dir = model_dir
+        # the exported model's metadata, checked up front rather than on the first encode
+        self.export_config = None
+        if backend == 'onnx' and model is None:
+            from models.onnx_backend import read_config
+            self.export_config = read_config(model_dir)
+        self.model_id = model_name if backend == 'torch' else f"{model_name}-{backend}"
+        self._model = model
+        self._model_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.cache = EmbeddingCache(max_bytes=cache_bytes, ttl=cache_ttl)
+        self.warmed_up = False
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_model(self.model_name, self.backend, self.model_dir)
+        return self._model
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def dimension(self):
+        if self._model is None and self.export_config is not None:
+            return self.export_config['dimension']
+        if self._model is None and self.model_name in KNOWN_DIMENSIONS:
+            return KNOWN_DIMENSIONS[self.model_name]
+        return self.model.get_sentence_embedding_dimension()
+
+    def warm_up(self, texts=WARMUP_TEXTS, rounds=3):
+        """
+        Load the model and run representative encodes (single and batched) so
+        the first real request doesn't pay for lazy initialization. Bypasses
+        the cache. Returns the seconds spent.
+        """
+        start = time.perf_counter()
+        for _ in range(rounds):
+            self.model.encode(texts[:1])
+            self.model.encode(list(texts), batch_size=len(texts))
+        self.warmed_up = True
+        return time.perf_counter() - start
+
+    def cache_key(self, text):
+        return EmbeddingCache.make_key(self.model_id, text)
+
+    def cached(self, text):
+        """Cached embedding for text, or None (a miss here isn't counted, the encode will count it)."""
+        return self.cache.get(self.cache_key(text), record_miss=False)
 
     def embed_text(self, text):
-        if text in self.cache:
-            return self.cache[text]
-        
-        embedding = self.model.encode([text])[0]
+        key = self.cache_key(text)
+        embedding = self.cache.get(key)
+        if embedding is not None:
+            return embedding
+
         # normalize for cosine similarity
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
-            
-        self.cache[text] = embedding
+        embedding = normalize_rows(self.model.encode([text]))[0]
+
+        self.cache.put(key, embedding)
         return embedding
 
+    def _token_lengths(self, texts):
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None:
+            return [len(text.split()) for text in texts]
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)['input_ids']]
+
     def embed_texts(self, texts):
-        return [self.embed_text(text) for text in texts]
+        """
+        Embed many texts at once and return an (N, D) array in input order.
+
+        Duplicates and cache hits are skipped; the remaining texts are sorted by
+        token length and encoded in buckets of batch_size so each forward pass
+        pads to a similar length.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        unique = list(dict.fromkeys(texts))
+        found = {}
+        for text in unique:
+            embedding = self.cache.get(self.cache_key(text))
+            if embedding is not None:
+                found[text] = embedding
+
+        misses = [text for text in unique if text not in found]
+        if misses:
+            lengths = self._token_lengths(misses)
+            by_length = [misses[i] for i in np.argsort(lengths, kind='stable')]
+
+            buckets = [by_length[i:i + self.batch_size] for i in range(0, len(by_length), self.batch_size)]
+            encoded = np.concatenate([
+                self.model.encode(bucket, batch_size=len(bucket), convert_to_numpy=True)
+                for bucket in buckets
+            ])
+            for text, embedding in zip(by_length, normalize_rows(encoded)):
+                found[text] = embedding
+                self.cache.put(self.cache_key(text), embedding)
+
+        return np.stack([found[text] for text in texts])
@@ -0,0 +1,143 @@
+"""
+Exported ONNX inference backend for Embedder.
+
+export_onnx() traces the SentenceTransformer's transformer to an ONNX graph
+and writes a dynamically int8-quantized copy next to it; OnnxEncoder runs that
+graph with onnxruntime on CPU from the model directory on disk, exposing the
+subset of the SentenceTransformer API that Embedder uses.
+
+Requires the optional packages onnx and onnxruntime:
+    pip install onnx onnxruntime
+    python models/onnx_backend.py --output models/onnx/all-MiniLM-L6-v2
+"""
+import argparse
+import json
+import os
+import numpy as np
+
+CONFIG_FILE = 'embedder_config.json'
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+
+def export_onnx(model, output_dir, quantize=True, opset=17):
+    """Export a SentenceTransformer (or model name) to output_dir; returns the config written."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model_name = model if isinstance(model, str) else None
+    if isinstance(model, str):
+        model = SentenceTransformer(model)
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    os.makedirs(output_dir, exist_ok=True)
+
+    sample = tokenizer(["Robotics Workshop", "Learn about robots and tech."], padding=True, return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs))).last_hidden_state
+
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(transformer), tuple(sample[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes, opset_version=opset, dynamo=False
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILE), weight_type=QuantType.QInt8)
+
+    config = {
+        "source_model": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pooling": "mean",
+        "quantized": quantize
+    }
+    with open(os.path.join(output_dir, CONFIG_FILE), 'w') as f:
+        json.dump(config, f, indent=2)
+    return config
+
+def read_config(model_dir):
+    """Config written by export_onnx() (dimension, max_seq_length, ...); fails early on a bad model_dir."""
+    if not model_dir:
+        raise ValueError("The onnx backend needs the exported model directory (EMBEDDING_MODEL_DIR)")
+    path = os.path.join(model_dir, CONFIG_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No exported model at {model_dir} ({CONFIG_FILE} missing); run export_onnx() first")
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class OnnxEncoder:
+    """Mean-pooled sentence embeddings from an exported graph, run with onnxruntime on CPU."""
+    def __init__(self, model_dir, quantized=True, threads=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.config = read_config(model_dir)
+        path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No exported graph at {path}; run export_onnx() first")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = self.config['max_seq_length']
+
+    def get_sentence_embedding_dimension(self):
+        return self.config['dimension']
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        texts = list(texts)
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors='np'
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = feeds['attention_mask'][..., None].astype(np.float32)
+            outputs.append((hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        if not outputs:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32)
+
+def cosine_agreement(reference, candidate, texts, threshold=0.98):
+    """
+    Row-wise cosine between two embedders' vectors for the same texts (encoded
+    directly, bypassing caches). passed is True when the minimum clears threshold.
+    """
+    a = reference.model.encode(list(texts))
+    b = candidate.model.encode(list(texts))
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    cosines = np.sum(a * b, axis=1)
+    return {
+        "min": float(cosines.min()),
+        "mean": float(cosines.mean()),
+        "threshold": threshold,
+        "passed": bool(cosines.min() >= threshold)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a sentence-transformers model to ONNX (+ dynamic int8)")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--output', required=True, help="directory to write the exported model to")
+    parser.add_argument('--no-quantize', action='store_true')
+    args = parser.parse_args()
+    print(json.dumps(export_onnx(args.model, args.output, quantize=not args.no_quantize), indent=2))
@@ -0,0 +1,83 @@
+import numpy as np
+
+STORAGE_MODES = ('float32', 'float16', 'int8')
+
+class QuantizedMatrix:
+    """
+    Compact (N, D) embedding matrix.
+
+    float16 halves memory; int8 stores each row scaled by its own max-abs
+    value (about 4x smaller than float32). similarities() scores a query
+    directly against the compressed rows in fixed-size chunks, so the full
+    float32 matrix is never materialized.
+    """
+    def __init__(self, data, scales=None, mode='float32'):
+        self.data = data
+        self.scales = scales
+        self.mode = mode
+
+    @classmethod
+    def from_float(cls, matrix, mode='int8'):
+        if mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode '{mode}', expected one of {STORAGE_MODES}")
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if mode == 'float32':
+            return cls(matrix, mode=mode)
+        if mode == 'float16':
+            return cls(matrix.astype(np.float16), mode=mode)
+
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.round(matrix / scales[:, None]).astype(np.int8)
+        return cls(data, scales.astype(np.float32), mode)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rows(self, rows):
+        """Dequantized float32 copy of the selected rows."""
+        out = self.data[rows].astype(np.float32)
+        if self.scales is not None:
+            out *= self.scales[rows][..., None]
+        return out
+
+    def similarities(self, query, chunk_rows=65536):
+        """
+        Inner products computed on the compressed data: (N,) for one (D,)
+        query, (M, N) for an (M, D) batch of queries.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        queries = np.atleast_2d(query)
+        out = np.empty((len(self.data), len(queries)), dtype=np.float32)
+        for start in range(0, len(self.data), chunk_rows):
+            block = self.data[start:start + chunk_rows]
+            out[start:start + len(block)] = np.asarray(block, dtype=np.float32) @ queries.T
+        if self.scales is not None:
+            out *= self.scales[:, None]
+        return out[:, 0] if query.ndim == 1 else out.T
+
+    def search(self, query, k=20, exact=None, oversample=4):
+        """
+        Top-k (row, similarity) pairs. With exact (the float32 matrix, e.g. a
+        memory-mapped EmbeddingStore) the compressed pass picks k * oversample
+        candidates and only those are rescored exactly.
+        """
+        sims = self.similarities(query)
+        n_first = min(len(sims), k * oversample if exact is not None else k)
+        if n_first == 0:
+            return []
+        first = np.argpartition(-sims, n_first - 1)[:n_first]
+        if exact is not None:
+            exact_sims = np.asarray(exact[first], dtype=np.float32) @ np.asarray(query, dtype=np.float32)
+            order = np.argsort(-exact_sims, kind='stable')[:k]
+            return [(int(first[i]), float(exact_sims[i])) for i in order]
+        order = first[np.argsort(-sims[first], kind='stable')]
+        return [(int(i), float(sims[i])) for i in order]
@@ -0,0 +1,213 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+FORMAT_VERSION = 1
+
+class EmbeddingStore:
+    """
+    Append-only on-disk event embedding store.
+
+    Layout under <root>/<model name>/:
+      meta.json     model name, dimension and format version
+      vectors.f32   raw float32 rows, opened with np.memmap (no copy on load)
+      index.jsonl   one {"id", "hash", "row"} line per appended row
+      store.lock    flock()ed so several processes can share the store
+
+    An event whose content hash changes is appended again and the newer row
+    wins; compact() rewrites the files without the superseded rows.
+
+    Several server processes may open the same store: writers hold an
+    exclusive lock, take the next row from the size of vectors.f32 and
+    first replay index lines other processes appended; readers replay new
+    lines (under a shared lock) whenever index.jsonl has changed.
+    """
+    def __init__(self, root, model_name, dimension=384):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.path = os.path.join(root, model_name.replace('/', '__'))
+        self.vectors_path = os.path.join(self.path, 'vectors.f32')
+        self.index_path = os.path.join(self.path, 'index.jsonl')
+        self.meta_path = os.path.join(self.path, 'meta.json')
+        self.lock_path = os.path.join(self.path, 'store.lock')
+        self._lock = threading.Lock()
+        self.rows = {}      # event id -> (row, content hash)
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._index_state = None    # (inode, bytes) of index.jsonl already applied to rows
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    def _meta(self):
+        return {"model": self.model_name, "dimension": self.dimension, "version": FORMAT_VERSION}
+
+    @contextmanager
+    def _file_lock(self, mode=fcntl.LOCK_EX):
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        with self._lock, self._file_lock():
+            meta = None
+            if os.path.exists(self.meta_path):
+                with open(self.meta_path, 'r') as f:
+                    meta = json.load(f)
+            if meta != self._meta():
+                # different model/dimension/format: start a fresh store
+                self._reset()
+            else:
+                self._sync()
+
+    def _index_stat(self):
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def _sync(self):
+        """
+        Apply index lines appended since the last sync (by any process), then
+        remap and publish rows. Caller holds _lock and a file lock.
+        """
+        inode, size = self._index_stat()
+        if self._index_state == (inode, size) and inode is not None:
+            return
+        rows, offset = self.rows, 0
+        if self._index_state is not None and self._index_state[0] == inode and self._index_state[1] <= size:
+            offset = self._index_state[1]
+        else:
+            rows = {}   # first load, or the files were rewritten by compact()/reset
+        if inode is not None and size > offset:
+            rows = dict(rows)
+            with open(self.index_path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break   # torn write from a crash, dropped by the next append
+                    offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    rows[entry['id']] = (entry['row'], entry['hash'])
+        n_rows = os.path.getsize(self.vectors_path) // (4 * self.dimension) if os.path.exists(self.vectors_path) else 0
+        if rows is not self.rows:
+            # rows whose vectors never made it to disk (a writer crashed in between) are dropped
+            rows = {eid: entry for eid, entry in rows.items() if entry[0] < n_rows}
+        # grow the mapping before publishing the new rows, so no reader sees a row past its end
+        self._remap(n_rows)
+        self.rows = rows
+        self._index_state = (inode, offset)
+
+    def _reset(self):
+        for path in (self.vectors_path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+        with open(self.meta_path, 'w') as f:
+            json.dump(self._meta(), f)
+        self.rows = {}
+        self._remap(0)
+        self._index_state = None
+
+    def _remap(self, n_rows):
+        if n_rows == 0:
+            self.matrix = np.zeros((0, self.dimension), dtype=np.float32)
+        else:
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(n_rows, self.dimension))
+
+    def refresh(self):
+        """Pick up rows other processes appended (cheap when index.jsonl is unchanged)."""
+        if self._index_stat() == self._index_state:
+            return
+        with self._lock, self._file_lock(fcntl.LOCK_SH):
+            self._sync()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, event_id):
+        return event_id in self.rows
+
+    def ids(self):
+        return list(self.rows)
+
+    def live_rows(self):
+        """(ids, row indices) of the current version of every stored event."""
+        ids = list(self.rows)
+        return ids, np.array([self.rows[i][0] for i in ids], dtype=np.int64)
+
+    def lookup(self, event_ids, content_hashes):
+        """
+        Fetch stored vectors for the given events.
+
+        Returns an (N, D) float32 array with stored rows filled in, and the
+        positions whose id is unknown or whose content hash has changed.
+        """
+        self.refresh()
+        with self._lock:
+            # rows and matrix are swapped together by _sync, read them as a pair
+            stored, matrix = self.rows, self.matrix
+        out = np.zeros((len(event_ids), self.dimension), dtype=np.float32)
+        found, rows, missing = [], [], []
+        for i, (eid, content_hash) in enumerate(zip(event_ids, content_hashes)):
+            entry = stored.get(eid)
+            if entry is not None and entry[1] == content_hash:
+                found.append(i)
+                rows.append(entry[0])
+            else:
+                missing.append(i)
+        if found:
+            out[found] = matrix[rows]
+        return out, missing
+
+    def append(self, event_ids, content_hashes, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        row_bytes = 4 * self.dimension
+        with self._lock, self._file_lock():
+            self._sync()
+            size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+            start = size // row_bytes
+            with open(self.vectors_path, 'ab') as f:
+                f.truncate(start * row_bytes)     # drop a torn partial row
+                f.write(vectors.tobytes())
+            self._drop_torn_index_tail()
+            with open(self.index_path, 'a') as f:
+                for offset, (eid, content_hash) in enumerate(zip(event_ids, content_hashes)):
+                    f.write(json.dumps({"id": eid, "hash": content_hash, "row": start + offset}) + "\n")
+            self._sync()
+
+    def _drop_torn_index_tail(self):
+        if not os.path.exists(self.index_path) or not os.path.getsize(self.index_path):
+            return
+        with open(self.index_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b'\n':
+                return
+            f.seek(0)
+            data = f.read()
+            f.truncate(data.rfind(b'\n') + 1)
+
+    def compact(self):
+        """Rewrite the store keeping only the live row of each event."""
+        with self._lock, self._file_lock():
+            self._sync()
+            ids, rows = self.live_rows()
+            hashes = [self.rows[i][1] for i in ids]
+            vectors = np.asarray(self.matrix[rows])
+            # write aside and swap; other processes see a new index inode and reload
+            with open(self.vectors_path + '.tmp', 'wb') as f:
+                f.write(vectors.tobytes())
+            with open(self.index_path + '.tmp', 'w') as f:
+                for row, (eid, content_hash) in enumerate(zip(ids, hashes)):
+                    f.write(json.dumps({"id": eid, "hash": content_hash, "row": row}) + "\n")
+            os.replace(self.vectors_path + '.tmp', self.vectors_path)
+            os.replace(self.index_path + '.tmp', self.index_path)
+            self._index_state = None
+            self._sync()
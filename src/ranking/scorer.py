@@ -1,23 +1,37 @@
-from datetime import datetime
+from datetime import datetime, timezone
+import time
+from contextlib import nullcontext
 import numpy as np
+from tags import EventTags
+
+DEFAULT_WEIGHTS = {'sim': 0.7, 'label': 0.1, 'recency': 0.2}
+
+SECONDS_PER_DAY = 86400.0
+
+def parse_timestamp(event_time):
+    """Convert an ISO string or unix timestamp to epoch seconds (None if unparseable)."""
+    if isinstance(event_time, str):
+        return datetime.fromisoformat(event_time.replace('Z', '+00:00')).timestamp()
+    elif isinstance(event_time, (int, float)):
+        return float(event_time)
+    return None
 
 def calculate_recency_score(event_time_str):
     try:
         if isinstance(event_time_str, str):
             event_date = datetime.fromisoformat(event_time_str.replace('Z', '+00:00'))
         elif isinstance(event_time_str, (int, float)):
-            from datetime import timezone
             event_date = datetime.fromtimestamp(event_time_str, tz=timezone.utc)
         else:
             return 0.0
-            
+
         now = datetime.now(event_date.tzinfo)
         delta = event_date - now
         days = delta.days
 
         if days < 0:        # event already passed
-            return 0.0 
-        
+            return 0.0
+
         # linear decay over 30 days
         score = max(0.0, 1.0 - (days / 30.0))
         return score
@@ -25,55 +39,227 @@ def calculate_recency_score(event_time_str):
         print(f"Error calculating recency: {e}")
         return 0.0
 
-def score_events(query_emb, event_embs, event_metadata, user_profile, weights=None):
+def event_timestamps(event_metadata):
+    """Parse every event's start_timestamp once into a float64 array (NaN when missing/invalid)."""
+    timestamps = np.full(len(event_metadata), np.nan, dtype=np.float64)
+    for i, event in enumerate(event_metadata):
+        try:
+            ts = parse_timestamp(event.get('start_timestamp'))
+        except Exception as e:
+            print(f"Error calculating recency: {e}")
+            continue
+        if ts is not None:
+            timestamps[i] = ts
+    return timestamps
+
+def event_tag_lists(event_metadata):
+    """Lowercase every event's tags once so they can be reused across requests."""
+    return [[t.lower() for t in event.get('tags', [])] for event in event_metadata]
+
+def recency_scores(timestamps, now=None):
+    """Vectorized calculate_recency_score over an array of epoch seconds."""
+    if now is None:
+        now = time.time()
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    # timedelta.days floors toward -inf, so floor here as well
+    days = np.floor((timestamps - now) / SECONDS_PER_DAY)
+    with np.errstate(invalid='ignore'):
+        scores = np.clip(1.0 - days / 30.0, 0.0, 1.0)
+        scores[days < 0] = 0.0
+    return np.nan_to_num(scores, nan=0.0)
+
+def event_tag_index(event_metadata, vocabulary=None):
+    """Events' tags as integer ids (tags.EventTags), for label_scores."""
+    return EventTags.from_events(event_metadata, vocabulary)
+
+def label_scores(event_tags, user_interests):
+    """
+    Fraction of user interests matched by an event's tags, capped at 1: each
+    tag containing any interest as a substring (case-insensitive) counts once.
+
+    event_tags: EventTags from event_tag_index() or lowercased tag lists.
+    """
+    if not isinstance(event_tags, EventTags):
+        event_tags = EventTags.from_lists(event_tags)
+    if not user_interests:
+        return np.zeros(len(event_tags), dtype=np.float64)
+    return np.minimum(1.0, event_tags.match_counts(user_interests) / len(user_interests))
+
+def score_matrix(query_emb, event_matrix, timestamps, event_tags, user_profile, weights=None, now=None, provisional=None):
+    """
+    Columnar scoring engine: scores all N events with a handful of numpy ops.
+
+    query_emb: (D,) normalized query vector
+    event_matrix: (N, D) stacked normalized event embeddings, or a compressed
+        matrix exposing similarities(query) (see models.quantize.QuantizedMatrix)
+    timestamps: (N,) epoch seconds from event_timestamps()
+    event_tags: EventTags from event_tag_index() (or lowercased tag lists)
+    now: reference epoch seconds shared by every event (defaults to time.time())
+    provisional: optional (N,) bool mask of events with no embedding yet; they
+        are scored on label + recency alone with those two weights renormalized
+
+    Returns a dict of (N,) arrays: 'score', 'sim', 'label', 'recency' (and
+    'provisional' when a mask was given).
+    """
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+
+    query = np.asarray(query_emb, dtype=np.float32)
+    if not hasattr(event_matrix, 'similarities'):
+        event_matrix = np.asarray(event_matrix, dtype=np.float32)
+
+    if len(event_matrix) == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return {'score': empty, 'sim': empty, 'label': empty, 'recency': empty}
+
+    if hasattr(event_matrix, 'similarities'):
+        raw_sim = event_matrix.similarities(query)
+    else:
+        raw_sim = event_matrix @ query
+    sim = np.clip(raw_sim, 0.0, 1.0).astype(np.float64)
+    label = label_scores(event_tags, user_profile.get('interests', []))
+    recency = recency_scores(timestamps, now)
+
+    score = weights['sim'] * sim + weights['label'] * label + weights['recency'] * recency
+    components = {'score': score, 'sim': sim, 'label': label, 'recency': recency}
+
+    if provisional is not None and np.any(provisional):
+        provisional = np.asarray(provisional, dtype=bool)
+        other = weights['label'] + weights['recency']
+        fallback = (weights['label'] * label + weights['recency'] * recency) / other if other else np.zeros_like(score)
+        sim[provisional] = 0.0
+        score[provisional] = fallback[provisional]
+        components['provisional'] = provisional
+    return components
+
+def build_results(event_ids, components, order=None):
+    """Turn the columnar scores into the ranked list of dicts returned by /rank."""
+    score = components['score']
+    sim, label, recency = components['sim'], components['label'], components['recency']
+    provisional = components.get('provisional')
+    if order is None:
+        order = rank_order(score)
+
+    results = [{
+        'id': event_ids[i],
+        'score': round(float(score[i]), 2),
+        'details': {
+            'sim': round(float(sim[i]), 2),
+            'label': round(float(label[i]), 2),
+            'recency': round(float(recency[i]), 2)
+        }
+    } for i in order]
+    if provisional is not None:
+        for result, i in zip(results, order):
+            if provisional[i]:
+                result['details']['provisional'] = True
+    return results
+
+def build_columns(event_ids, components, order=None, details=False):
+    """
+    Columnar form of build_results: parallel 'ids' and 'scores' lists (plus
+    'sim'/'label'/'recency' columns with details) and the ids of provisional rows.
+    """
+    if order is None:
+        order = rank_order(components['score'])
+    columns = {
+        'ids': [event_ids[i] for i in order],
+        'scores': np.round(components['score'][order], 2).tolist()
+    }
+    if details:
+        for name in ('sim', 'label', 'recency'):
+            columns[name] = np.round(components[name][order], 2).tolist()
+    provisional = components.get('provisional')
+    if provisional is not None:
+        columns['provisional'] = [event_ids[i] for i in order if provisional[i]]
+    return columns
+
+def rank_order(scores, limit=None, offset=0):
+    """
+    Indices sorted by rounded score, descending, ties kept in input order.
+
+    With limit, only rows [offset, offset + limit) of that order are returned,
+    found with argpartition so just the selected rows are sorted.
+    """
+    rounded = np.round(scores, 2)
+    end = len(rounded) if limit is None else min(len(rounded), offset + limit)
+    if end <= offset:
+        return np.zeros(0, dtype=np.intp)
+    if end == len(rounded):
+        return np.argsort(-rounded, kind='stable')[offset:]
+    # every row scoring at least the end-th best, ties included, kept in input order
+    threshold = -np.partition(-rounded, end - 1)[end - 1]
+    selected = np.flatnonzero(rounded >= threshold)
+    return selected[np.argsort(-rounded[selected], kind='stable')][offset:end]
+
+def score_events(query_emb, event_embs, event_metadata, user_profile, weights=None, provisional=None,
+                 columnar=False, details=False, limit=None, offset=0, timestamps=None, event_tags=None,
+                 timer=None, now=None):
     """
     Score events based on:
     1. Semantic similarity (query_emb vs event_embs)
     2. Label matching (user_profile vs event tags)
     3. Recency
-    
+
     weights: dict with keys 'sim', 'label', 'recency'
+    provisional: optional bool mask of events still waiting for an embedding
+    limit, offset: return only that page of the ranking (all rows by default)
+    columnar: return build_columns() output instead of a list of dicts
+        (details: include the sim/label/recency columns)
+    timestamps, event_tags: the events' columns when already computed at ingest
+        (event_timestamps() / event_tag_index(), see corpus.EventCorpus)
+    timer: optional metrics.RequestTimer; records 'score', 'sort' and 'build' stages
+    now: reference epoch seconds for recency (defaults to time.time())
+    """
+    stage = timer.stage if timer is not None else (lambda name: nullcontext())
+    with stage('score'):
+        components = score_matrix(
+            query_emb,
+            event_embs,
+            event_timestamps(event_metadata) if timestamps is None else timestamps,
+            event_tag_index(event_metadata) if event_tags is None else event_tags,
+            user_profile,
+            weights,
+            now=now,
+            provisional=provisional
+        )
+    with stage('sort'):
+        order = rank_order(components['score'], limit, offset)
+    with stage('build'):
+        event_ids = [event['id'] for event in event_metadata]
+        if columnar:
+            return build_columns(event_ids, components, order, details=details)
+        return build_results(event_ids, components, order)
+
+def score_events_batch(query_embs, event_embs, event_metadata, user_profiles, weights=None, top_k=None, now=None,
+                       timestamps=None, event_tags=None):
+    """
+    Rank one event set for many profiles.
+
+    Similarities for all M profiles come from a single (M, D) x (D, N) product;
+    timestamps, tags and recency are computed once and shared. Yields each
+    profile's ranked list (top_k rows, or all) as soon as it is ready.
+    timestamps/event_tags may be passed precomputed, as in score_events.
     """
     if weights is None:
-        weights = {'sim': 0.7, 'label': 0.1, 'recency': 0.2}
+        weights = DEFAULT_WEIGHTS
 
-    scored_events = []
-        
-    for i, event in enumerate(event_metadata):
-        # 1. semantic similarity
-        sim_score = np.dot(query_emb, event_embs[i])
-        sim_score = float(max(0.0, min(1.0, sim_score))) # clip to 0-1
-
-        # 2. label match
-        user_interests = [x.lower() for x in user_profile.get('interests', [])]
-        event_tags = [x.lower() for x in event.get('tags', [])]
-        
-        matches = 0
-        if user_interests:
-            matches = sum(1 for tag in event_tags if any(intr in tag for intr in user_interests))
-            label_score = float(min(1.0, matches / len(user_interests)))
-        else:
-            label_score = 0.0
+    event_ids = [event['id'] for event in event_metadata]
+    if event_tags is None:
+        event_tags = event_tag_index(event_metadata)
+    if timestamps is None:
+        timestamps = event_timestamps(event_metadata)
+    recency = recency_scores(timestamps, now)
 
-        # 3. recency
-        recency_score = float(calculate_recency_score(event.get('start_timestamp')))
+    queries = np.asarray(query_embs, dtype=np.float32)
+    if hasattr(event_embs, 'similarities'):
+        raw_sims = event_embs.similarities(queries)
+    else:
+        raw_sims = queries @ np.asarray(event_embs, dtype=np.float32).reshape(-1, queries.shape[-1]).T
+    sims = np.clip(raw_sims, 0.0, 1.0).astype(np.float64)
 
-        # final score
-        final_score = float(
-            weights['sim'] * sim_score + 
-            weights['label'] * label_score + 
-            weights['recency'] * recency_score
-        )
-        
-        scored_events.append({
-            'id': event['id'],
-            'score': round(final_score, 2),
-            'details': {
-                'sim': round(sim_score, 2),
-                'label': round(label_score, 2), 
-                'recency': round(recency_score, 2)
-            }
-        })
-
-    scored_events.sort(key=lambda x: x['score'], reverse=True)
-    return scored_events
+    for sim, profile in zip(sims, user_profiles):
+        label = label_scores(event_tags, profile.get('interests', []))
+        score = weights['sim'] * sim + weights['label'] * label + weights['recency'] * recency
+        order = rank_order(score, top_k)
+        yield build_results(event_ids, {'score': score, 'sim': sim, 'label': label, 'recency': recency}, order)
@@ -0,0 +1,212 @@
+"""
+Corpus shared by several server processes through memory-mapped files.
+
+Each published corpus is an immutable version directory under root:
+
+  versions/<n>/meta.json        version, count, dimension, storage
+  versions/<n>/embeddings.npy   (N, D) float32 / float16 / int8 rows
+  versions/<n>/scales.npy       int8 only: per-row scales
+  versions/<n>/ids.npy          (N,) fixed-width event ids
+  versions/<n>/timestamps.npy   (N,) float64 start times, NaN when undated
+  versions/<n>/tag_*.npy        CSR tag ids (see tags.EventTags)
+  versions/<n>/vocabulary.json  tag strings, in id order
+  CURRENT                       name of the live version
+
+Workers open the arrays with np.load(mmap_mode='r'), so every process maps
+the same page-cache pages and per-worker memory does not grow with the
+corpus. publish() writes a new version next to the live one and swaps
+CURRENT with os.replace; each worker notices the new pointer on its next
+view() and switches with a single reference assignment, so a request keeps
+reading the version it started with.
+"""
+import fcntl
+import json
+import os
+import shutil
+import numpy as np
+
+from corpus import EventCorpus, in_window
+from scorer import event_timestamps, event_tag_index
+from tags import EventTags, TagVocabulary
+from models.quantize import QuantizedMatrix
+
+def _load_mapped(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        return np.load(path)    # empty arrays cannot be mapped
+
+class SharedCorpusVersion:
+    """One published corpus version, read-only and memory-mapped."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        self.version = self.meta['version']
+        self.storage = self.meta['storage']
+        load = lambda name: _load_mapped(os.path.join(path, name + '.npy'))
+        scales = load('scales') if self.storage == 'int8' else None
+        self.embeddings = QuantizedMatrix(load('embeddings'), scales, self.storage)
+        self.ids = load('ids')
+        self.timestamps = load('timestamps')
+        with open(os.path.join(path, 'vocabulary.json'), 'r') as f:
+            vocabulary = TagVocabulary()
+            vocabulary.encode(json.load(f))
+        self.tags = EventTags(vocabulary, load('tag_indptr'), load('tag_ids'), load('tag_rows'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.embeddings.nbytes
+
+    def candidate_rows(self, query_emb, k=200, start=None, end=None):
+        """
+        Rows of the top-k events by similarity starting within [start, end]
+        (start defaults to now; undated events are always eligible), found by
+        an exact scan of the mapped matrix.
+        """
+        rows = np.flatnonzero(in_window(self.timestamps, start, end))
+        k = min(k, len(rows))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+        sims = self.embeddings.similarities(query_emb)[rows]
+        top = np.argpartition(-sims, k - 1)[:k]
+        return rows[top[np.argsort(-sims[top], kind='stable')]].astype(np.int64)
+
+    def window_count(self, start=None, end=None):
+        return int(np.count_nonzero(in_window(self.timestamps, start, end)))
+
+    def embedding_rows(self, rows):
+        return self.embeddings.rows(rows)
+
+    def events_at(self, rows):
+        """Minimal event records ({'id'}) for scoring the selected rows."""
+        return [{'id': eid} for eid in self.ids[np.asarray(rows, dtype=np.int64)].tolist()]
+
+class SharedCorpus:
+    """
+    EventCorpus counterpart for multi-process serving (see module docstring).
+
+    Any worker may replace() the corpus; publishes are serialized with a lock
+    file and the others pick the new version up on their next view().
+    keep: number of versions left on disk (older ones may still be mapped by
+    a worker that has not refreshed yet, which POSIX keeps readable).
+    """
+    def __init__(self, root, dimension=384, storage='float32', keep=2):
+        self.root = root
+        self.dimension = dimension
+        self.storage = storage
+        self.keep = keep
+        self.versions_dir = os.path.join(root, 'versions')
+        self.pointer_path = os.path.join(root, 'CURRENT')
+        self.current = None
+        self.empty = EventCorpus(dimension).view()     # served until the first publish
+        self._pointer_stat = None
+        os.makedirs(self.versions_dir, exist_ok=True)
+        self.refresh()
+
+    def __len__(self):
+        return len(self.view())
+
+    @property
+    def nbytes(self):
+        return self.view().nbytes
+
+    @property
+    def version(self):
+        return getattr(self.view(), 'version', 0)
+
+    def _read_pointer(self):
+        try:
+            with open(self.pointer_path, 'r') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Switch to the published version if CURRENT changed since the last check."""
+        try:
+            st = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return self.current
+        key = (st.st_ino, st.st_mtime_ns)
+        if key == self._pointer_stat:
+            return self.current
+        for _ in range(3):
+            name = self._read_pointer()
+            try:
+                self.current = SharedCorpusVersion(os.path.join(self.versions_dir, name))
+            except FileNotFoundError:
+                continue    # superseded and removed while we were reading; retry with the new pointer
+            self._pointer_stat = key
+            break
+        return self.current
+
+    def view(self):
+        """The live version (an empty corpus before the first publish); hold it for a whole request."""
+        return self.refresh() or self.empty
+
+    @property
+    def generation(self):
+        """Published version number, the counterpart of EventCorpus.generation."""
+        current = self._read_pointer()
+        return int(current) if current else 0
+
+    def replace(self, events, embeddings, if_generation=None):
+        """Publish events; with if_generation only if nothing was published since (see EventCorpus.replace)."""
+        return self.publish(events, embeddings, if_generation) is not None
+
+    def publish(self, events, embeddings, if_generation=None):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        with open(os.path.join(self.root, 'publish.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self._read_pointer()
+            if if_generation is not None and if_generation != (int(current) if current else 0):
+                return None
+            version = int(current) + 1 if current else 1
+            path = os.path.join(self.versions_dir, str(version))
+            tmp_path = path + '.tmp'
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            os.makedirs(tmp_path)
+            self._write_version(tmp_path, version, events, embeddings)
+            os.rename(tmp_path, path)
+
+            pointer_tmp = self.pointer_path + '.tmp'
+            with open(pointer_tmp, 'w') as f:
+                f.write(str(version))
+            os.replace(pointer_tmp, self.pointer_path)
+            self._prune(version)
+        return self.refresh()
+
+    def _write_version(self, path, version, events, embeddings):
+        save = lambda name, array: np.save(os.path.join(path, name + '.npy'), array)
+        matrix = QuantizedMatrix.from_float(embeddings, self.storage)
+        save('embeddings', matrix.data)
+        if matrix.scales is not None:
+            save('scales', matrix.scales)
+        ids = [str(event.get('id')) for event in events]
+        save('ids', np.array(ids, dtype=str) if ids else np.zeros(0, dtype='<U1'))
+        save('timestamps', event_timestamps(events))
+        tags = event_tag_index(events, TagVocabulary())
+        save('tag_indptr', tags.indptr)
+        save('tag_ids', tags.tag_ids)
+        save('tag_rows', tags.rows)
+        with open(os.path.join(path, 'vocabulary.json'), 'w') as f:
+            json.dump(tags.vocabulary.tags, f)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'version': version, 'count': len(events), 'dimension': self.dimension,
+                       'storage': self.storage}, f)
+
+    def _prune(self, version):
+        for name in os.listdir(self.versions_dir):
+            if name.isdigit() and int(name) <= version - self.keep:
+                shutil.rmtree(os.path.join(self.versions_dir, name), ignore_errors=True)
+
+    def save(self):
+        pass    # every publish is already on disk
+
+    def load_saved(self):
+        """Nothing to replay: the last published version is attached on startup."""
+        return []
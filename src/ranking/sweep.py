@@ -0,0 +1,80 @@
+import numpy as np
+
+COMPONENTS = ('sim', 'label', 'recency')
+
+def weight_grid(step=0.05):
+    """Every (sim, label, recency) weight vector on the simplex with the given step, as a (W, 3) array."""
+    n = int(round(1 / step))
+    grid = [(i, j, n - i - j) for i in range(n + 1) for j in range(n + 1 - i)]
+    return np.array(grid, dtype=np.float64) / n
+
+def as_weight_matrix(weights):
+    """(W, 3) array from a (W, 3) array-like or a list of {'sim', 'label', 'recency'} dicts."""
+    if len(weights) and isinstance(weights[0], dict):
+        return np.array([[w[name] for name in COMPONENTS] for w in weights], dtype=np.float64)
+    return np.atleast_2d(np.asarray(weights, dtype=np.float64))
+
+def ranks(order):
+    """Rank (0 = best) of every column, from the per-row order of a (W, N) score matrix."""
+    out = np.empty_like(order)
+    np.put_along_axis(out, order, np.arange(order.shape[1])[None, :], axis=1)
+    return out
+
+def sweep_weights(components, weights, k=10, reference=0):
+    """
+    Evaluate many weight vectors against component scores computed once.
+
+    components: score_matrix() output (only 'sim', 'label', 'recency' are used)
+    weights: (W, 3) grid or list of weight dicts
+    reference: row of weights the others are compared with
+
+    Scores for all W scenarios come from a single (W, 3) x (3, N) product.
+    Events are ordered like scorer.rank_order (by score rounded to 2 decimals,
+    ties in event order), so each top-k is what /rank would return; ranks,
+    margins and gaps are taken on those rounded scores too.
+    Returns a dict of per-scenario arrays:
+      'scores' (W, N) unrounded, 'top_k' (W, k) indices best first,
+      'overlap' (W,) share of the reference's top-k also in each top-k,
+      'spearman' (W,) rank correlation with the reference over all N events,
+      'margin' (W,) score gap between the k-th and (k+1)-th event,
+      'top_gap' (W,) score gap between the first and second event.
+    """
+    W = as_weight_matrix(weights)
+    C = np.vstack([np.asarray(components[name], dtype=np.float64) for name in COMPONENTS])
+    scores = W @ C
+    n = scores.shape[1]
+    k = min(k, n)
+
+    # one stable sort per scenario of the rounded scores (as in rank_order) gives both top-k and ranks
+    rounded = np.round(scores, 2)
+    order = np.argsort(-rounded, axis=1, kind='stable')
+    top = order[:, :k]
+
+    in_top = np.zeros(scores.shape, dtype=bool)
+    np.put_along_axis(in_top, top, True, axis=1)
+    overlap = (in_top & in_top[reference]).sum(axis=1) / k if k else np.zeros(len(W))
+
+    r = ranks(order).astype(np.float64)
+    r -= r.mean(axis=1, keepdims=True)
+    ref = r[reference]
+    denom = np.sqrt((r ** 2).sum(axis=1) * (ref ** 2).sum())
+    spearman = np.divide(r @ ref, denom, out=np.ones(len(W)), where=denom > 0)
+
+    top_scores = np.take_along_axis(rounded, top, axis=1)
+    if k < n:
+        kth = top_scores[:, -1]
+        rest = np.where(in_top, -np.inf, rounded).max(axis=1)
+        margin = kth - rest
+    else:
+        margin = np.full(len(W), np.nan)
+    top_gap = top_scores[:, 0] - top_scores[:, 1] if k > 1 else np.full(len(W), np.nan)
+
+    return {
+        'weights': W,
+        'scores': scores,
+        'top_k': top,
+        'overlap': overlap,
+        'spearman': spearman,
+        'margin': margin,
+        'top_gap': top_gap
+    }
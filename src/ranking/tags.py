@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class TagVocabulary:
+    """
+    Lowercased tag -> integer id, shared by every event indexed against it.
+
+    Which tags an interest matches (interest is a substring of the tag) is
+    worked out once per interest and remembered; tags added later are only
+    checked against interests already seen, so each (interest, tag) pair is
+    compared at most once. Only the max_interests most recently used
+    interests are remembered, since they come straight from user profiles.
+    """
+    def __init__(self, max_interests=4096):
+        self.ids = {}
+        self.tags = []
+        self.max_interests = max_interests
+        self._matches = OrderedDict()   # interest -> (matching tag ids, vocabulary size checked)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tags)
+
+    def encode(self, tags):
+        """Integer ids for raw tags, adding unseen ones."""
+        out = []
+        for tag in tags:
+            tag = tag.lower()
+            tag_id = self.ids.get(tag)
+            if tag_id is None:
+                with self._lock:
+                    tag_id = self.ids.setdefault(tag, len(self.tags))
+                    if tag_id == len(self.tags):
+                        self.tags.append(tag)
+            out.append(tag_id)
+        return out
+
+    def _matching(self, interest):
+        # caller holds self._lock
+        ids, checked = self._matches.get(interest, ((), 0))
+        if checked < len(self.tags):
+            ids = tuple(ids) + tuple(i for i in range(checked, len(self.tags)) if interest in self.tags[i])
+            self._matches[interest] = (ids, len(self.tags))
+        if interest in self._matches:
+            self._matches.move_to_end(interest)
+            if len(self._matches) > self.max_interests:
+                self._matches.popitem(last=False)
+        return ids
+
+    def matching(self, interest):
+        """Ids of the tags containing interest (already lowercased)."""
+        with self._lock:
+            return self._matching(interest)
+
+    def interest_mask(self, interests):
+        """(T,) float mask of tags matched by any of the interests."""
+        # size the mask and collect matches under one lock, so tags added meanwhile are in neither
+        with self._lock:
+            mask = np.zeros(len(self.tags), dtype=np.float64)
+            for interest in set(x.lower() for x in interests):
+                mask[list(self._matching(interest))] = 1.0
+        return mask
+
+class EventTags:
+    """
+    Each event's tags as integer ids over a TagVocabulary, stored CSR-style:
+    event i's tag ids are tag_ids[indptr[i]:indptr[i + 1]] (repeats kept).
+    rows (the event of every tag_ids entry) is derived unless given, e.g.
+    memory-mapped by shared_corpus.
+    """
+    def __init__(self, vocabulary, indptr, tag_ids, rows=None):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.tag_ids = tag_ids
+        self.rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)) if rows is None else rows
+
+    @classmethod
+    def from_lists(cls, tag_lists, vocabulary=None):
+        vocabulary = vocabulary if vocabulary is not None else TagVocabulary()
+        encoded = [vocabulary.encode(tags) for tags in tag_lists]
+        indptr = np.zeros(len(encoded) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(ids) for ids in encoded])
+        tag_ids = np.fromiter((i for ids in encoded for i in ids), dtype=np.int64, count=int(indptr[-1]))
+        return cls(vocabulary, indptr, tag_ids)
+
+    @classmethod
+    def from_events(cls, event_metadata, vocabulary=None):
+        return cls.from_lists([event.get('tags', []) for event in event_metadata], vocabulary)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def take(self, rows):
+        """EventTags for the selected events, sharing the vocabulary."""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(ends - starts)
+        positions = np.arange(indptr[-1]) + np.repeat(starts - indptr[:-1], ends - starts)
+        tag_ids = self.tag_ids[positions]
+        return EventTags(self.vocabulary, indptr, tag_ids)
+
+    def match_counts(self, interests):
+        """(N,) number of each event's tags matched by any interest."""
+        if not len(self.tag_ids):
+            return np.zeros(len(self), dtype=np.float64)
+        mask = self.vocabulary.interest_mask(interests)
+        return np.bincount(self.rows, weights=mask[self.tag_ids], minlength=len(self))
@@ -1,7 +1,10 @@
 
 import sys
 import os
+import time
+import argparse
 import requests
+import numpy as np
 from datetime import datetime, timezone
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,7 +12,8 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 from models.embeddings import Embedder
-from scorer import score_events
+from scorer import score_matrix, event_timestamps, event_tag_index
+from sweep import sweep_weights, weight_grid
 
 def fetch_events_local():
     url = f"https://calendar.duke.edu/events/index.json?future_days=30"
@@ -47,7 +51,19 @@ def fetch_events_local():
         print(e)
         return []
 
-def run_ablation():
+def print_grid_summary(grid_result, top=10):
+    """Grid points that keep the baseline's top-k most intact, and the ones that change it most."""
+    weights = grid_result['weights']
+    order = np.lexsort((-grid_result['spearman'], -grid_result['overlap']))
+    print(f"{'sim':>5} {'label':>6} {'rec':>5} | {'Top-k overlap':>13} | {'Spearman':>8} | {'Margin':>7}")
+    for label, rows in (("closest to baseline", order[:top]), ("furthest from baseline", order[-top:][::-1])):
+        print(f"-- {label}")
+        for i in rows:
+            w = weights[i]
+            print(f"{w[0]:>5.2f} {w[1]:>6.2f} {w[2]:>5.2f} | {grid_result['overlap'][i]:>13.2f} | "
+                  f"{grid_result['spearman'][i]:>8.3f} | {grid_result['margin'][i]:>7.3f}")
+
+def run_ablation(grid_step=0.02, k=10):
     embedder = Embedder()
     events = fetch_events_local()
     if not events:
@@ -77,25 +93,42 @@ def run_ablation():
         "Ablation: No Label": {'sim': 0.8, 'label': 0.0, 'recency': 0.2} 
     }
 
+    # similarity, label and recency are computed once; every scenario reuses them
+    components = score_matrix(query_emb, event_embs, event_timestamps(events), event_tag_index(events), profile)
+    result = sweep_weights(components, list(scenarios.values()), k=k)
+
     print("\n" + "="*80)
     print(f"ablation study: {profile['name']}")
     print(f"query: {query_text}")
     print("="*80)
 
-    for name, weights in scenarios.items():
+    for s, (name, weights) in enumerate(scenarios.items()):
         print(f"\n--- {name} ---")
         print(f"Weights: {weights}")
-        
-        ranked = score_events(query_emb, event_embs, events, profile, weights)
-        top_3 = ranked[:3]
-        
-        for i, item in enumerate(top_3, 1):
-            orig = next((e for e in events if e['id'] == item['id']), None)
-            title = orig['title'] if orig else "Unknown"
-            print(f"  {i}. [Score: {item['score']:.2f}] {title[:60]}")
-            print(f"     (Sim: {item['details']['sim']:.2f}, Lbl: {item['details']['label']:.2f}, Rec: {item['details']['recency']:.2f})")
+        print(f"Top-{k} overlap vs baseline: {result['overlap'][s]:.2f}, Spearman: {result['spearman'][s]:.3f}, "
+              f"Margin @{k}: {result['margin'][s]:.3f}")
+
+        for i, row in enumerate(result['top_k'][s][:3], 1):
+            print(f"  {i}. [Score: {result['scores'][s, row]:.2f}] {events[row]['title'][:60]}")
+            print(f"     (Sim: {components['sim'][row]:.2f}, Lbl: {components['label'][row]:.2f}, Rec: {components['recency'][row]:.2f})")
 
+    # dense grid over the weight simplex, compared against the baseline scenario
+    baseline = np.array([[scenarios["Baseline (Balanced)"][c] for c in ('sim', 'label', 'recency')]])
+    grid = np.vstack([baseline, weight_grid(grid_step)])
+    start = time.perf_counter()
+    grid_result = sweep_weights(components, grid, k=k)
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*80)
+    print(f"WEIGHT GRID: {len(grid) - 1} combinations (step {grid_step}) x {len(events)} events in {elapsed * 1000:.1f} ms")
+    print("="*80)
+    grid_result = {key: value[1:] for key, value in grid_result.items()}
+    print_grid_summary(grid_result)
     print("\n" + "="*80)
 
 if __name__ == "__main__":
-    run_ablation()
+    parser = argparse.ArgumentParser(description="Weight ablation and dense weight-grid sweep")
+    parser.add_argument('--grid-step', type=float, default=0.02, help="spacing of the weight simplex grid")
+    parser.add_argument('--k', type=int, default=10, help="top-k used for overlap and margin")
+    args = parser.parse_args()
+    run_ablation(args.grid_step, args.k)
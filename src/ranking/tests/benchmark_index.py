@@ -0,0 +1,91 @@
+
+import time
+import sys
+import os
+import argparse
+import faiss
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from indexer import EventIndexer
+
+def synthetic_embeddings(n, dimension=384, n_topics=200, seed=0):
+    """Unit vectors clustered around topic centers, roughly like real event embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_topics, dimension)).astype('float32')
+    topics = rng.integers(0, n_topics, size=n)
+    vectors = centers[topics] + 0.8 * rng.normal(size=(n, dimension)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def index_bytes(indexer):
+    return faiss.serialize_index(indexer.index).nbytes
+
+def run_config(name, indexer, vectors, ids, queries, truth, k, search_kwargs):
+    start_build = time.perf_counter()
+    indexer.build_index(vectors, ids)
+    build_time = time.perf_counter() - start_build
+
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start_q = time.perf_counter()
+        hits = indexer.search(query, k=k, **search_kwargs)
+        latencies.append((time.perf_counter() - start_q) * 1000)
+        recalls.append(len({eid for eid, _ in hits} & expected) / k)
+
+    return {
+        'name': name,
+        'build_s': build_time,
+        'recall': float(np.mean(recalls)),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mem_mb': index_bytes(indexer) / (1024 * 1024),
+    }
+
+def run_benchmark(n=100000, n_queries=200, k=20, dimension=384):
+    print(f"Generating {n} synthetic {dimension}-d event embeddings...")
+    vectors = synthetic_embeddings(n, dimension)
+    ids = [f"evt-{i}" for i in range(n)]
+    queries = synthetic_embeddings(n_queries, dimension, seed=1)
+
+    print("Computing exact ground truth with the flat index...")
+    flat = EventIndexer(dimension, 'flat')
+    flat.build_index(vectors, ids)
+    truth = [{eid for eid, _ in flat.search(q, k=k)} for q in queries]
+
+    configs = [
+        ("flat", EventIndexer(dimension, 'flat'), {}),
+        ("ivf_flat nprobe=1", EventIndexer(dimension, 'ivf_flat'), {'nprobe': 1}),
+        ("ivf_flat nprobe=8", EventIndexer(dimension, 'ivf_flat'), {'nprobe': 8}),
+        ("ivf_flat nprobe=32", EventIndexer(dimension, 'ivf_flat'), {'nprobe': 32}),
+        ("ivf_pq nprobe=8", EventIndexer(dimension, 'ivf_pq'), {'nprobe': 8}),
+        ("ivf_pq nprobe=32", EventIndexer(dimension, 'ivf_pq'), {'nprobe': 32}),
+        ("hnsw ef=32", EventIndexer(dimension, 'hnsw'), {'ef_search': 32}),
+        ("hnsw ef=64", EventIndexer(dimension, 'hnsw'), {'ef_search': 64}),
+        ("hnsw ef=128", EventIndexer(dimension, 'hnsw'), {'ef_search': 128}),
+    ]
+
+    results = []
+    for name, indexer, search_kwargs in configs:
+        print(f"Benchmarking {name}...")
+        results.append(run_config(name, indexer, vectors, ids, queries, truth, k, search_kwargs))
+
+    print("\n" + "="*80)
+    print(f"INDEX BENCHMARK (N={n}, d={dimension}, queries={n_queries}, k={k})")
+    print("="*80)
+    print(f"{'Index':<22} | {'Recall@k':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'Build s':>8} | {'Mem MB':>8}")
+    print("-" * 80)
+    for r in results:
+        print(f"{r['name']:<22} | {r['recall']:>8.3f} | {r['p50_ms']:>8.3f} | {r['p99_ms']:>8.3f} | {r['build_s']:>8.2f} | {r['mem_mb']:>8.1f}")
+    print("="*80)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall/latency benchmark for EventIndexer index types")
+    parser.add_argument('--n', type=int, default=100000, help="number of synthetic events")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.n, args.queries, args.k)
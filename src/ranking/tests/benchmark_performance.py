@@ -2,8 +2,10 @@
 import time
 import sys
 import os
+import argparse
 import requests
 from datetime import datetime, timezone
+import json
 import numpy as np
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -12,6 +14,7 @@ sys.path.append(parent_dir)
 
 from models.embeddings import Embedder
 from scorer import score_events
+import wire
 
 def fetch_events_local():
     url = f"https://calendar.duke.edu/events/index.json?future_days=30"
@@ -49,10 +52,64 @@ def fetch_events_local():
         print(e)
         return []
 
-def run_benchmark():
+def time_ms(fn, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return (time.perf_counter() - start) * 1000 / repeats, out
+
+def compare_wire_formats(events, query_emb, event_embs, profile):
+    """Payload size and serialization time of the /rank request and response formats."""
+    print("\n[Metric 3] Wire Format (/rank)")
+    refs = [{"id": str(e['id']), "hash": wire.content_hash(e)} for e in events]
+    rows = score_events(query_emb, event_embs, events, profile)
+    columns = score_events(query_emb, event_embs, events, profile, columnar=True, details=True)
+    compact = score_events(query_emb, event_embs, events, profile, columnar=True)
+
+    cases = [
+        ("request: full events", lambda: json.dumps({"user_profile": profile, "events": events}).encode()),
+        ("request: event refs", lambda: wire.dumps({"user_profile": profile, "event_refs": refs})),
+        ("response: rows, json", lambda: json.dumps(rows).encode()),
+        ("response: rows, orjson" if wire.orjson else "response: rows, wire", lambda: wire.dumps(rows)),
+        ("response: columnar+details", lambda: wire.dumps(columns)),
+        ("response: columnar ids/scores", lambda: wire.dumps(compact)),
+        ("response: columnar, gzip", lambda: wire.encode_body(compact, 'gzip', min_gzip_bytes=0)[0]),
+    ]
+    print(f"{'Format':<32} | {'Bytes':>9} | {'Encode ms':>9}")
+    for name, encode in cases:
+        ms, body = time_ms(encode)
+        print(f"{name:<32} | {len(body):>9} | {ms:>9.3f}")
+
+def compare_backends(event_texts, onnx_dir):
+    from models.onnx_backend import cosine_agreement
+
+    reference = Embedder()
+    candidate = Embedder(backend='onnx', model_dir=onnx_dir)
+
+    print("\n[Metric 4] Backend Comparison (torch vs onnx int8)")
+    rows = []
+    for name, embedder in (("torch", reference), ("onnx-int8", candidate)):
+        warm = embedder.warm_up()
+        start = time.time()
+        _ = embedder.embed_texts(event_texts)
+        elapsed = time.time() - start
+        start_q = time.time()
+        _ = embedder.model.encode(["Computer Science coding hackathon"])
+        query_ms = (time.time() - start_q) * 1000
+        rows.append((name, warm, len(event_texts) / elapsed, query_ms))
+
+    agreement = cosine_agreement(reference, candidate, event_texts)
+    print(f"{'Backend':<12} | {'Warm-up s':>9} | {'Events/sec':>10} | {'Query ms':>8}")
+    for name, warm, throughput, query_ms in rows:
+        print(f"{name:<12} | {warm:>9.2f} | {throughput:>10.2f} | {query_ms:>8.2f}")
+    print(f"Cosine agreement: min {agreement['min']:.4f}, mean {agreement['mean']:.4f} "
+          f"({'PASS' if agreement['passed'] else 'FAIL'} at {agreement['threshold']})")
+
+def run_benchmark(onnx_dir=None):
     print("Initialize Embedder...")
     start_load = time.time()
     embedder = Embedder()
+    embedder.model     # loads lazily, so touch it inside the timer
     load_time = time.time() - start_load
     print(f"Model Load Time: {load_time:.4f}s")
 
@@ -116,5 +173,13 @@ def run_benchmark():
     print(f"  - Scoring (Rank):  {score_time_ms:.2f} ms")
     print("="*50)
 
+    compare_wire_formats(events, query_emb, event_embs, profile)
+
+    if onnx_dir:
+        compare_backends(event_texts, onnx_dir)
+
 if __name__ == "__main__":
-    run_benchmark()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--onnx-dir', help="exported model dir (models/onnx_backend.py) to compare against torch")
+    args = parser.parse_args()
+    run_benchmark(args.onnx_dir)
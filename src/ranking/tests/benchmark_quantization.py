@@ -0,0 +1,79 @@
+
+import time
+import sys
+import os
+import argparse
+import faiss
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from models.quantize import QuantizedMatrix
+from indexer import EventIndexer
+from benchmark_index import synthetic_embeddings
+
+def top_k_overlap(a, b, k):
+    return len(set(np.argsort(-a)[:k]) & set(np.argsort(-b)[:k])) / k
+
+def spearman_top(a, b, k):
+    """Rank correlation over the union of both top-k sets."""
+    rows = np.union1d(np.argsort(-a)[:k], np.argsort(-b)[:k])
+    ra = np.argsort(np.argsort(-a[rows])).astype(np.float64)
+    rb = np.argsort(np.argsort(-b[rows])).astype(np.float64)
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+def run_benchmark(n=200000, n_queries=100, k=20, dimension=384):
+    print(f"Generating {n} synthetic {dimension}-d event embeddings...")
+    matrix = synthetic_embeddings(n, dimension)
+    queries = synthetic_embeddings(n_queries, dimension, seed=1)
+    exact = queries @ matrix.T
+
+    print("\n" + "="*80)
+    print(f"COMPRESSED SCORING (N={n}, d={dimension}, queries={n_queries}, k={k})")
+    print("="*80)
+    print(f"{'Storage':<18} | {'MB':>8} | {'Saving':>7} | {'ms/query':>9} | {'Top-k overlap':>13} | {'Spearman':>8}")
+    print("-" * 80)
+    for mode, rescore in (('float32', False), ('float16', False), ('int8', False), ('int8', True)):
+        q = QuantizedMatrix.from_float(matrix, mode)
+        overlaps, corrs = [], []
+        start = time.perf_counter()
+        for i, query in enumerate(queries):
+            if rescore:
+                hits = q.search(query, k=k, exact=matrix)
+                approx = np.full(n, -np.inf, dtype=np.float32)
+                approx[[row for row, _ in hits]] = [sim for _, sim in hits]
+            else:
+                approx = q.similarities(query)
+            overlaps.append(top_k_overlap(exact[i], approx, k))
+            if not rescore:
+                corrs.append(spearman_top(exact[i], approx, k))
+        ms = (time.perf_counter() - start) * 1000 / n_queries
+        name = f"{mode}{' + rescore' if rescore else ''}"
+        corr = f"{np.mean(corrs):>8.3f}" if corrs else f"{'-':>8}"
+        print(f"{name:<18} | {q.nbytes / 2**20:>8.1f} | {matrix.nbytes / q.nbytes:>6.1f}x | {ms:>9.2f} | {np.mean(overlaps):>13.3f} | {corr}")
+
+    print("\n" + "="*80)
+    print("COMPRESSED FAISS INDEXES (EventIndexer)")
+    print("="*80)
+    ids = [f"evt-{i}" for i in range(n)]
+    truth = [set(np.argsort(-row)[:k]) for row in exact]
+    for index_type in ('flat', 'sq_fp16', 'sq8'):
+        indexer = EventIndexer(dimension, index_type)
+        indexer.build_index(matrix, ids)
+        recall = np.mean([
+            len({int(eid[4:]) for eid, _ in indexer.search(query, k=k)} & expected) / k
+            for query, expected in zip(queries, truth)
+        ])
+        mb = faiss.serialize_index(indexer.index).nbytes / 2**20
+        print(f"{index_type:<18} | {mb:>8.1f} MB | recall@{k} {recall:.3f}")
+    print("="*80)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory/agreement benchmark for compressed embedding storage")
+    parser.add_argument('--n', type=int, default=200000, help="number of synthetic events")
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.n, args.queries, args.k)
@@ -0,0 +1,208 @@
+
+import time
+import sys
+import os
+import json
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from models.embeddings import Embedder, event_text
+from models.cache import EmbeddingCache
+from indexer import EventIndexer
+from scorer import score_events
+from benchmark_index import synthetic_embeddings
+import wire
+
+# Offline, seeded benchmark of each ranking stage at synthetic scale.
+#   python tests/benchmark_suite.py --sizes 1000,10000,100000 --output bench.json
+#   python tests/benchmark_suite.py --baseline bench_main.json --output bench.json
+#   python tests/benchmark_suite.py --compare bench_main.json bench.json
+
+TAGS = ['Tech', 'AI', 'Arts', 'Music', 'Career', 'Sports', 'Science', 'Health', 'Lecture', 'Workshop',
+        'Social', 'Service', 'Religion', 'Film', 'Theater', 'Engineering', 'Business', 'Policy']
+MAJORS = ['Computer Science', 'Biology', 'Economics', 'Public Policy', 'Mechanical Engineering', 'Music', 'History']
+YEARS = ['Freshman', 'Sophomore', 'Junior', 'Senior']
+# start times and recency are relative to this fixed instant (2026-01-01 UTC), not the
+# wall clock, so two runs (e.g. on two commits) score the same dataset
+REFERENCE_TIME = 1767225600.0
+
+def synthetic_events(n, seed=0, vocabulary_size=5000, now=REFERENCE_TIME):
+    """Seeded events with word-salad titles/descriptions, 0-4 tags and starts over the 60 days after now (a few undated)."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"word{i}" for i in range(vocabulary_size)])
+    title_words = rng.integers(0, vocabulary_size, size=(n, 4))
+    desc_lengths = rng.integers(10, 60, size=n)
+    tag_counts = rng.integers(0, 5, size=n)
+    starts = now + rng.uniform(-2, 60, size=n) * 86400
+    events = []
+    for i in range(n):
+        events.append({
+            'id': f"evt-{i}",
+            'title': ' '.join(words[title_words[i]]),
+            'description': ' '.join(words[rng.integers(0, vocabulary_size, size=desc_lengths[i])]),
+            'tags': [TAGS[t] for t in rng.choice(len(TAGS), size=tag_counts[i], replace=False)],
+            'start_timestamp': None if i % 50 == 0 else float(starts[i])
+        })
+    return events
+
+def synthetic_profiles(m, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{
+        'id': f"user-{i}",
+        'major': MAJORS[rng.integers(len(MAJORS))],
+        'year': YEARS[rng.integers(len(YEARS))],
+        'interests': [TAGS[t].lower() for t in rng.choice(len(TAGS), size=rng.integers(1, 4), replace=False)]
+    } for i in range(m)]
+
+def measure(fn, repeats=5, warmup=1):
+    """Run fn warmup + repeats times; percentiles (ms) over the timed runs."""
+    for _ in range(warmup):
+        fn()
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    runs = np.array(runs)
+    return {
+        'p50_ms': float(np.percentile(runs, 50)),
+        'p90_ms': float(np.percentile(runs, 90)),
+        'p99_ms': float(np.percentile(runs, 99)),
+        'mean_ms': float(runs.mean()),
+        'min_ms': float(runs.min()),
+        'runs': len(runs)
+    }
+
+def run_size(n, repeats, warmup, embedder=None, embed_sample=1000, k=20, seed=0, now=REFERENCE_TIME):
+    print(f"\n--- N={n} ---")
+    events = synthetic_events(n, seed, now=now)
+    vectors = synthetic_embeddings(n, seed=seed)
+    ids = [event['id'] for event in events]
+    profile = synthetic_profiles(1, seed)[0]
+    query = synthetic_embeddings(1, seed=seed + 1)[0]
+    stages = {}
+
+    def stage(name, fn, **kwargs):
+        stages[name] = measure(fn, kwargs.get('repeats', repeats), kwargs.get('warmup', warmup))
+        print(f"{name:<22} p50 {stages[name]['p50_ms']:>10.2f} ms   p90 {stages[name]['p90_ms']:>10.2f} ms")
+
+    stage('text_building', lambda: [event_text(event) for event in events])
+
+    if embedder is not None:
+        sample = [event_text(event) for event in events[:embed_sample]]
+        def embed_cold():
+            embedder.cache.clear()
+            embedder.embed_texts(sample)
+        stage('embedding', embed_cold)
+        stages['embedding']['texts'] = len(sample)
+
+    cache = EmbeddingCache(max_bytes=n * (vectors.itemsize * vectors.shape[1] + 200))
+    keys = [EmbeddingCache.make_key('bench', event_text(event)) for event in events]
+    for key, vector in zip(keys, vectors):
+        cache.put(key, vector)
+    stage('cache_lookup', lambda: [cache.get(key) for key in keys])
+
+    results = {}
+    def score_all():
+        results['rows'] = score_events(query, vectors, events, profile, now=now)
+    stage('score_events', score_all)
+    stage('score_events_top_k', lambda: score_events(query, vectors, events, profile, limit=k, now=now))
+
+    indexer = EventIndexer(vectors.shape[1])
+    stage('index_build', lambda: indexer.build_index(vectors, ids), repeats=max(1, repeats // 2), warmup=0)
+    stage('index_search', lambda: indexer.search(query, k=k), repeats=repeats * 10)
+
+    columns = score_events(query, vectors, events, profile, columnar=True, now=now)
+    stage('json_rows', lambda: json.dumps(results['rows']))
+    stage('wire_rows', lambda: wire.dumps(results['rows']))
+    stage('wire_columnar', lambda: wire.dumps(columns))
+    return stages
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=current_dir, text=True).strip()
+    except Exception:
+        return None
+
+def compare(baseline, current, tolerance=0.10, min_ms=0.05):
+    """Stages whose p50 grew by more than tolerance (ignoring sub-min_ms timings)."""
+    regressions = []
+    for size, stages in current['results'].items():
+        for name, stats in stages.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if old is None or max(old['p50_ms'], stats['p50_ms']) < min_ms:
+                continue
+            ratio = stats['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+            if ratio > 1 + tolerance:
+                regressions.append({'size': size, 'stage': name, 'baseline_ms': old['p50_ms'],
+                                    'current_ms': stats['p50_ms'], 'ratio': ratio})
+    return regressions
+
+def report_comparison(baseline, current, tolerance):
+    regressions = compare(baseline, current, tolerance)
+    print("\n" + "="*80)
+    print(f"COMPARISON {baseline.get('commit')} -> {current.get('commit')} (p50, tolerance {tolerance:.0%})")
+    print("="*80)
+    for size, stages in current['results'].items():
+        for name, stats in stages.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if old is None:
+                continue
+            flag = any(r['size'] == size and r['stage'] == name for r in regressions)
+            print(f"N={size:<8} {name:<22} {old['p50_ms']:>10.2f} -> {stats['p50_ms']:>10.2f} ms"
+                  f"{'   REGRESSION' if flag else ''}")
+    print(f"{len(regressions)} regression(s)")
+    return regressions
+
+def run_suite(sizes, repeats=5, warmup=1, model=None, embed_sample=1000, seed=0, reference_time=REFERENCE_TIME):
+    embedder = None
+    if model:
+        embedder = Embedder(model)
+        embedder.warm_up()
+    return {
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'config': {'sizes': sizes, 'repeats': repeats, 'warmup': warmup, 'model': model,
+                   'embed_sample': embed_sample, 'seed': seed, 'reference_time': reference_time},
+        'results': {str(n): run_size(n, repeats, warmup, embedder, embed_sample, seed=seed, now=reference_time)
+                    for n in sizes}
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline synthetic benchmark of each ranking stage")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="comma-separated event counts (up to 1000000)")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model', help="sentence-transformers model for the embedding stage (skipped if unset)")
+    parser.add_argument('--embed-sample', type=int, default=1000, help="texts embedded per size")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="results JSON from another commit to compare against")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="only compare two results files")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed p50 slowdown before flagging")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        sys.exit(1 if report_comparison(baseline, current, args.tolerance) else 0)
+
+    results = run_suite([int(n) for n in args.sizes.split(',')], args.repeats, args.warmup,
+                        args.model, args.embed_sample, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            sys.exit(1 if report_comparison(json.load(f), results, args.tolerance) else 0)
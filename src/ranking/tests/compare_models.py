@@ -3,13 +3,14 @@ import requests
 import json
 import sys
 import os
+import argparse
 from datetime import datetime, timezone
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
+sys.path.append(os.path.dirname(current_dir))
 
-from models.embeddings import Embedder
-from scorer import score_events
+from evaluation import DEFAULT_CACHE_DIR, EvaluationHarness, load_events, print_results
 
 def fetch_duke_events(future_days=30):
     print(f"Fetching Duke events for next {future_days} days...")
@@ -60,23 +61,14 @@ def fetch_duke_events(future_days=30):
         print(f"Error fetching events: {e}")
         return []
 
-def run_comparison():
-    # setup
-    embedder = Embedder()
-    events = fetch_duke_events()
+def run_comparison(models=('all-MiniLM-L6-v2',), cache_dir=DEFAULT_CACHE_DIR, refresh=False, workers=None):
+    # setup: events come from a local snapshot unless refresh is set
+    events = load_events(fetch_duke_events, os.path.join(cache_dir, 'events.json'), refresh)
     
     if not events:
         print("No events found. Exiting.")
         return
 
-    # pre-compute event embeddings
-    print("Generating event embeddings...")
-    event_texts = [
-        f"{e['title']} {e['description']} {' '.join(e['tags'])}" 
-        for e in events
-    ]
-    event_embs = embedder.embed_texts(event_texts)
-
     # profiles
     profiles = [
         {
@@ -148,27 +140,32 @@ def run_comparison():
         print("-" * 40)
     print("="*60 + "\n")
 
-    # ml model (semantic + recency + label)
-    print("ML MODEL (Semantic + Recency + Label)")
+    # ml model (semantic + recency + label), one run per candidate embedding model;
+    # embeddings are cached on disk so only new models/texts get encoded
     weights = {'sim': 0.7, 'label': 0.1, 'recency': 0.2}
+    prompts = {"Major + Interests": "{major} {interest_words}"}
+    harness = EvaluationHarness(events, profiles, cache_dir, weights, k=5, workers=workers)
+    results = harness.run(list(models), prompts)
+
+    for model in models:
+        print(f"ML MODEL (Semantic + Recency + Label): {model} ({harness.encoded[model]} texts encoded, rest cached)")
+        top_k = results[(model, "Major + Interests")]['top_k']
+        for profile, rows in zip(profiles, top_k):
+            print(f"PROFILE: {profile['name']} (Interests: {', '.join(profile['interests'])})")
+            print("Top 5 Recommendations:")
+            for i, row in enumerate(rows, 1):
+                print(f"{i}. {events[row]['title'][:60]}")
+            print("-" * 40)
 
-    for profile in profiles:
-        print(f"PROFILE: {profile['name']} (Interests: {', '.join(profile['interests'])})")
-        
-        query_text = f"{profile['major']} {' '.join(profile['interests'])}"
-        query_emb = embedder.embed_text(query_text)
-        
-        ranked = score_events(query_emb, event_embs, events, profile, weights)
-        top_5 = ranked[:5]
-        
-        print("Top 5 Recommendations:")
-        for i, item in enumerate(top_5, 1):
-            # find original event data for display
-            orig = next((e for e in events if e['id'] == item['id']), None)
-            if orig:
-                print(f"{i}. [Score: {item['score']:.2f}] {orig['title'][:60]}")
-                print(f"  (Sim: {item['details']['sim']}, Lbl: {item['details']['label']}, Rec: {item['details']['recency']})")
-        print("-" * 40)
+    print("\n" + "="*60)
+    print("MODEL COMPARISON (keyword relevance, mean over profiles)")
+    print_results(results, harness.k)
 
 if __name__ == "__main__":
-    run_comparison()
+    parser = argparse.ArgumentParser(description="Compare ranking models on the Duke calendar")
+    parser.add_argument('--models', default='all-MiniLM-L6-v2', help="comma-separated sentence-transformers models")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="event snapshot + embedding cache")
+    parser.add_argument('--refresh', action='store_true', help="re-fetch the calendar instead of using the snapshot")
+    parser.add_argument('--workers', type=int, help="parallel model workers (defaults to CPU count)")
+    args = parser.parse_args()
+    run_comparison(args.models.split(','), args.cache_dir, args.refresh, args.workers)
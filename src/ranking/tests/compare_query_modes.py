@@ -0,0 +1,110 @@
+
+import sys
+import os
+import requests
+from datetime import datetime, timezone
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from models.embeddings import Embedder, event_text
+from models.composer import QueryComposer, build_query_text, load_majors
+
+def fetch_events_local():
+    url = f"https://calendar.duke.edu/events/index.json?future_days=30"
+    try:
+        resp = requests.get(url)
+        if resp.status_code != 200: return []
+        data = resp.json()
+        raw_events = data.get('events', [])
+        parsed = []
+        for index, item in enumerate(raw_events):
+            ev = item.get('event', {})
+            start_ts = None
+            if 'start' in ev and 'utcdate' in ev['start']:
+                ds = ev['start']['utcdate']
+                try:
+                    dt = datetime.strptime(ds, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+                    start_ts = dt.timestamp()
+                except: pass
+
+            tags = []
+            if 'categories' in ev and 'category' in ev['categories']:
+                cats = ev['categories']['category']
+                if isinstance(cats, list): tags = [c.get('value', '') for c in cats]
+                elif isinstance(cats, dict): tags = [cats.get('value', '')]
+
+            parsed.append({
+                'id': ev.get('id', f"evt-{index}"),
+                'title': ev.get('summary', 'No Title'),
+                'description': ev.get('description', ''),
+                'tags': tags,
+                'start_timestamp': start_ts,
+            })
+        return [e for e in parsed if e['start_timestamp']]
+    except Exception as e:
+        print(e)
+        return []
+
+def spearman(a, b):
+    """Rank correlation of two score vectors (no tie correction)."""
+    ra = np.argsort(np.argsort(-a)).astype(np.float64)
+    rb = np.argsort(np.argsort(-b)).astype(np.float64)
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+def top_k_overlap(a, b, k=10):
+    return len(set(np.argsort(-a)[:k]) & set(np.argsort(-b)[:k])) / k
+
+def run_comparison():
+    embedder = Embedder()
+    majors_path = os.path.join(os.path.dirname(os.path.dirname(parent_dir)), 'data', 'majors.json')
+    majors_data = load_majors(majors_path)
+    composer = QueryComposer(embedder, majors_data)
+    print(f"Embedding {composer.warm()} major descriptions...")
+
+    events = fetch_events_local()
+    if not events:
+        print("No events found.")
+        return
+    print(f"Embedding {len(events)} events...")
+    event_embs = embedder.embed_texts([event_text(e) for e in events])
+
+    rng = np.random.default_rng(0)
+    interest_sets = [
+        ["coding", "hackathon", "ai"],
+        ["music", "theater", "dance"],
+        ["basketball", "athletics"],
+        ["research", "health", "policy"],
+        [],
+    ]
+    majors = rng.choice(sorted(majors_data), size=min(20, len(majors_data)), replace=False)
+    profiles = [
+        {"major": major.title(), "year": year, "interests": interests}
+        for major in majors
+        for year, interests in zip(["Freshman", "Junior", "Senior", "Sophomore", "Junior"], interest_sets)
+    ]
+
+    text_queries = embedder.embed_texts([build_query_text(p, majors_data) for p in profiles])
+    composed_queries = composer.compose_many(profiles)
+
+    text_scores = text_queries @ event_embs.T
+    composed_scores = composed_queries @ event_embs.T
+
+    cosines = np.sum(text_queries * composed_queries, axis=1)
+    rank_corr = [spearman(a, b) for a, b in zip(text_scores, composed_scores)]
+    overlap = [top_k_overlap(a, b) for a, b in zip(text_scores, composed_scores)]
+
+    print("\n" + "="*60)
+    print("QUERY MODE COMPARISON: composed vs full-text encoding")
+    print("="*60)
+    print(f"Profiles: {len(profiles)}   Events: {len(events)}")
+    print(f"Part weights: {composer.part_weights}")
+    print(f"Query cosine (mean / min):     {np.mean(cosines):.3f} / {np.min(cosines):.3f}")
+    print(f"Spearman rank corr (mean/min): {np.mean(rank_corr):.3f} / {np.min(rank_corr):.3f}")
+    print(f"Top-10 overlap (mean / min):   {np.mean(overlap):.3f} / {np.min(overlap):.3f}")
+    print("="*60)
+
+if __name__ == "__main__":
+    run_comparison()
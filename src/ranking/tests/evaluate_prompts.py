@@ -2,14 +2,30 @@
 import requests
 import sys
 import os
+import argparse
 import numpy as np
 from datetime import datetime, timezone
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
+sys.path.append(os.path.dirname(current_dir))
 
-from models.embeddings import Embedder
-from scorer import score_events
+from evaluation import DEFAULT_CACHE_DIR, EvaluationHarness, load_events, print_results, render_prompt
+
+PROFILE = {
+    "major": "Computer Science",
+    "interests": ["coding", "hackathon", "technology", "artificial intelligence"],
+    "year": "Junior"
+}
+
+# prompt strategies, as templates over the profile (see evaluation.render_prompt); each
+# renders to exactly the query text used in docs/prompt_eval_results.txt, so results stay
+# comparable (Strategy 2's wording is not a plain join of the interests, so it is spelled out)
+PROMPTS = {
+    "Strategy 1 (Tags)": "{major} {interest_words}",
+    "Strategy 2 (Natural)": "I am a {year} {major} student interested in coding, hackathons, technology, and artificial intelligence.",
+    "Strategy 3 (Role-Play)": "Target Persona: {major} Student. Key Interests: {interests}. Context: Academic and social events."
+}
 
 def fetch_events_local():
     print(f"Fetching Duke events...")
@@ -48,29 +64,13 @@ def fetch_events_local():
         print(e)
         return []
 
-def run_evaluation():
-    embedder = Embedder()
-    events = fetch_events_local()
+def run_evaluation(models=('all-MiniLM-L6-v2',), cache_dir=DEFAULT_CACHE_DIR, refresh=False, workers=None):
+    events = load_events(fetch_events_local, os.path.join(cache_dir, 'events.json'), refresh)
     if not events:
         print("No events.")
         return
 
-    print(f"Embedding {len(events)} events...")
-    event_texts = [f"{e['title']} {e['description']} {' '.join(e['tags'])}" for e in events]
-    event_embs = embedder.embed_texts(event_texts)
-
-    profile = {
-        "major": "Computer Science",
-        "interests": ["coding", "hackathon", "technology", "artificial intelligence"],
-        "year": "Junior"
-    }
-    
-    # prompt strategies
-    prompts = {
-        "Strategy 1 (Tags)": "Computer Science coding hackathon technology artificial intelligence",
-        "Strategy 2 (Natural)": "I am a Junior Computer Science student interested in coding, hackathons, technology, and artificial intelligence.",
-        "Strategy 3 (Role-Play)": "Target Persona: Computer Science Student. Key Interests: coding, hackathon, technology, artificial intelligence. Context: Academic and social events."
-    }
+    profile, prompts = PROFILE, PROMPTS
 
     # weights (focus on similarity to see prompt effect)
     weights = {'sim': 0.8, 'label': 0.1, 'recency': 0.1}
@@ -80,24 +80,21 @@ def run_evaluation():
     print("Comparing different query construction strategies for the same user profile.")
     print("="*80)
 
+    # every model x prompt pair; cached embeddings mean only new prompts/models are encoded
+    harness = EvaluationHarness(events, [profile], cache_dir, weights, k=3, workers=workers)
+    results = harness.run(list(models), prompts)
+
     results_table = []
+    for (model, name), metrics in results.items():
+        print(f"\n--- {name} [{model}] ---")
+        print(f"Query Text: \"{render_prompt(prompts[name], profile)}\"")
 
-    for name, text in prompts.items():
-        print(f"\n--- {name} ---")
-        print(f"Query Text: \"{text}\"")
-        
-        query_emb = embedder.embed_text(text)
-        ranked = score_events(query_emb, event_embs, events, profile, weights)
-        
-        top_3 = ranked[:3]
-        row = [name]
-        for item in top_3:
-            orig = next((e for e in events if e['id'] == item['id']), None)
-            title = orig['title'] if orig else "Unknown"
-            score = item['score']
-            print(f"  {score:.2f} | {title[:60]}")
-            row.append(f"{title[:40]}... ({score:.2f})")
-        results_table.append(row)
+        row = [f"{name} [{model}]" if len(models) > 1 else name]
+        for event_row in metrics['top_k'][0]:
+            title = events[event_row]['title']
+            print(f"  {title[:60]}")
+            row.append(f"{title[:40]}...")
+        results_table.append(row + [""] * (4 - len(row)))
 
     # print comparison table
     print("\n" + "="*80)
@@ -106,6 +103,13 @@ def run_evaluation():
     for row in results_table:
         print(f"{row[0]:<25} | {row[1]:<45} | {row[2]:<45} | {row[3]:<45}")
     print("="*80)
+    print_results(results, harness.k)
 
 if __name__ == "__main__":
-    run_evaluation()
+    parser = argparse.ArgumentParser(description="Compare query prompt strategies (optionally across models)")
+    parser.add_argument('--models', default='all-MiniLM-L6-v2', help="comma-separated sentence-transformers models")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="event snapshot + embedding cache")
+    parser.add_argument('--refresh', action='store_true', help="re-fetch the calendar instead of using the snapshot")
+    parser.add_argument('--workers', type=int, help="parallel model workers (defaults to CPU count)")
+    args = parser.parse_args()
+    run_evaluation(args.models.split(','), args.cache_dir, args.refresh, args.workers)
@@ -0,0 +1,45 @@
+import unittest
+import threading
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.embeddings import Embedder
+from models.batcher import MicroBatcher
+from test_embeddings import FakeModel
+
+class TestMicroBatcher(unittest.TestCase):
+    def setUp(self):
+        self.embedder = Embedder(model=FakeModel())
+        self.batcher = MicroBatcher(self.embedder, window_ms=50, max_batch=8)
+
+    def tearDown(self):
+        self.batcher.close()
+
+    def test_concurrent_requests_share_one_encode(self):
+        texts = [f"query {'a' * i}" for i in range(8)]
+        results = {}
+
+        def worker(text):
+            results[text] = self.batcher.encode(text, timeout=5)
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in texts]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.embedder.model.calls), 1)
+        self.assertEqual(self.batcher.stats()['max_batch_size'], 8)
+        for text in texts:
+            expected = self.embedder.model.encode([text])[0]
+            np.testing.assert_allclose(results[text], expected / np.linalg.norm(expected), atol=1e-6)
+
+    def test_cache_hit_skips_the_queue(self):
+        self.embedder.embed_text("hello")
+        self.batcher.encode("hello", timeout=5)
+        self.assertEqual(self.batcher.stats()['batches'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.cache import EmbeddingCache
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_keys_are_content_addressed(self):
+        key = EmbeddingCache.make_key('m', 'text')
+        self.assertEqual(key, EmbeddingCache.make_key('m', 'text'))
+        self.assertNotEqual(key, EmbeddingCache.make_key('m', 'edited text'))
+        self.assertNotEqual(key, EmbeddingCache.make_key('other-model', 'text'))
+
+    def test_lru_eviction_within_budget(self):
+        vec = np.zeros(64, dtype=np.float32)
+        entry_size = vec.nbytes + sys.getsizeof('a')
+        cache = EmbeddingCache(max_bytes=2 * entry_size)
+
+        cache.put('a', vec)
+        cache.put('b', vec)
+        cache.get('a')          # 'b' is now least recently used
+        cache.put('c', vec)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertLessEqual(stats['resident_bytes'], 2 * entry_size)
+
+    def test_ttl_expiry_and_counters(self):
+        now = [0.0]
+        cache = EmbeddingCache(ttl=10, clock=lambda: now[0])
+        cache.put('a', np.ones(4, dtype=np.float32))
+
+        self.assertIsNotNone(cache.get('a'))
+        now[0] = 11.0
+        self.assertIsNone(cache.get('a'))
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 1, 1))
+        self.assertEqual(stats['resident_bytes'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.embeddings import Embedder
+from models.composer import QueryComposer, build_query_text
+from test_embeddings import FakeModel
+
+class TestQueryComposer(unittest.TestCase):
+    def setUp(self):
+        self.embedder = Embedder(model=FakeModel())
+        self.majors = {'computer science': 'algorithms and software', 'history': 'the past'}
+        self.composer = QueryComposer(self.embedder, self.majors)
+
+    def test_warm_then_compose_needs_no_model_call(self):
+        self.composer.warm()
+        profile = {'major': 'Computer Science', 'year': 'Junior', 'interests': ['ai', 'tech']}
+        self.composer.compose(profile)
+        calls = len(self.embedder.model.calls)
+
+        query = self.composer.compose(profile)
+
+        self.assertEqual(len(self.embedder.model.calls), calls)
+        self.assertAlmostEqual(float(np.linalg.norm(query)), 1.0, places=5)
+
+    def test_compose_is_weighted_sum_of_parts(self):
+        profile = {'major': 'History', 'year': '', 'interests': ['art', 'film']}
+        w = self.composer.part_weights
+        expected = (w['major'] * self.embedder.embed_text('History the past')
+                    + w['interests'] * (self.embedder.embed_text('art') + self.embedder.embed_text('film')) / 2)
+
+        np.testing.assert_allclose(self.composer.compose(profile), expected / np.linalg.norm(expected), atol=1e-5)
+
+    def test_build_query_text_uses_major_description(self):
+        text = build_query_text({'major': 'History', 'year': 'Senior', 'interests': ['war']}, self.majors)
+        self.assertEqual(text, "History the past Senior war")
+        self.assertEqual(build_query_text({}, self.majors), "general")
+
+if __name__ == '__main__':
+    unittest.main()
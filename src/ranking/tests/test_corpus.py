@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import threading
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import EventCorpus
+from scorer import score_events
+
+class TestEventCorpus(unittest.TestCase):
+    def test_candidates_are_top_k_by_similarity(self):
+        rng = np.random.default_rng(0)
+        embs = rng.normal(size=(50, 8)).astype(np.float32)
+        embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+        events = [{'id': i, 'tags': [], 'start_timestamp': None} for i in range(50)]
+
+        corpus = EventCorpus(dimension=8)
+        corpus.replace(events, embs)
+
+        query = embs[7]
+        cand_events, cand_embs = corpus.candidates(query, k=5)
+        expected = np.argsort(-(embs @ query))[:5]
+
+        self.assertEqual([e['id'] for e in cand_events], list(expected))
+        np.testing.assert_array_equal(cand_embs, embs[expected])
+
+        weights = {'sim': 1.0, 'label': 0.0, 'recency': 0.0}
+        ranked = score_events(query, cand_embs, cand_events, {'interests': []}, weights)
+        self.assertEqual(ranked[0]['id'], 7)
+
+    def test_expire_drops_past_events_from_the_corpus(self):
+        rng = np.random.default_rng(1)
+        embs = rng.normal(size=(30, 8)).astype(np.float32)
+        now = time.time()
+        # ten events from two and three weeks ago, twenty upcoming
+        events = [{'id': f"e{i}", 'tags': ['t%d' % (i % 4)], 'start_timestamp': now - (2 + i // 5) * 7 * 86400}
+                  for i in range(10)] + \
+                 [{'id': f"e{i}", 'tags': ['t%d' % (i % 4)], 'start_timestamp': now + 3600 * i} for i in range(10, 30)]
+
+        corpus = EventCorpus(dimension=8)
+        corpus.replace(events, embs)
+        held = corpus.current
+        self.assertEqual(corpus.expire(now), 10)
+        self.assertEqual(corpus.expire(now), 0)
+
+        self.assertEqual(len(corpus), 20)
+        self.assertEqual([e['id'] for e in corpus.events], [f"e{i}" for i in range(10, 30)])
+        np.testing.assert_array_equal(corpus.embeddings, embs[10:])
+        self.assertEqual(corpus.positions['e10'], 0)
+        self.assertEqual(len(corpus.tags), 20)
+        rows = corpus.view().candidate_rows(embs[12], k=3, start=now)
+        self.assertEqual(corpus.events_at(rows)[0]['id'], 'e12')
+        # a snapshot taken before expiry stays consistent
+        self.assertEqual(len(held), 30)
+        self.assertEqual(held.events_at(held.candidate_rows(embs[12], k=1, start=now))[0]['id'], 'e12')
+
+    def test_conditional_replace_loses_to_a_newer_one(self):
+        embs = np.eye(8, dtype=np.float32)[:2]
+        corpus = EventCorpus(dimension=8)
+        generation = corpus.generation
+        self.assertTrue(corpus.replace([{'id': 'new', 'tags': []}], embs[:1]))
+        self.assertFalse(corpus.replace([{'id': 'old', 'tags': []}], embs[1:], if_generation=generation))
+        self.assertEqual([e['id'] for e in corpus.events], ['new'])
+        self.assertTrue(corpus.replace([{'id': 'old', 'tags': []}], embs[1:], if_generation=corpus.generation))
+
+    def test_searches_on_a_held_snapshot_survive_expiry(self):
+        rng = np.random.default_rng(2)
+        embs = rng.normal(size=(600, 8)).astype(np.float32)
+        now = time.time()
+        # one event per past week, so expiry has hundreds of buckets to drop
+        events = [{'id': f"e{i}", 'tags': [], 'start_timestamp': now - (300 - i) * 7 * 86400 if i < 300 else now + i}
+                  for i in range(600)]
+        errors = []
+
+        for _ in range(5):
+            corpus = EventCorpus(dimension=8)
+            corpus.replace(events, embs)
+            held = corpus.current
+            expected = [held.events_at(held.candidate_rows(embs[i], k=3, start=0)) for i in range(4)]
+            go = threading.Event()
+
+            def search(i):
+                go.wait()
+                try:
+                    for _ in range(20):
+                        self.assertEqual(held.events_at(held.candidate_rows(embs[i], k=3, start=0)), expected[i])
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=search, args=(i,)) for i in range(4)]
+            for t in threads:
+                t.start()
+            go.set()
+            self.assertEqual(corpus.expire(now), 300)
+            for t in threads:
+                t.join()
+            self.assertEqual(len(held.indexer), 600)
+
+        self.assertEqual(errors, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.embeddings import Embedder
+
+class FakeModel:
+    """Deterministic stand-in for SentenceTransformer that records encode calls."""
+    tokenizer = None
+
+    def __init__(self):
+        self.calls = []
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count('a'), t.count('e'), 1.0] for t in texts], dtype=np.float32)
+
+class TestEmbedder(unittest.TestCase):
+    def setUp(self):
+        self.embedder = Embedder(batch_size=2, model=FakeModel())
+
+    def test_batch_matches_single(self):
+        texts = ["a long piece of text here", "short", "medium text", "short"]
+        batch = self.embedder.embed_texts(texts)
+
+        self.assertEqual(batch.shape, (4, 4))
+        for text, row in zip(texts, batch):
+            expected = self.embedder.model.encode([text])[0]
+            np.testing.assert_allclose(row, expected / np.linalg.norm(expected), atol=1e-6)
+        np.testing.assert_allclose(np.linalg.norm(batch, axis=1), 1.0, atol=1e-6)
+
+    def test_dedup_and_cache_hits(self):
+        self.embedder.embed_texts(["x", "yy", "x"])
+        self.embedder.embed_texts(["yy", "zzz"])
+
+        encoded = [t for call in self.embedder.model.calls for t in call]
+        self.assertEqual(sorted(encoded), ["x", "yy", "zzz"])
+        # buckets are capped at batch_size and ordered by length
+        self.assertEqual(self.embedder.model.calls[0], ["x", "yy"])
+
+    def test_model_is_loaded_lazily(self):
+        with mock.patch('models.embeddings.load_model', return_value=FakeModel()) as load:
+            embedder = Embedder()
+            self.assertEqual(embedder.dimension, 384)
+            self.assertFalse(embedder.loaded)
+
+            embedder.embed_text("hello")
+            embedder.embed_text("again")
+
+        load.assert_called_once_with('all-MiniLM-L6-v2', 'torch', None)
+        self.assertTrue(embedder.loaded)
+
+    def test_onnx_backend_is_validated_at_construction(self):
+        with self.assertRaises(ValueError):
+            Embedder(backend='onnx')
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(FileNotFoundError):
+                Embedder(backend='onnx', model_dir=tmp)
+            with open(os.path.join(tmp, 'embedder_config.json'), 'w') as f:
+                json.dump({"dimension": 768, "max_seq_length": 128}, f)
+            embedder = Embedder(backend='onnx', model_dir=tmp)
+            self.assertEqual(embedder.dimension, 768)
+            self.assertFalse(embedder.loaded)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.embeddings import Embedder
+from evaluation import EvaluationHarness, ranking_metrics, render_prompt
+from test_embeddings import FakeModel
+
+class TestEvaluationHarness(unittest.TestCase):
+    def setUp(self):
+        now = time.time()
+        self.events = [
+            {'id': '1', 'title': 'Hackathon', 'description': 'coding all night', 'tags': ['Tech'], 'start_timestamp': now + 3600},
+            {'id': '2', 'title': 'Gallery opening', 'description': 'art and music', 'tags': ['Arts'], 'start_timestamp': now + 7200},
+            {'id': '3', 'title': 'Career fair', 'description': 'meet employers', 'tags': [], 'start_timestamp': now + 86400},
+        ]
+        self.profiles = [
+            {'major': 'Computer Science', 'year': 'Junior', 'interests': ['coding']},
+            {'major': 'Visual Arts', 'year': 'Senior', 'interests': ['music', 'art']},
+        ]
+        self.cache_dir = tempfile.mkdtemp()
+
+    def harness(self, model):
+        return EvaluationHarness(self.events, self.profiles, self.cache_dir, k=2, embedders={'fake': Embedder(model=model)})
+
+    def test_reruns_only_encode_new_texts(self):
+        prompts = {'tags': '{major} {interest_words}'}
+        first = self.harness(FakeModel())
+        results = first.run(['fake'], prompts)
+        self.assertEqual(first.encoded['fake'], len(self.events) + len(self.profiles))
+
+        model = FakeModel()
+        second = self.harness(model)
+        again = second.run(['fake'], prompts)
+        self.assertEqual(second.encoded['fake'], 0)
+        self.assertEqual(model.calls, [])
+        np.testing.assert_array_equal(again[('fake', 'tags')]['top_k'], results[('fake', 'tags')]['top_k'])
+
+        # a new prompt costs only its own query encodes
+        third = self.harness(FakeModel())
+        third.run(['fake'], {**prompts, 'natural': 'I am a {year} {major} student interested in {interests}.'})
+        self.assertEqual(third.encoded['fake'], len(self.profiles))
+
+    def test_keyword_relevance_metrics(self):
+        results = self.harness(FakeModel()).run(['fake'], {'tags': '{interest_words}'})
+        metrics = results[('fake', 'tags')]
+        self.assertEqual(metrics['top_k'].shape, (2, 2))
+        for name in ('precision', 'ndcg', 'mrr'):
+            self.assertTrue(0.0 <= metrics['summary'][name] <= 1.0)
+
+    def test_ranking_metrics(self):
+        scores = np.array([[0.9, 0.8, 0.1], [0.1, 0.2, 0.9]])
+        relevance = np.array([[True, False, False], [True, False, False]])
+        metrics = ranking_metrics(scores, relevance, k=2)
+        np.testing.assert_allclose(metrics['precision'], [0.5, 0.0])
+        np.testing.assert_allclose(metrics['mrr'], [1.0, 0.0])
+        np.testing.assert_allclose(metrics['ndcg'], [1.0, 0.0])
+
+    def test_render_prompt(self):
+        text = render_prompt("Target Persona: {major} Student. Key Interests: {interests}.", self.profiles[1])
+        self.assertEqual(text, "Target Persona: Visual Arts Student. Key Interests: music, art.")
+
+    def test_prompt_strategies_render_the_original_queries(self):
+        from evaluate_prompts import PROFILE, PROMPTS
+        self.assertEqual([render_prompt(template, PROFILE) for template in PROMPTS.values()], [
+            "Computer Science coding hackathon technology artificial intelligence",
+            "I am a Junior Computer Science student interested in coding, hackathons, technology, and artificial intelligence.",
+            "Target Persona: Computer Science Student. Key Interests: coding, hackathon, technology, artificial intelligence. "
+            "Context: Academic and social events."
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
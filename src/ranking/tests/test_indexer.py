@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indexer import EventIndexer, TimePartitionedIndexer
+
+def random_unit(rng, n, d=16):
+    vecs = rng.normal(size=(n, d)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+class TestEventIndexer(unittest.TestCase):
+    def test_incremental_matches_rebuild(self):
+        rng = np.random.default_rng(42)
+        truth = {f"evt-{i}": v for i, v in enumerate(random_unit(rng, 40))}
+
+        incremental = EventIndexer(dimension=16)
+        incremental.build_index(np.array(list(truth.values())), list(truth))
+
+        # edits, cancellations, and new events
+        edited = {f"evt-{i}": v for i, v in zip(range(0, 10), random_unit(rng, 10))}
+        added = {f"new-{i}": v for i, v in enumerate(random_unit(rng, 5))}
+        cancelled = [f"evt-{i}" for i in range(30, 35)] + ["never-indexed"]
+
+        incremental.upsert(list(edited), np.array(list(edited.values())))
+        incremental.stage_upsert(list(added), list(added.values()))
+        incremental.stage_remove(cancelled)
+        incremental.apply_pending()
+
+        truth.update(edited)
+        truth.update(added)
+        for eid in cancelled:
+            truth.pop(eid, None)
+
+        rebuilt = EventIndexer(dimension=16)
+        rebuilt.build_index(np.array(list(truth.values())), list(truth))
+
+        self.assertEqual(len(incremental), len(truth))
+        self.assertTrue(incremental.contains("new-3"))
+        self.assertFalse(incremental.contains("evt-31"))
+        for query in random_unit(rng, 10):
+            got = incremental.search(query, k=10)
+            expected = rebuilt.search(query, k=10)
+            self.assertEqual([eid for eid, _ in got], [eid for eid, _ in expected])
+            np.testing.assert_allclose([s for _, s in got], [s for _, s in expected], atol=1e-6)
+
+    def test_approximate_types_support_upsert_and_remove(self):
+        rng = np.random.default_rng(7)
+        vectors = random_unit(rng, 500)
+        ids = [f"evt-{i}" for i in range(500)]
+        for index_type in ('ivf_flat', 'ivf_pq', 'hnsw'):
+            indexer = EventIndexer(dimension=16, index_type=index_type, nlist=4)
+            indexer.build_index(vectors, ids)
+
+            indexer.remove(["evt-3"])
+            indexer.upsert(["evt-4"], vectors[5:6])
+            hits = [eid for eid, _ in indexer.search(vectors[5], k=5, nprobe=4, ef_search=200)]
+
+            self.assertNotIn("evt-3", indexer.event_ids)
+            self.assertIn("evt-4", hits[:2], index_type)
+            self.assertEqual(len(set(hits)), len(hits))
+            self.assertEqual(len(indexer), 499)
+
+class TestTimePartitionedIndexer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.week = 7 * 86400
+        self.vectors = random_unit(rng, 60)
+        self.ids = [f"evt-{i}" for i in range(60)]
+        # spread events over ten weeks, one undated
+        self.timestamps = [i * self.week / 6 for i in range(59)] + [None]
+        self.indexer = TimePartitionedIndexer(dimension=16, bucket_seconds=self.week)
+        self.indexer.build_index(self.vectors, self.ids, self.timestamps)
+        self.query = rng.normal(size=16).astype(np.float32)
+
+    def brute_force(self, start, end, k):
+        keep = [i for i, ts in enumerate(self.timestamps) if ts is None or start <= ts <= end]
+        sims = self.vectors[keep] @ self.query
+        return [self.ids[keep[i]] for i in np.argsort(-sims)[:k]]
+
+    def test_window_search_matches_brute_force(self):
+        start, end = 2.5 * self.week, 5.2 * self.week
+        hits = self.indexer.search(self.query, k=8, start=start, end=end)
+        self.assertEqual([eid for eid, _ in hits], self.brute_force(start, end, 8))
+
+    def test_open_ended_windows_match_brute_force(self):
+        for start, end in ((4.3 * self.week, None), (None, 1.7 * self.week)):
+            hits = self.indexer.search(self.query, k=6, start=start, end=end)
+            expected = self.brute_force(-np.inf if start is None else start, np.inf if end is None else end, 6)
+            self.assertEqual([eid for eid, _ in hits], expected)
+
+    def test_edge_timestamps_follow_upserts(self):
+        start = 2.5 * self.week
+        self.indexer.upsert(["evt-14"], self.query[None, :], [3.05 * self.week - 1])   # into the window
+        hits = self.indexer.search(self.query, k=1, start=start, end=5.2 * self.week)
+        self.assertEqual(hits[0][0], "evt-14")
+        self.indexer.upsert(["evt-14"], self.query[None, :], [2.4 * self.week])        # out again, same bucket
+        hits = self.indexer.search(self.query, k=60, start=start, end=5.2 * self.week)
+        self.assertNotIn("evt-14", [eid for eid, _ in hits])
+
+    def test_expire_drops_past_buckets(self):
+        dropped = self.indexer.expire(now=3.5 * self.week)
+
+        self.assertEqual(dropped, 18)   # weeks 0-2, six events each
+        self.assertFalse(self.indexer.contains("evt-0"))
+        self.assertTrue(self.indexer.contains("evt-59"))
+        self.assertEqual(min(k for k in self.indexer.buckets if k is not None), 3)
+
+    def test_expired_leaves_the_original_untouched(self):
+        before = self.indexer.search(self.query, k=60)
+        indexer, dropped = self.indexer.expired(now=3.5 * self.week)
+
+        self.assertEqual(dropped, 18)
+        self.assertEqual(len(indexer), 42)
+        self.assertFalse(indexer.contains("evt-0"))
+        self.assertEqual(len(self.indexer), 60)
+        self.assertEqual(self.indexer.search(self.query, k=60), before)
+        self.assertIs(self.indexer.expired(now=0)[0], self.indexer)
+
+if __name__ == '__main__':
+    unittest.main()
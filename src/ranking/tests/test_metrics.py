@@ -0,0 +1,41 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import MetricsRegistry, RequestTimer
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram('stage_seconds', 'Stage time.', buckets=(0.01, 0.1), label='stage')
+        for value in (0.005, 0.05, 0.05, 3.0):
+            hist.observe(value, 'score')
+
+        text = registry.render()
+        self.assertIn('# TYPE stage_seconds histogram', text)
+        self.assertIn('stage_seconds_bucket{stage="score",le="0.01"} 1', text)
+        self.assertIn('stage_seconds_bucket{stage="score",le="0.1"} 3', text)
+        self.assertIn('stage_seconds_bucket{stage="score",le="+Inf"} 4', text)
+        self.assertIn('stage_seconds_count{stage="score"} 4', text)
+
+    def test_gauges_read_at_scrape_time(self):
+        registry = MetricsRegistry()
+        state = {'n': 1}
+        registry.gauge('corpus_events', 'Events.', lambda: state['n'])
+        state['n'] = 5
+        self.assertIn('corpus_events 5.0', registry.render())
+
+    def test_server_timing_header(self):
+        timer = RequestTimer()
+        with timer.stage('parse'):
+            pass
+        with timer.stage('score'):
+            pass
+        header = timer.server_timing()
+        self.assertTrue(header.startswith('parse;dur='))
+        self.assertIn(', score;dur=', header)
+        self.assertIn('total;dur=', header)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import tempfile
+import importlib.util
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.embeddings import Embedder
+
+HAS_ONNX = all(importlib.util.find_spec(m) for m in ('onnx', 'onnxruntime', 'sentence_transformers'))
+
+def tiny_sentence_transformer(path):
+    """Randomly initialized 2-layer BERT, so the export can be tested offline."""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+    from sentence_transformers import SentenceTransformer, models
+
+    words = "robotics workshop learn about robots and tech history seminar ancient music concert".split()
+    with open(os.path.join(path, 'vocab.txt'), 'w') as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words))
+    BertTokenizerFast(os.path.join(path, 'vocab.txt')).save_pretrained(path)
+    config = BertConfig(vocab_size=5 + len(words), hidden_size=32, num_hidden_layers=2,
+                        num_attention_heads=2, intermediate_size=64)
+    BertModel(config).save_pretrained(path)
+    return SentenceTransformer(modules=[models.Transformer(path, max_seq_length=64), models.Pooling(32)])
+
+@unittest.skipUnless(HAS_ONNX, "onnx/onnxruntime not installed")
+class TestOnnxBackend(unittest.TestCase):
+    def test_exported_int8_agrees_with_reference(self):
+        from models.onnx_backend import export_onnx, cosine_agreement
+
+        with tempfile.TemporaryDirectory() as tmp:
+            reference = Embedder(model=tiny_sentence_transformer(tmp))
+            export_onnx(reference.model, os.path.join(tmp, 'onnx'))
+            candidate = Embedder(backend='onnx', model_dir=os.path.join(tmp, 'onnx'))
+
+            texts = ["robotics workshop", "learn about robots and tech", "ancient history seminar", "music concert"]
+            agreement = cosine_agreement(reference, candidate, texts, threshold=0.98)
+
+            self.assertTrue(agreement['passed'], agreement)
+            self.assertEqual(candidate.embed_texts(texts).shape, (4, 32))
+            self.assertNotEqual(candidate.cache_key("x"), reference.cache_key("x"))
+
+if __name__ == '__main__':
+    unittest.main()
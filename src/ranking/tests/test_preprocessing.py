@@ -0,0 +1,164 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+from unittest import mock
+import numpy as np
+import requests
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), 'data'))
+
+from preprocessing import (NearDuplicateFilter, SyncCheckpoint, clean_event_data, iter_json_array, new_stats,
+                           stream_raw_events, write_delta)
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class TestStreamingParser(unittest.TestCase):
+    def test_elements_across_chunk_boundaries(self):
+        items = [{"event": {"id": str(i), "summary": "a, b ] c", "nested": [1, {"x": "}"}]}} for i in range(50)]
+        text = json.dumps({"meta": {"events": "not this"}, "events": items, "after": 1})
+        for size in (1, 7, 64, len(text)):
+            self.assertEqual(list(iter_json_array(chunked(text, size))), items, size)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(['{"events": [ ]}'])), [])
+
+    def test_truncated_feed_raises(self):
+        text = json.dumps({"events": [{"id": 1}, {"id": 2}]})
+        for cut in (text.index('{"id": 2}'), text.index('{"id": 2}') + 4, len(text) - 2):
+            with self.assertRaises(ValueError, msg=cut):
+                list(iter_json_array(chunked(text[:cut], 5)))
+
+    def test_missing_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['{"error": "rate limited"}']))
+
+    def test_fetch_errors_are_raised(self):
+        with mock.patch('preprocessing.requests.get', side_effect=requests.ConnectionError("down")):
+            with self.assertRaises(requests.ConnectionError):
+                list(stream_raw_events(urls=["http://calendar.invalid/events.json"]))
+
+class TestSyncCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'checkpoint.json')
+        self.delta_path = os.path.join(self.tmp.name, 'delta.ndjson')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def events(self, *pairs):
+        return [{"id": eid, "title": title} for eid, title in pairs]
+
+    def test_delta_against_previous_run(self):
+        write_delta(SyncCheckpoint(self.path).diff(self.events(('1', 'a'), ('2', 'b'), ('3', 'c'))))
+
+        counts = write_delta(SyncCheckpoint(self.path).diff(self.events(('1', 'a'), ('2', 'B'), ('4', 'd'))),
+                             self.delta_path)
+        self.assertEqual(counts, {"added": 1, "changed": 1, "removed": 1})
+        with open(self.delta_path) as f:
+            ops = [(line['op'], line['event']['id']) for line in map(json.loads, f)]
+        self.assertEqual(ops, [("changed", '2'), ("added", '4'), ("removed", '3')])
+        self.assertEqual(set(SyncCheckpoint(self.path).hashes), {'1', '2', '4'})
+
+    def test_full_run_ignores_checkpoint(self):
+        write_delta(SyncCheckpoint(self.path).diff(self.events(('1', 'a'))))
+        counts = write_delta(SyncCheckpoint(self.path, resume=False).diff(self.events(('1', 'a'))))
+        self.assertEqual(counts, {"added": 1, "changed": 0, "removed": 0})
+
+    def test_failed_stream_keeps_checkpoint_and_previous_delta(self):
+        write_delta(SyncCheckpoint(self.path).diff(self.events(('1', 'a'), ('2', 'b'))), self.delta_path)
+        with open(self.path) as f:
+            saved = f.read()
+        with open(self.delta_path) as f:
+            previous_delta = f.read()
+
+        def failing_stream():
+            yield from self.events(('1', 'a'))
+            raise requests.ConnectionError("connection reset")
+
+        with self.assertRaises(requests.ConnectionError):
+            write_delta(SyncCheckpoint(self.path).diff(failing_stream()), self.delta_path)
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), saved)
+        with open(self.delta_path) as f:
+            self.assertEqual(f.read(), previous_delta)
+        self.assertFalse(os.path.exists(self.delta_path + '.tmp'))
+
+DAY = 86400
+DESCRIPTION = ("Join the robotics club for an evening of hands on building with arduino kits, "
+               "short talks from senior design teams and free pizza in the engineering quad")
+
+def event(eid, day=20000, title="Robotics Night", description=DESCRIPTION):
+    return {"id": eid, "title": title, "description": description, "start_timestamp": day * DAY + 3600, "tags": []}
+
+class TestNearDuplicateFilter(unittest.TestCase):
+    def run_filter(self, events, **kwargs):
+        stats = new_stats()
+        kept = list(NearDuplicateFilter(**kwargs).filter(events, stats))
+        return [e['id'] for e in kept], stats
+
+    def test_same_day_cross_post_is_dropped(self):
+        copy = event('2', description=DESCRIPTION.replace("free pizza", "free snacks") + ".")
+        kept, stats = self.run_filter([event('1'), copy, event('3', title="Chamber Music", description="Bach and Handel")])
+        self.assertEqual(kept, ['1', '3'])
+        self.assertEqual(stats['removed_near_duplicates'], 1)
+
+    def test_other_days_are_not_duplicates(self):
+        # a weekly series has identical text on different days
+        kept, stats = self.run_filter([event('1', day=20000), event('2', day=20007), event('3', day=20001)])
+        self.assertEqual(kept, ['1', '2', '3'])
+        self.assertEqual(stats['removed_near_duplicates'], 0)
+
+    def test_threshold_edges(self):
+        near = DESCRIPTION.replace("free pizza", "free snacks")
+        f = NearDuplicateFilter()
+        estimate = np.mean(f.signature(f.text(event('1'))) == f.signature(f.text(event('2', description=near))))
+        self.assertTrue(0 < estimate < 1)
+
+        kept, _ = self.run_filter([event('1'), event('2', description=near)], threshold=estimate)
+        self.assertEqual(kept, ['1'])   # an estimate equal to the threshold is a duplicate
+        kept, _ = self.run_filter([event('1'), event('2', description=near)], threshold=estimate + 1 / 64)
+        self.assertEqual(kept, ['1', '2'])
+        kept, _ = self.run_filter([event('1'), event('2')], threshold=1.0)
+        self.assertEqual(kept, ['1'])   # exact copies always clear the threshold
+
+    def test_embedding_confirmation(self):
+        calls = []
+
+        def embed(vectors):
+            def fn(text):
+                calls.append(text)
+                return vectors['pizza' in text]
+            return fn
+
+        events = [event('1'), event('2', description=DESCRIPTION.replace("free pizza", "free snacks")),
+                  event('3', title="Chamber Music", description="Bach and Handel in the chapel")]
+        same = {True: np.array([1.0, 0.0]), False: np.array([1.0, 0.0])}
+        kept, _ = self.run_filter(events, embed=embed(same))
+        self.assertEqual(kept, ['1', '3'])
+        self.assertEqual(len(calls), 2)     # only the colliding pair is embedded
+
+        different = {True: np.array([1.0, 0.0]), False: np.array([0.0, 1.0])}
+        kept, stats = self.run_filter(events, embed=embed(different), min_cosine=0.9)
+        self.assertEqual(kept, ['1', '2', '3'])
+        self.assertEqual(stats['removed_near_duplicates'], 0)
+
+    def test_clean_event_data_drops_near_duplicates_by_default(self):
+        def raw(eid, summary, description):
+            return {"event": {"id": eid, "summary": summary, "description": description,
+                              "start": {"utcdate": "20250301T180000Z"}}}
+
+        cleaned, stats = clean_event_data([
+            raw('1', "Robotics Night", DESCRIPTION),
+            raw('2', "Robotics  Night", DESCRIPTION + " !"),
+            raw('3', "Chamber Music", "Bach and Handel")
+        ])
+        self.assertEqual([e['id'] for e in cleaned], ['1', '3'])
+        self.assertEqual(stats['removed_near_duplicates'], 1)
+        self.assertEqual(stats['final_count'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
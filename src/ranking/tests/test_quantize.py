@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.quantize import QuantizedMatrix
+from indexer import EventIndexer
+from scorer import score_events
+
+def random_unit(rng, n, d=32):
+    vecs = rng.normal(size=(n, d)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+class TestQuantizedMatrix(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.matrix = random_unit(rng, 2000)
+        self.queries = random_unit(rng, 5)
+
+    def test_similarities_close_to_float32(self):
+        for mode, tol, ratio in (('float16', 2e-3, 2), ('int8', 2e-2, 3.5)):
+            q = QuantizedMatrix.from_float(self.matrix, mode)
+            np.testing.assert_allclose(q.similarities(self.queries[0]), self.matrix @ self.queries[0], atol=tol)
+            np.testing.assert_allclose(q.similarities(self.queries), self.queries @ self.matrix.T, atol=tol)
+            np.testing.assert_allclose(q.rows([3, 9]), self.matrix[[3, 9]], atol=tol)
+            self.assertGreaterEqual(self.matrix.nbytes / q.nbytes, ratio)
+
+    def test_rescored_search_matches_exact_top_k(self):
+        q = QuantizedMatrix.from_float(self.matrix, 'int8')
+        for query in self.queries:
+            hits = q.search(query, k=10, exact=self.matrix)
+            expected = np.argsort(-(self.matrix @ query))[:10]
+            self.assertEqual([row for row, _ in hits], list(expected))
+
+    def test_score_events_accepts_compressed_matrix(self):
+        events = [{'id': str(i), 'tags': [], 'start_timestamp': None} for i in range(len(self.matrix))]
+        weights = {'sim': 1.0, 'label': 0.0, 'recency': 0.0}
+        compressed = score_events(self.queries[0], QuantizedMatrix.from_float(self.matrix, 'float16'), events, {}, weights)
+        exact = score_events(self.queries[0], self.matrix, events, {}, weights)
+        self.assertEqual(compressed[0]['id'], exact[0]['id'])
+
+    def test_sq8_index_with_rescoring(self):
+        ids = [f"evt-{i}" for i in range(len(self.matrix))]
+        indexer = EventIndexer(dimension=32, index_type='sq8')
+        indexer.build_index(self.matrix, ids)
+        lookup = dict(zip(ids, self.matrix))
+
+        hits = indexer.search(self.queries[1], k=10, rescore=lambda eids: [lookup[e] for e in eids])
+        expected = [ids[i] for i in np.argsort(-(self.matrix @ self.queries[1]))[:10]]
+        self.assertEqual([eid for eid, _ in hits], expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,9 +2,37 @@ import unittest
 import json
 import sys
 import os
+import time
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import app as ranking_app
 from app import app
+from corpus import EventCorpus
+from models.store import EmbeddingStore
+
+class FakeModel:
+    """384-d stand-in for the sentence-transformers model."""
+    def get_sentence_embedding_dimension(self):
+        return 384
+
+    def encode(self, texts, **kwargs):
+        out = np.zeros((len(texts), 384), dtype=np.float32)
+        out[:, 0] = 1.0
+        return out
+
+@contextmanager
+def fake_model_state():
+    """Fake model (unless a real one is loaded) with a throwaway store and corpus, so tests never persist its vectors."""
+    with tempfile.TemporaryDirectory() as tmp:
+        embedder = ranking_app.embedder
+        with mock.patch.object(embedder, '_model', embedder._model or FakeModel()), \
+                mock.patch.object(ranking_app, 'event_store', EmbeddingStore(tmp, embedder.model_id, embedder.dimension)), \
+                mock.patch.object(ranking_app, 'corpus', EventCorpus(embedder.dimension)):
+            yield
 
 class TestRankingUntegration(unittest.TestCase):
     def setUp(self):
@@ -49,5 +77,101 @@ class TestRankingUntegration(unittest.TestCase):
         self.assertTrue(data[0]['score'] > data[1]['score'])
         print(f"Scores: Event 1 ({data[0]['score']}), Event 2 ({data[1]['score']})")
 
+    def test_health_turns_ready_after_first_request(self):
+        with fake_model_state():
+            first = self.app.get('/health')     # kicks off warm-up in the background
+            deadline = time.time() + 60
+            response = first
+            while response.status_code != 200 and time.time() < deadline:
+                time.sleep(0.05)
+                response = self.app.get('/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['ready'])
+
+    def test_warm_up_does_not_overwrite_a_corpus_posted_meanwhile(self):
+        saved = [{"id": "old", "title": "Saved event", "tags": []}]
+        posted = [{"id": "new", "title": "Posted event", "tags": []}]
+        with fake_model_state():
+            def load_saved():
+                # the backend's POST /corpus lands while warm-up is reading corpus.json
+                self.assertEqual(self.app.post('/corpus', json={"events": posted}).status_code, 200)
+                return saved
+
+            with mock.patch.object(ranking_app.corpus, 'load_saved', load_saved):
+                ranking_app.warm_up()
+            self.assertEqual([e['id'] for e in ranking_app.corpus.events], ["new"])
+
+    def test_invalid_k_is_rejected(self):
+        for k in (0, -5, "many", [3]):
+            response = self.app.post('/rank', json={"user_profile": {"interests": ["tech"]}, "k": k})
+            self.assertEqual(response.status_code, 400, k)
+            self.assertEqual(response.json['error'], 'invalid_parameter')
+
+    def test_invalid_paging_is_rejected(self):
+        for paging in ({"limit": -1}, {"offset": -3}, {"offset": "x"}, {"limit": {}}):
+            response = self.app.post('/rank', json={"user_profile": {"interests": ["tech"]}, **paging})
+            self.assertEqual(response.status_code, 400, paging)
+
+    def test_corpus_page_reports_rankable_total(self):
+        now = time.time()
+        events = [{"id": str(i), "title": f"Event {i}", "tags": ["tech"],
+                   "start_timestamp": now + (i - 10) * 3600 + 60} for i in range(40)]   # ten already started
+        with fake_model_state():
+            self.assertEqual(self.app.post('/corpus', json={"events": events}).status_code, 200)
+            response = self.app.post('/rank', json={"user_profile": {"interests": ["tech"]}, "k": 3,
+                                                    "format": "columnar", "limit": 5, "offset": 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Total-Count'], '30')
+        self.assertEqual(len(response.json['ids']), 5)
+
+    def test_rank_reports_the_corpus_version(self):
+        profile = {"user_profile": {"interests": ["tech"]}}
+        with fake_model_state():
+            self.assertEqual(self.app.post('/rank', json=profile).headers['X-Corpus-Version'], '0')
+            synced = self.app.post('/corpus', json={"events": [{"id": "1", "title": "Hack Night", "tags": []}]})
+            response = self.app.post('/rank', json=profile)
+        self.assertEqual(response.headers['X-Corpus-Version'], str(synced.json['corpus_version']))
+        self.assertNotEqual(synced.json['corpus_version'], 0)
+
+    def test_rank_batch_stream_is_timed_in_metrics(self):
+        def count(metrics, series):
+            line = next((l for l in metrics.splitlines() if l.startswith(series + ' ')), None)
+            return float(line.split()[-1]) if line else 0.0
+
+        route = 'ranking_request_seconds_count{route="rank_batch"}'
+        before = count(self.app.get('/metrics').get_data(as_text=True), route)
+        events = [{"id": str(i), "title": f"Event {i}", "tags": ["tech"]} for i in range(5)]
+        with fake_model_state():
+            response = self.app.post('/rank_batch', json={"events": events, "k": 2,
+                                                          "user_profiles": [{"interests": ["tech"]}, {"interests": []}]})
+            lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertNotIn('Server-Timing', response.headers)
+        metrics = self.app.get('/metrics').get_data(as_text=True)
+        self.assertEqual(count(metrics, route), before + 1)
+        self.assertGreater(count(metrics, 'ranking_stage_seconds_count{stage="score"}'), 0)
+
+    def test_rank_batch_on_the_corpus_skips_started_events(self):
+        now = time.time()
+        events = [{"id": str(i), "title": f"Event {i}", "tags": ["tech"],
+                   "start_timestamp": now + (i - 5) * 3600 + 60} for i in range(10)]   # five already started
+        profiles = [{"id": "u1", "interests": ["tech"]}]
+
+        def ranked_ids(**window):
+            response = self.app.post('/rank_batch', json={"user_profiles": profiles, "k": 20, **window})
+            self.assertEqual(response.status_code, 200)
+            return sorted(r['id'] for r in json.loads(response.get_data(as_text=True))['results'])
+
+        with fake_model_state():
+            self.app.post('/corpus', json={"events": events})
+            self.assertEqual(ranked_ids(), [str(i) for i in range(5, 10)])
+            self.assertEqual(ranked_ids(start=now - 86400, end=now + 2 * 3600), [str(i) for i in range(7)])
+            self.assertEqual(self.app.post('/rank_batch', json={"user_profiles": profiles, "end": "soon"}).status_code, 400)
+
+    def test_invalid_window_is_rejected(self):
+        for window in ({"start": "next tuesday"}, {"end": [1]}, {"start": True}):
+            response = self.app.post('/rank', json={"user_profile": {"interests": ["tech"]}, **window})
+            self.assertEqual(response.status_code, 400, window)
+
 if __name__ == '__main__':
     unittest.main()
@@ -3,7 +3,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scorer import score_events
+import time
+import numpy as np
+from scorer import rank_order, score_events, score_events_batch, score_matrix, recency_scores, calculate_recency_score, event_timestamps, event_tag_lists
 
 class TestScorer(unittest.TestCase):
     def test_score_simple(self):
@@ -43,5 +45,96 @@ class TestScorer(unittest.TestCase):
         
         pass
 
+    def test_recency_matches_scalar(self):
+        now = time.time()
+        events = [
+            {'start_timestamp': now + 86400 * d + 60} for d in (-3, 0, 1, 10, 29, 45)
+        ] + [{'start_timestamp': None}, {'start_timestamp': '2025-01-01T00:00:00Z'}]
+
+        vectorized = recency_scores(event_timestamps(events), now)
+        scalar = [calculate_recency_score(e['start_timestamp']) for e in events]
+
+        np.testing.assert_allclose(vectorized, scalar, atol=1e-6)
+
+    def test_score_matrix_columns(self):
+        now = 1_700_000_000.0
+        events = [
+            {'id': 'a', 'tags': ['Technology'], 'start_timestamp': now + 86400 * 3},
+            {'id': 'b', 'tags': ['History'], 'start_timestamp': now - 86400},
+        ]
+        matrix = np.array([[1.0, 0.0], [0.6, 0.8]], dtype=np.float32)
+
+        scores = score_matrix([1.0, 0.0], matrix, event_timestamps(events),
+                              event_tag_lists(events), {'interests': ['Tech']}, now=now)
+
+        np.testing.assert_allclose(scores['sim'], [1.0, 0.6], atol=1e-6)
+        np.testing.assert_allclose(scores['label'], [1.0, 0.0])
+        np.testing.assert_allclose(scores['recency'], [0.9, 0.0])
+        np.testing.assert_allclose(scores['score'], [0.7 + 0.1 + 0.18, 0.42], atol=1e-6)
+
+    def test_batch_matches_single_profile_scoring(self):
+        rng = np.random.default_rng(1)
+        event_embs = rng.normal(size=(30, 8)).astype(np.float32)
+        event_embs /= np.linalg.norm(event_embs, axis=1, keepdims=True)
+        query_embs = event_embs[:4] + 0.1
+        events = [{'id': str(i), 'tags': ['tech' if i % 3 else 'arts'],
+                   'start_timestamp': time.time() + 86400 * (i % 20)} for i in range(30)]
+        profiles = [{'interests': ['tech']}, {'interests': ['arts']}, {'interests': []}, {'interests': ['Te']}]
+
+        batch = list(score_events_batch(query_embs, event_embs, events, profiles, top_k=5))
+
+        self.assertEqual(len(batch), 4)
+        for query_emb, profile, ranked in zip(query_embs, profiles, batch):
+            self.assertEqual(ranked, score_events(query_emb, event_embs, events, profile)[:5])
+
+    def test_provisional_events_use_renormalized_label_and_recency(self):
+        now = time.time()
+        events = [
+            {'id': 'a', 'tags': ['tech'], 'start_timestamp': now + 3600},
+            {'id': 'b', 'tags': ['tech'], 'start_timestamp': now + 3600},
+        ]
+        event_embs = [[1.0, 0.0], [0.0, 0.0]]
+        weights = {'sim': 0.5, 'label': 0.3, 'recency': 0.2}
+
+        results = score_events([1.0, 0.0], event_embs, events, {'interests': ['tech']}, weights,
+                               provisional=[False, True])
+        by_id = {r['id']: r for r in results}
+
+        self.assertAlmostEqual(by_id['a']['score'], 1.0)
+        self.assertAlmostEqual(by_id['b']['score'], 1.0)    # (0.3 * 1 + 0.2 * 1) / 0.5
+        self.assertTrue(by_id['b']['details']['provisional'])
+        self.assertNotIn('provisional', by_id['a']['details'])
+
+    def test_columnar_matches_rows(self):
+        rng = np.random.default_rng(3)
+        now = time.time()
+        events = [{'id': f'e{i}', 'tags': ['tech'] if i % 2 else [], 'start_timestamp': now + i * 86400} for i in range(30)]
+        event_embs = rng.normal(size=(30, 8))
+        query_emb = rng.normal(size=8)
+        profile = {'interests': ['tech']}
+
+        rows = score_events(query_emb, event_embs, events, profile)
+        columns = score_events(query_emb, event_embs, events, profile, columnar=True, details=True)
+
+        self.assertEqual(columns['ids'], [r['id'] for r in rows])
+        self.assertEqual(columns['scores'], [r['score'] for r in rows])
+        self.assertEqual(columns['sim'], [r['details']['sim'] for r in rows])
+        self.assertNotIn('sim', score_events(query_emb, event_embs, events, profile, columnar=True))
+
+    def test_paged_rank_order_matches_full_sort(self):
+        rng = np.random.default_rng(4)
+        scores = rng.integers(0, 20, size=500) / 20.0     # plenty of ties
+        full = rank_order(scores)
+        for limit, offset in ((1, 0), (10, 0), (10, 95), (50, 480), (100, 600), (0, 0)):
+            np.testing.assert_array_equal(rank_order(scores, limit, offset), full[offset:offset + limit])
+        np.testing.assert_array_equal(rank_order(scores, None, 7), full[7:])
+
+    def test_score_events_pagination(self):
+        now = time.time()
+        events = [{'id': str(i), 'tags': [], 'start_timestamp': now + i * 86400} for i in range(12)]
+        event_embs = np.zeros((12, 2))
+        full = score_events([1.0, 0.0], event_embs, events, {'interests': []})
+        self.assertEqual(score_events([1.0, 0.0], event_embs, events, {'interests': []}, limit=4, offset=2), full[2:6])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import EventCorpus
+from shared_corpus import SharedCorpus
+from scorer import label_scores
+
+def make_corpus(n=60, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    embs = rng.normal(size=(n, dim)).astype(np.float32)
+    embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+    now = time.time()
+    events = [{'id': f"evt-{i}", 'tags': ['Tech'] if i % 3 == 0 else ['Music'],
+               'start_timestamp': None if i % 10 == 0 else now + (i - 20) * 3600} for i in range(n)]
+    return events, embs
+
+class TestSharedCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'corpus')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_empty_before_first_publish(self):
+        corpus = SharedCorpus(self.root, dimension=8)
+        self.assertEqual(len(corpus), 0)
+        self.assertEqual(corpus.version, 0)
+        self.assertEqual(len(corpus.view().candidate_rows(np.ones(8, dtype=np.float32))), 0)
+
+    def test_candidates_match_local_corpus(self):
+        events, embs = make_corpus()
+        local = EventCorpus(dimension=8)
+        local.replace(events, embs)
+        shared = SharedCorpus(self.root, dimension=8)
+        shared.replace(events, embs)
+
+        view = shared.view()
+        query = embs[25]
+        rows = view.candidate_rows(query, k=10)
+        np.testing.assert_array_equal(rows, local.candidate_rows(query, k=10))
+        self.assertEqual(view.events_at(rows), [{'id': events[r]['id']} for r in rows])
+        np.testing.assert_array_equal(view.embedding_rows(rows), embs[rows])
+        np.testing.assert_array_equal(label_scores(view.tags.take(rows), ['tech']),
+                                      label_scores(local.tags.take(rows), ['tech']))
+        self.assertIsInstance(view.embeddings.data, np.memmap)
+        self.assertEqual(view.window_count(), local.view().window_count())
+        self.assertEqual(view.window_count(), 42)   # 6 undated + 36 upcoming
+
+    def test_other_worker_switches_to_published_version(self):
+        events, embs = make_corpus()
+        publisher = SharedCorpus(self.root, dimension=8)
+        worker = SharedCorpus(self.root, dimension=8)
+        publisher.replace(events[:30], embs[:30])
+        self.assertEqual((worker.version, len(worker)), (1, 30))
+
+        held = worker.view()
+        publisher.replace(events, embs)
+        publisher.replace(events[:40], embs[:40])   # version 1 is pruned from disk
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'versions', '1')))
+        self.assertEqual((worker.version, len(worker)), (3, 40))
+
+        # a request that started on version 1 keeps reading it
+        self.assertEqual(len(held), 30)
+        self.assertEqual(held.events_at([0]), [{'id': 'evt-0'}])
+        self.assertEqual(len(held.candidate_rows(embs[0], k=5)), 5)
+
+    def test_conditional_replace_loses_to_a_newer_publish(self):
+        events, embs = make_corpus()
+        corpus = SharedCorpus(self.root, dimension=8)
+        generation = corpus.generation
+        SharedCorpus(self.root, dimension=8).replace(events[:10], embs[:10])
+        self.assertFalse(corpus.replace(events, embs, if_generation=generation))
+        self.assertEqual((corpus.version, len(corpus)), (1, 10))
+
+    def test_int8_storage(self):
+        events, embs = make_corpus()
+        corpus = SharedCorpus(self.root, dimension=8, storage='int8')
+        corpus.replace(events, embs)
+        view = corpus.view()
+        self.assertEqual(view.embeddings.data.dtype, np.int8)
+        np.testing.assert_allclose(view.embedding_rows([1, 2]), embs[[1, 2]], atol=0.02)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import tempfile
+import sys
+import os
+import threading
+import multiprocessing
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.store import EmbeddingStore
+
+def append_from_process(root, worker, n_batches=20, batch=5):
+    store = EmbeddingStore(root, 'model-a', dimension=4)
+    for b in range(n_batches):
+        ids = [f"w{worker}-{b * batch + i}" for i in range(batch)]
+        vectors = np.array([[worker, b * batch + i, 0, 1] for i in range(batch)], dtype=np.float32)
+        store.append(ids, ['h'] * batch, vectors)
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.vectors = np.eye(3, 4, dtype=np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_survives_reopen(self):
+        store = EmbeddingStore(self.tmp.name, 'model-a', dimension=4)
+        store.append(['1', '2', '3'], ['h1', 'h2', 'h3'], self.vectors)
+
+        reopened = EmbeddingStore(self.tmp.name, 'model-a', dimension=4)
+        self.assertIsInstance(reopened.matrix, np.memmap)
+        out, missing = reopened.lookup(['3', '1', '4'], ['h3', 'h1', 'h4'])
+
+        self.assertEqual(missing, [2])
+        np.testing.assert_array_equal(out[:2], self.vectors[[2, 0]])
+
+    def test_changed_content_is_a_miss_until_reappended(self):
+        store = EmbeddingStore(self.tmp.name, 'model-a', dimension=4)
+        store.append(['1', '2'], ['h1', 'h2'], self.vectors[:2])
+
+        _, missing = store.lookup(['1'], ['h1-edited'])
+        self.assertEqual(missing, [0])
+
+        store.append(['1'], ['h1-edited'], self.vectors[2:])
+        store.compact()
+        out, missing = store.lookup(['1', '2'], ['h1-edited', 'h2'])
+        self.assertEqual(missing, [])
+        np.testing.assert_array_equal(out, self.vectors[[2, 1]])
+        self.assertEqual(store.matrix.shape, (2, 4))
+
+    def test_other_model_starts_empty(self):
+        EmbeddingStore(self.tmp.name, 'model-a', dimension=4).append(['1'], ['h1'], self.vectors[:1])
+        self.assertEqual(len(EmbeddingStore(self.tmp.name, 'model-b', dimension=4)), 0)
+        self.assertEqual(len(EmbeddingStore(self.tmp.name, 'model-a', dimension=4)), 1)
+
+    def test_lookups_during_background_appends(self):
+        # the pattern of app.embed_events_nonblocking: a background thread appends
+        # freshly embedded events while request threads keep looking vectors up
+        store = EmbeddingStore(self.tmp.name, 'model-a', dimension=4)
+        n_batches, batch = 200, 5
+        errors = []
+
+        def append_all():
+            for b in range(n_batches):
+                ids = [str(b * batch + i) for i in range(batch)]
+                vectors = np.repeat(np.array(ids, dtype=np.float32)[:, None], 4, axis=1)
+                store.append(ids, ['h'] * batch, vectors)
+
+        writer = threading.Thread(target=append_all)
+        writer.start()
+        probe = [str(i) for i in range(0, n_batches * batch, 7)]
+        try:
+            while writer.is_alive():
+                out, missing = store.lookup(probe, ['h'] * len(probe))
+                found = [i for i in range(len(probe)) if i not in set(missing)]
+                np.testing.assert_array_equal(out[found, 0], np.array(probe, dtype=np.float32)[found])
+        except Exception as e:
+            errors.append(e)
+        writer.join()
+
+        self.assertEqual(errors, [])
+        out, missing = store.lookup(probe, ['h'] * len(probe))
+        self.assertEqual(missing, [])
+        np.testing.assert_array_equal(out[:, 0], np.array(probe, dtype=np.float32))
+
+    def test_two_stores_on_one_directory(self):
+        # e.g. two gunicorn workers: each must append after the other's rows, not over them
+        a = EmbeddingStore(self.tmp.name, 'model-a', dimension=4)
+        b = EmbeddingStore(self.tmp.name, 'model-a', dimension=4)
+        a.append(['x'], ['hx'], self.vectors[:1])
+        b.append(['y'], ['hy'], self.vectors[1:2])
+
+        for store in (a, b, EmbeddingStore(self.tmp.name, 'model-a', dimension=4)):
+            out, missing = store.lookup(['x', 'y'], ['hx', 'hy'])
+            self.assertEqual(missing, [])
+            np.testing.assert_array_equal(out, self.vectors[:2])
+
+        b.compact()
+        a.append(['z'], ['hz'], self.vectors[2:])
+        out, missing = b.lookup(['x', 'y', 'z'], ['hx', 'hy', 'hz'])
+        self.assertEqual(missing, [])
+        np.testing.assert_array_equal(out, self.vectors)
+
+    def test_concurrent_processes(self):
+        ctx = multiprocessing.get_context('fork')
+        workers = [ctx.Process(target=append_from_process, args=(self.tmp.name, w)) for w in range(3)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+
+        store = EmbeddingStore(self.tmp.name, 'model-a', dimension=4)
+        self.assertEqual(len(store), 300)
+        ids = store.ids()
+        out, missing = store.lookup(ids, ['h'] * len(ids))
+        self.assertEqual(missing, [])
+        expected = [[int(eid[1]), int(eid.split('-')[1])] for eid in ids]
+        np.testing.assert_array_equal(out[:, :2], np.array(expected, dtype=np.float32))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scorer import score_matrix, event_timestamps, event_tag_index, rank_order
+from sweep import sweep_weights, weight_grid
+
+class TestWeightSweep(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        now = time.time()
+        self.events = [{'id': f'e{i}', 'tags': ['tech'] if i % 3 else ['art'], 'start_timestamp': now + rng.uniform(0, 40) * 86400}
+                       for i in range(200)]
+        embs = rng.normal(size=(200, 16))
+        embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+        self.components = score_matrix(embs[0], embs, event_timestamps(self.events), event_tag_index(self.events),
+                                       {'interests': ['tech']}, now=now)
+
+    def test_grid_covers_the_simplex(self):
+        grid = weight_grid(0.1)
+        self.assertEqual(len(grid), 66)
+        np.testing.assert_allclose(grid.sum(axis=1), 1.0)
+
+    def test_scores_match_per_scenario_scoring(self):
+        scenarios = [{'sim': 0.7, 'label': 0.1, 'recency': 0.2}, {'sim': 0.0, 'label': 0.5, 'recency': 0.5}]
+        result = sweep_weights(self.components, scenarios, k=10)
+        for s, weights in enumerate(scenarios):
+            expected = sum(weights[c] * self.components[c] for c in ('sim', 'label', 'recency'))
+            np.testing.assert_allclose(result['scores'][s], expected)
+            np.testing.assert_array_equal(result['top_k'][s], rank_order(expected, limit=10))
+
+    def test_top_k_follows_rounded_scores_like_rank(self):
+        # 0.101, 0.104 and 0.103 all round to 0.10, so /rank keeps them in event order
+        components = {'sim': np.array([0.101, 0.104, 0.3, 0.103]), 'label': np.zeros(4), 'recency': np.zeros(4)}
+        result = sweep_weights(components, [[1.0, 0.0, 0.0]], k=3)
+        np.testing.assert_array_equal(result['top_k'][0], [2, 0, 1])
+        np.testing.assert_array_equal(result['top_k'][0], rank_order(components['sim'], limit=3))
+        self.assertEqual(result['margin'][0], 0.0)     # the tie with event 3 is one nudge from flipping
+
+    def test_agreement_metrics(self):
+        grid = np.vstack([[0.7, 0.1, 0.2], [0.7, 0.1, 0.2], weight_grid(0.05)])
+        result = sweep_weights(self.components, grid, k=10)
+        self.assertEqual(result['overlap'][1], 1.0)
+        self.assertAlmostEqual(result['spearman'][1], 1.0)
+        self.assertTrue(np.all((result['overlap'] >= 0) & (result['overlap'] <= 1)))
+        self.assertTrue(np.all(result['margin'] >= 0))
+        self.assertTrue(np.all(result['top_gap'] >= 0))
+
+if __name__ == '__main__':
+    unittest.main()
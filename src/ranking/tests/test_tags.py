@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import threading
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tags import EventTags, TagVocabulary
+from scorer import label_scores
+
+def substring_label_scores(tag_lists, interests):
+    """The original per-tag substring scan, kept as the reference."""
+    interests = [x.lower() for x in interests]
+    if not interests:
+        return np.zeros(len(tag_lists))
+    scores = [sum(1 for tag in tags if any(intr in tag.lower() for intr in interests)) for tags in tag_lists]
+    return np.minimum(1.0, np.array(scores, dtype=np.float64) / len(interests))
+
+class TestTagIndex(unittest.TestCase):
+    def test_matches_substring_semantics(self):
+        rng = np.random.default_rng(0)
+        vocab = ['Tech', 'Biotech', 'AI', 'Art', 'Arts & Crafts', 'Career', 'Music', 'Sports', 'athletics', 'Lecture']
+        tag_lists = [list(rng.choice(vocab, size=rng.integers(0, 5))) for _ in range(200)]
+        tag_lists[3] = ['Tech', 'Tech']     # repeated tags count twice
+        index = EventTags.from_lists(tag_lists)
+
+        for interests in (['tech'], ['Art', 'ai'], ['art', 'art'], ['TECH', 'music', 'sport'], ['nomatch'], [''], []):
+            np.testing.assert_array_equal(label_scores(index, interests), substring_label_scores(tag_lists, interests))
+
+    def test_vocabulary_growth_after_lookup(self):
+        vocabulary = TagVocabulary()
+        first = EventTags.from_lists([['Tech']], vocabulary)
+        self.assertEqual(list(first.match_counts(['tech'])), [1.0])
+
+        later = EventTags.from_lists([['Biotech', 'Art']], vocabulary)    # new tags after 'tech' was memoized
+        self.assertEqual(list(later.match_counts(['tech'])), [1.0])
+        self.assertEqual(len(vocabulary), 3)
+
+    def test_remembered_interests_are_bounded(self):
+        vocabulary = TagVocabulary(max_interests=3)
+        EventTags.from_lists([['Tech', 'Art']], vocabulary)
+        for interest in ('a', 'b', 'c', 'tech', 'b'):
+            vocabulary.matching(interest)
+        self.assertEqual(list(vocabulary._matches), ['c', 'tech', 'b'])
+        self.assertEqual(vocabulary.matching('tech'), (0,))
+
+    def test_mask_while_vocabulary_grows(self):
+        vocabulary = TagVocabulary()
+        EventTags.from_lists([['Tech']], vocabulary)
+        done = threading.Event()
+        errors = []
+
+        def masks():
+            try:
+                while not done.is_set():
+                    vocabulary.interest_mask(['tech', 'art'])
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=masks)
+        thread.start()
+        for i in range(3000):
+            vocabulary.encode([f"tech-{i}", f"art-{i}"])
+        done.set()
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(int(vocabulary.interest_mask(['tech']).sum()), 3001)
+
+    def test_take_selects_rows(self):
+        tag_lists = [['a'], [], ['ba', 'ab'], ['c']]
+        index = EventTags.from_lists(tag_lists)
+        subset = index.take([2, 1, 0])
+        np.testing.assert_array_equal(subset.match_counts(['a']), [2.0, 0.0, 1.0])
+        self.assertEqual(len(index.take([])), 0)
+
+if __name__ == '__main__':
+    unittest.main()
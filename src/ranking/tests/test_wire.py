@@ -0,0 +1,78 @@
+import unittest
+import gzip
+import sys
+import os
+from unittest import mock
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wire import EventRegistry, accepts_gzip, content_hash, decode_body, dumps, encode_body, loads
+
+class TestWireEncoding(unittest.TestCase):
+    def test_round_trip_with_numpy_values(self):
+        payload = {"ids": ["a", "b"], "scores": np.array([0.5, 0.25])}
+        self.assertEqual(loads(dumps(payload)), {"ids": ["a", "b"], "scores": [0.5, 0.25]})
+
+    def test_gzip_only_when_accepted_and_large(self):
+        payload = {"ids": [str(i) for i in range(500)]}
+        body, headers = encode_body(payload, 'gzip, deflate')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(loads(gzip.decompress(body)), payload)
+
+        body, headers = encode_body(payload, '')
+        self.assertEqual(headers, {})
+        body, headers = encode_body({"ids": []}, 'gzip')
+        self.assertEqual(headers, {})
+
+    def test_accept_encoding_q_values(self):
+        self.assertTrue(accepts_gzip('gzip'))
+        self.assertTrue(accepts_gzip('deflate, gzip;q=0.5'))
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip('gzip;q=0'))
+        self.assertFalse(accepts_gzip('gzip; q=0.0, deflate'))
+        self.assertFalse(accepts_gzip('*, gzip;q=0'))
+        self.assertFalse(accepts_gzip('identity'))
+        self.assertFalse(accepts_gzip(''))
+        _, headers = encode_body({"ids": list(range(2000))}, 'gzip;q=0')
+        self.assertEqual(headers, {})
+
+    def test_decode_gzipped_request(self):
+        body = gzip.compress(dumps({"k": 5}))
+        self.assertEqual(decode_body(body, 'gzip'), {"k": 5})
+        self.assertEqual(decode_body(b''), {})
+
+class TestEventRegistry(unittest.TestCase):
+    def test_resolve_reports_unknown_and_changed_ids(self):
+        registry = EventRegistry()
+        registry.register([{"id": 1, "hash": "h1", "title": "A"}, {"id": "2", "hash": "h2", "title": "B"}])
+
+        events, unknown = registry.resolve([{"id": "1", "hash": "h1"}, {"id": "2", "hash": "h2"}])
+        self.assertEqual([e["title"] for e in events], ["A", "B"])
+        self.assertEqual(unknown, [])
+
+        events, unknown = registry.resolve([{"id": "1", "hash": "h1"}, {"id": "2", "hash": "edited"}, {"id": "3", "hash": "h3"}])
+        self.assertIsNone(events)
+        self.assertEqual(unknown, ["2", "3"])
+
+    def test_bounded_and_hash_fallback(self):
+        registry = EventRegistry(max_events=2)
+        events = [{"id": str(i), "title": str(i)} for i in range(3)]
+        registry.register(events)
+        self.assertEqual(len(registry), 2)
+        _, unknown = registry.resolve([{"id": "0"}])
+        self.assertEqual(unknown, ["0"])
+        resolved, _ = registry.resolve([{"id": "2", "hash": content_hash(events[2])}])
+        self.assertEqual(resolved, [events[2]])
+
+    def test_unhashed_bodies_are_hashed_only_when_resolved(self):
+        registry = EventRegistry()
+        events = [{"id": str(i), "title": str(i)} for i in range(3)]
+        with mock.patch('wire.content_hash', wraps=content_hash) as hashed:
+            registry.register(events)
+            self.assertEqual(hashed.call_count, 0)
+            registry.resolve([{"id": "1", "hash": content_hash(events[1])}])
+            registry.resolve([{"id": "1", "hash": "edited"}])
+        self.assertEqual(hashed.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
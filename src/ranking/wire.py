@@ -0,0 +1,119 @@
+"""
+Compact wire format shared by the ranking routes.
+
+- Bodies are encoded with orjson when it is installed (plain json otherwise),
+  gzip-compressed when the client accepts it and the body is large enough.
+- Clients may reference events as {"id", "hash"} instead of resending full
+  bodies; EventRegistry remembers the last body seen for each id and reports
+  ids it does not know (or knows under a different hash) so the client can
+  send just those.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:     # optional speed-up
+    orjson = None
+
+GZIP_MIN_BYTES = 1024
+
+def dumps(obj):
+    """Serialize to UTF-8 JSON bytes (numpy arrays and scalars allowed)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':'), default=_to_builtin).encode('utf-8')
+
+def _to_builtin(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def decode_body(body, content_encoding=None):
+    """Parsed request payload, gunzipping first when Content-Encoding says so ({} when empty)."""
+    if content_encoding == 'gzip':
+        body = gzip.decompress(body)
+    return loads(body) if body else {}
+
+def accepts_gzip(accept_encoding):
+    """Whether an Accept-Encoding header allows gzip (q-values honoured, so 'gzip;q=0' refuses it)."""
+    qualities = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    q = qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0)))
+    return q > 0
+
+def encode_body(payload, accept_encoding='', min_gzip_bytes=GZIP_MIN_BYTES):
+    """(body bytes, extra headers) for payload, gzipped if accepted and worth it."""
+    body = dumps(payload)
+    if accepts_gzip(accept_encoding) and len(body) >= min_gzip_bytes:
+        return gzip.compress(body, compresslevel=5), {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+    return body, {}
+
+def content_hash(event):
+    """Fallback content hash for events sent without one (key order independent)."""
+    fields = {key: value for key, value in event.items() if key != 'hash'}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class EventRegistry:
+    """
+    Last full body seen for each event id, tagged with its content hash.
+    Bounded to max_events, least recently used ids are forgotten first.
+    Bodies sent without a "hash" are only hashed (content_hash) the first
+    time a ref is resolved against them, so clients that never send refs
+    never pay for it.
+    """
+    def __init__(self, max_events=100000):
+        self.max_events = max_events
+        self._events = OrderedDict()    # id -> (hash or None until first needed, event)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def register(self, events):
+        with self._lock:
+            for event in events:
+                eid = str(event.get('id'))
+                self._events[eid] = (event.get('hash'), event)
+                self._events.move_to_end(eid)
+            while len(self._events) > self.max_events:
+                self._events.popitem(last=False)
+
+    def resolve(self, refs):
+        """
+        Events for [{"id", "hash"}, ...] refs, in order. Returns (events,
+        unknown ids); events is None when anything is unknown.
+        """
+        events, unknown = [], []
+        with self._lock:
+            for ref in refs:
+                eid = str(ref.get('id'))
+                entry = self._events.get(eid)
+                if entry is not None and ref.get('hash') is not None and entry[0] is None:
+                    entry = self._events[eid] = (content_hash(entry[1]), entry[1])
+                if entry is None or (ref.get('hash') is not None and entry[0] != ref.get('hash')):
+                    unknown.append(eid)
+                    continue
+                self._events.move_to_end(eid)
+                events.append(entry[1])
+        return (None if unknown else events), unknown